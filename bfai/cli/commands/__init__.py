@@ -1 +1,6 @@
 # Init file for commands package
+#
+# Command modules are imported whenever the CLI starts (including `bfai --help`),
+# so at module level they only import typer and the standard library. Everything
+# that pulls in pandas, numpy, pydantic or rich is imported inside the command
+# function. bfai/tests/test_cli_startup.py enforces this.
@@ -1,54 +1,246 @@
-import typer
 from pathlib import Path
 from typing import Optional
-from bfai.ingestion.csv_loader import load_csv
-from bfai.ingestion.normalizer import normalize_to_traces
-from bfai.core.friction import FrictionEngine
-from bfai.core.reasoning import ReasoningEngine
-from bfai.llm.factory import get_llm_provider
-from bfai.utils.output import print_json, dump_json, print_error, print_info
+
+import typer
+
+from bfai.ingestion.defaults import DEFAULT_MEMORY_BUDGET_MB
+
+
+def _parse_shard(value: str):
+    """Parses "i/N" (0-based shard i of N)."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid --shard '{value}', expected i/N (e.g. 0/4)")
+    if not 0 <= index < count:
+        raise ValueError(f"Invalid --shard '{value}': i must be between 0 and N-1")
+    return index, count
 
 def analyze_command(
-    file_path: Path = typer.Argument(..., help="Path to the CSV log file", exists=True, readable=True),
-    output: Optional[Path] = typer.Option(None, "--output", "-o", help="Output JSON file path"),
+    file_path: Path = typer.Argument(
+        ...,
+        help="Path to the log file (CSV, Parquet, Arrow or .bfai store)",
+        exists=True,
+        readable=True,
+    ),
+    output: Optional[Path] = typer.Option(
+        None, "--output", "-o", help="Output JSON file path"
+    ),
+    output_format: str = typer.Option(
+        "json",
+        "--format",
+        "-f",
+        help="Output format: json (array) or ndjson (one anomaly per line, streamed)",
+    ),
     demo: bool = typer.Option(False, "--demo", help="Force demo mode (mock LLM)"),
-    verbose: bool = typer.Option(False, "--verbose", "-v", help="Show processing steps")
+    timestamp_format: Optional[str] = typer.Option(
+        None,
+        "--timestamp-format",
+        help="strftime format, ISO8601, epoch_s or epoch_ms (inferred if omitted)",
+    ),
+    stream: bool = typer.Option(
+        False,
+        "--stream",
+        help=(
+            "Process the log one batch of cases at a time (CSV read in chunks and "
+            "spilled to disk); results are written as batches finish, time gaps last"
+        ),
+    ),
+    memory_budget: int = typer.Option(
+        DEFAULT_MEMORY_BUDGET_MB,
+        "--memory-budget",
+        help="Memory budget in MB for --stream",
+    ),
+    baseline: Optional[Path] = typer.Option(
+        None,
+        "--baseline",
+        help="Score time gaps against a stored baseline (see `bfai baseline`)",
+        exists=True,
+        readable=True,
+    ),
+    scoring: str = typer.Option(
+        "zscore",
+        "--scoring",
+        help="Time gap scoring: zscore, mad (median/MAD) or quantile",
+    ),
+    quantile: float = typer.Option(
+        0.99,
+        "--quantile",
+        help="Percentile threshold for --scoring quantile (e.g. 0.95)",
+    ),
+    loop_mode: str = typer.Option(
+        "count",
+        "--loop-mode",
+        help=(
+            "Loop detection: count (repeated activities) or cycle (A -> B -> A rework)"
+        ),
+    ),
+    workers: int = typer.Option(
+        1,
+        "--workers",
+        "-w",
+        help="Worker processes for detection (cases sharded by case_id hash)",
+        min=1,
+    ),
+    shard: Optional[str] = typer.Option(
+        None,
+        "--shard",
+        help=(
+            "Only analyze shard i/N (0-based, by case_id hash) and emit a partial "
+            "result for `bfai merge`"
+        ),
+    ),
+    batch_size: int = typer.Option(
+        1,
+        "--batch-size",
+        help="Anomalies per LLM request (1: one request per anomaly)",
+        min=1,
+    ),
+    cluster: bool = typer.Option(
+        True,
+        "--cluster/--no-cluster",
+        help="Enrich one representative per cluster of similar anomalies",
+    ),
+    no_cache: bool = typer.Option(
+        False,
+        "--no-cache",
+        help=(
+            "Rerun every stage and always call the LLM provider; do not read or write "
+            "the artifact or enrichment caches"
+        ),
+    ),
+    verbose: bool = typer.Option(
+        False, "--verbose", "-v", help="Show processing steps"
+    ),
 ):
     """Run full analysis pipeline on input logs."""
+    from bfai.core.artifacts import ArtifactCache, CachedPipeline
+    from bfai.core.friction import FrictionEngine
+    from bfai.core.reasoning import ReasoningEngine
+    from bfai.core.stats import TransitionStats
+    from bfai.ingestion.loader import iter_trace_batches, sniff_source_schema
+    from bfai.ingestion.timestamps import TimestampParser
+    from bfai.llm.cache import EnrichmentCache
+    from bfai.llm.factory import get_llm_provider
+    from bfai.utils.output import (
+        RECORD_FORMATS,
+        dump_json,
+        dump_records,
+        print_error,
+        print_info,
+        print_json,
+        print_records,
+    )
+    
     try:
-        # 1. Ingestion
-        if verbose:
-            print_info(f"Loading logs from {file_path}...")
-        raw_data = load_csv(file_path)
+        shard_spec = _parse_shard(shard) if shard else None
+        if output_format not in RECORD_FORMATS:
+            raise ValueError(
+                f"Unknown output format: {output_format} "
+                f"(expected one of {', '.join(RECORD_FORMATS)})"
+            )
+        # Streamed runs pass batches of cases through every stage, never the whole log
+        pipelined = stream and workers == 1 and not shard_spec
         
+        # 1. Ingestion
         if verbose:
-            print_info(f"Normalizing {len(raw_data)} records...")
-        traces = normalize_to_traces(raw_data)
+            schema = sniff_source_schema(file_path)
+            if schema:
+                resolved = ", ".join(
+                    f"{field} <- '{source}'" for field, source in schema.items()
+                )
+                print_info(f"Resolved schema: {resolved}")
+            if stream:
+                print_info(
+                    f"Streaming logs from {file_path} (budget: {memory_budget} MB)..."
+                )
+            else:
+                print_info(f"Loading logs from {file_path}...")
+        if pipelined:
+            batches = iter_trace_batches(
+                file_path,
+                timestamp_parser=TimestampParser(timestamp_format),
+                memory_budget_mb=memory_budget
+            )
+        else:
+            # Stages with unchanged inputs and configuration come from the cache
+            pipeline = CachedPipeline(
+                file_path,
+                timestamp_format,
+                artifacts=None if no_cache else ArtifactCache(),
+                stream=stream,
+                memory_budget_mb=memory_budget
+            )
         
         # 2. Friction Detection
-        if verbose:
-            print_info(f"Running friction detection on {len(traces)} traces...")
-        friction_engine = FrictionEngine()
-        anomalies = friction_engine.run_analysis(traces)
+        if verbose and pipelined:
+            print_info(
+                "Running friction detection batch by batch (time gaps are scored "
+                "after the last batch)..."
+            )
+        stats = TransitionStats.load(baseline) if baseline else None
+        if verbose and stats is not None:
+            print_info(
+                f"Scoring time gaps against baseline {baseline} ({len(stats)} "
+                "transitions)"
+            )
+        friction_engine = FrictionEngine(
+            baseline=stats,
+            scoring=scoring,
+            quantile=quantile,
+            loop_mode=loop_mode,
+            workers=workers,
+        )
+        if shard_spec:
+            # Partial result: detector output + mergeable state, enriched by bfai merge
+            partial = friction_engine.analyze_shard(pipeline.frame(), *shard_spec)
+            if verbose:
+                print_info(
+                    f"Wrote partial result for shard {shard_spec[0]}/{shard_spec[1]}"
+                )
+            if output:
+                dump_json(partial, output)
+            else:
+                print_json(partial)
+            return
+        if pipelined:
+            anomaly_batches = friction_engine.run_streaming(batches)
         
         # 3. Reasoning
-        if verbose:
-            print_info(f"Enriching {len(anomalies)} anomalies...")
-        
         provider_mode = "mock"
         llm_provider = get_llm_provider(provider_mode)
-        reasoning_engine = ReasoningEngine(llm_provider)
-        
-        enriched_anomalies = reasoning_engine.analyze(anomalies)
-        
+        cache = None if no_cache else EnrichmentCache()
+        reasoning_engine = ReasoningEngine(
+            llm_provider, batch_size=batch_size, cluster=cluster, cache=cache
+        )
+
+        if pipelined:
+            # Lazy: ingestion, detection and reasoning run as the output is consumed
+            enriched_anomalies = reasoning_engine.iter_analyze(anomaly_batches)
+        else:
+            enriched_anomalies = pipeline.enrich(friction_engine, reasoning_engine)
+            if verbose:
+                print_info(
+                    f"Stages run: {', '.join(pipeline.ran) or 'none'}; reused from "
+                    f"cache: {', '.join(pipeline.reused) or 'none'}"
+                )
+
         # 4. Output
-        results = [a.model_dump() for a in enriched_anomalies]
-        
         if output:
-            dump_json(results, output)
+            dump_records(enriched_anomalies, output, output_format)
         else:
-            print_json(results)
-            
+            print_records(enriched_anomalies, output_format)
+        enriched_now = pipelined or "enrich" in pipeline.ran
+        if verbose and cluster and enriched_now:
+            print_info(
+                f"Clustered similar anomalies: {reasoning_engine.calls_saved} LLM "
+                "calls saved"
+            )
+        if verbose and cache is not None and enriched_now:
+            print_info(
+                f"Enrichment cache: {reasoning_engine.cache_hits} hits ({cache.path})"
+            )
+
     except Exception as e:
         print_error(str(e))
         raise typer.Exit(code=1)
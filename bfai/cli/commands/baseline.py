@@ -0,0 +1,70 @@
+from pathlib import Path
+from typing import Optional
+
+import typer
+
+from bfai.ingestion.defaults import DEFAULT_MEMORY_BUDGET_MB
+
+
+def baseline_command(
+    file_path: Path = typer.Argument(
+        ...,
+        help="Path to the log file (CSV, Parquet, Arrow or .bfai store)",
+        exists=True,
+        readable=True,
+    ),
+    baseline: Path = typer.Option(
+        ..., "--baseline", "-b", help="Baseline JSON file to create or update"
+    ),
+    reset: bool = typer.Option(
+        False, "--reset", help="Replace the baseline instead of merging into it"
+    ),
+    timestamp_format: Optional[str] = typer.Option(
+        None,
+        "--timestamp-format",
+        help="strftime format, ISO8601, epoch_s or epoch_ms (inferred if omitted)",
+    ),
+    stream: bool = typer.Option(
+        False,
+        "--stream",
+        help="Read the CSV in chunks, spilling case partitions to disk",
+    ),
+    memory_budget: int = typer.Option(
+        DEFAULT_MEMORY_BUDGET_MB,
+        "--memory-budget",
+        help="Memory budget in MB for --stream",
+    ),
+):
+    """Fit time gap statistics on a log and merge them into a stored baseline."""
+    from bfai.core.detectors.time_gap import TimeGapDetector
+    from bfai.core.stats import TransitionStats
+    from bfai.ingestion.loader import load_trace_frame
+    from bfai.ingestion.timestamps import TimestampParser
+    from bfai.utils.output import print_error, print_info, print_success
+
+    try:
+        frame = load_trace_frame(
+            file_path,
+            timestamp_parser=TimestampParser(timestamp_format),
+            stream=stream,
+            memory_budget_mb=memory_budget
+        )
+        stats = TimeGapDetector().fit(frame)
+
+        if baseline.exists() and not reset:
+            previous = TransitionStats.load(baseline)
+            print_info(
+                f"Merging {frame.n_events} events into {baseline} ({len(previous)} "
+                "transitions)..."
+            )
+            stats = previous.merge(stats)
+
+        stats.save(baseline)
+        print_success(
+            f"Baseline {baseline}: {len(stats)} transitions, "
+            f"{int(stats.counts.sum())} samples"
+        )
+
+    except Exception as e:
+        print_error(str(e))
+        raise typer.Exit(code=1)
@@ -0,0 +1,65 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import typer
+
+from bfai.ingestion.defaults import DEFAULT_MEMORY_BUDGET_MB, STORE_SUFFIX
+
+
+def convert_command(
+    file_path: Path = typer.Argument(
+        ...,
+        help="Path to the log file (CSV, Parquet or Arrow)",
+        exists=True,
+        readable=True,
+    ),
+    output: Optional[Path] = typer.Option(
+        None,
+        "--output",
+        "-o",
+        help=f"Target store directory (default: <input>{STORE_SUFFIX})",
+    ),
+    timestamp_format: Optional[str] = typer.Option(
+        None,
+        "--timestamp-format",
+        help="strftime format, ISO8601, epoch_s or epoch_ms (inferred if omitted)",
+    ),
+    stream: bool = typer.Option(
+        False,
+        "--stream",
+        help="Read the CSV in chunks, spilling case partitions to disk",
+    ),
+    memory_budget: int = typer.Option(
+        DEFAULT_MEMORY_BUDGET_MB,
+        "--memory-budget",
+        help="Memory budget in MB for --stream",
+    ),
+):
+    """Convert a log into a memory-mapped binary event log for fast reuse."""
+    from bfai.ingestion.frame_store import save_frame
+    from bfai.ingestion.loader import load_trace_frame
+    from bfai.ingestion.timestamps import TimestampParser
+    from bfai.utils.output import print_error, print_info, print_success
+
+    try:
+        start_t = datetime.now()
+        target = output or file_path.with_name(file_path.name + STORE_SUFFIX)
+        print_info(f"Converting {file_path} -> {target}...")
+
+        frame = load_trace_frame(
+            file_path,
+            timestamp_parser=TimestampParser(timestamp_format),
+            stream=stream,
+            memory_budget_mb=memory_budget
+        )
+        save_frame(frame, target)
+
+        elapsed = (datetime.now() - start_t).total_seconds()
+        print_success(
+            f"Stored {frame.n_events} events in {frame.n_cases} cases in {elapsed:.2f}s"
+        )
+
+    except Exception as e:
+        print_error(str(e))
+        raise typer.Exit(code=1)
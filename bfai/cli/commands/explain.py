@@ -1,25 +1,73 @@
-import typer
 from pathlib import Path
-from bfai.ingestion.csv_loader import load_csv
-from bfai.ingestion.normalizer import normalize_to_traces
-from bfai.core.friction import FrictionEngine
-from bfai.core.reasoning import ReasoningEngine
-from bfai.llm.factory import get_llm_provider
-from bfai.utils.output import print_table, print_panel, print_error, print_info
+from typing import Optional
+
+import typer
+
 
 def explain_command(
-    file_path: Path = typer.Argument(..., help="Path to the CSV log file", exists=True, readable=True),
+    file_path: Path = typer.Argument(
+        ...,
+        help="Path to the log file (CSV, Parquet, Arrow or .bfai store)",
+        exists=True,
+        readable=True,
+    ),
     case_id: str = typer.Option(..., "--case-id", "-c", help="The Case ID to explain"),
-    demo: bool = typer.Option(False, "--demo", help="Force demo mode")
+    demo: bool = typer.Option(False, "--demo", help="Force demo mode"),
+    timestamp_format: Optional[str] = typer.Option(
+        None,
+        "--timestamp-format",
+        help="strftime format, ISO8601, epoch_s or epoch_ms (inferred if omitted)",
+    ),
+    no_cache: bool = typer.Option(
+        False,
+        "--no-cache",
+        help=(
+            "Rerun every stage and always call the LLM provider; do not read or write "
+            "the artifact or enrichment caches"
+        ),
+    ),
+    index: Optional[Path] = typer.Option(
+        None,
+        "--index",
+        help=(
+            "Case index built by `bfai index` (default: <log>.index.sqlite, if "
+            "present)"
+        ),
+    ),
 ):
     """Deep-dive into a specific case trace."""
+    from bfai.core.artifacts import ArtifactCache, CachedPipeline
+    from bfai.core.friction import FrictionEngine
+    from bfai.core.reasoning import ReasoningEngine
+    from bfai.ingestion.case_index import default_index_path, open_case_index
+    from bfai.ingestion.timestamps import TimestampParser
+    from bfai.llm.cache import EnrichmentCache
+    from bfai.llm.factory import get_llm_provider
+    from bfai.utils.output import print_error, print_info, print_panel, print_table
+    
     try:
-        # 1. Ingestion
-        raw_data = load_csv(file_path)
-        traces = normalize_to_traces(raw_data)
+        # 1. Ingestion: with an up-to-date case index, only this case's rows are read
+        case_index = open_case_index(file_path, index)
+        if case_index is not None:
+            parser = TimestampParser(timestamp_format) if timestamp_format else None
+            frame = case_index.read_case(file_path, case_id, parser)
+            case_index.close()
+        else:
+            if (index or default_index_path(file_path)).is_file():
+                print_info(
+                    "Case index is out of date (see `bfai index`); reading the whole "
+                    "log."
+                )
+            # The normalized log is shared with analyze/report via the artifact cache
+            pipeline = CachedPipeline(
+                file_path,
+                timestamp_format,
+                artifacts=None if no_cache else ArtifactCache(),
+            )
+            frame = pipeline.frame()
         
-        # 2. Find Trace
-        target_trace = next((t for t in traces if t.case_id == case_id), None)
+        # 2. Find Trace (only this case is materialized)
+        target_trace = frame.get_trace(case_id) if frame is not None else None
         if not target_trace:
             print_error(f"Case ID '{case_id}' not found in logs.")
             raise typer.Exit(code=1)
@@ -31,7 +79,9 @@ def explain_command(
         anomalies = friction_engine.run_analysis([target_trace]) 
         
         llm_provider = get_llm_provider("mock")
-        reasoning_engine = ReasoningEngine(llm_provider)
+        reasoning_engine = ReasoningEngine(
+            llm_provider, cache=None if no_cache else EnrichmentCache()
+        )
         enriched_anomalies = reasoning_engine.analyze(anomalies)
         
         # 4. Visualization
@@ -61,7 +111,7 @@ def explain_command(
                     f"[bold blue]Recommendation:[/bold blue] {anomaly.recommendation}"
                 )
                 print_panel(content, title=f"Friction Point #{idx}", style="red")
-                
+
     except Exception as e:
         print_error(str(e))
         raise typer.Exit(code=1)
@@ -0,0 +1,44 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import typer
+
+
+def index_command(
+    file_path: Path = typer.Argument(
+        ...,
+        help="Path to the log file (CSV or .bfai store)",
+        exists=True,
+        readable=True,
+    ),
+    output: Optional[Path] = typer.Option(
+        None, "--output", "-o", help="Index file (default: <log>.index.sqlite)"
+    ),
+    timestamp_format: Optional[str] = typer.Option(
+        None,
+        "--timestamp-format",
+        help="strftime format, ISO8601, epoch_s or epoch_ms (inferred if omitted)",
+    ),
+):
+    """Build a case index so `explain` reads a single case instead of the whole log."""
+    from bfai.ingestion.case_index import build_case_index
+    from bfai.ingestion.timestamps import TimestampParser
+    from bfai.utils.output import print_error, print_info, print_success
+
+    try:
+        start_t = datetime.now()
+        print_info(f"Indexing cases of {file_path}...")
+
+        case_index = build_case_index(
+            file_path, output, TimestampParser(timestamp_format)
+        )
+        n_cases = len(case_index)
+        case_index.close()
+
+        elapsed = (datetime.now() - start_t).total_seconds()
+        print_success(f"Indexed {n_cases} cases in {elapsed:.2f}s -> {case_index.path}")
+
+    except Exception as e:
+        print_error(str(e))
+        raise typer.Exit(code=1)
@@ -0,0 +1,121 @@
+import json
+from pathlib import Path
+from typing import List, Optional
+
+import typer
+
+
+def merge_command(
+    partials: List[Path] = typer.Argument(
+        ...,
+        help="Partial results written by `bfai analyze --shard i/N`",
+        exists=True,
+        readable=True,
+    ),
+    output: Optional[Path] = typer.Option(
+        None, "--output", "-o", help="Output JSON file path"
+    ),
+    output_format: str = typer.Option(
+        "json",
+        "--format",
+        "-f",
+        help="Output format: json (array) or ndjson (one anomaly per line, streamed)",
+    ),
+    baseline: Optional[Path] = typer.Option(
+        None,
+        "--baseline",
+        help=(
+            "Baseline the shards were scored against (required if they used "
+            "--baseline)"
+        ),
+        exists=True,
+        readable=True,
+    ),
+    cluster: bool = typer.Option(
+        True,
+        "--cluster/--no-cluster",
+        help="Enrich one representative per cluster of similar anomalies",
+    ),
+    no_cache: bool = typer.Option(
+        False,
+        "--no-cache",
+        help="Always call the LLM provider; do not read or write the enrichment cache",
+    ),
+    verbose: bool = typer.Option(
+        False, "--verbose", "-v", help="Show processing steps"
+    ),
+):
+    """Combine partial results of sharded runs into the final analysis."""
+    from bfai.core.exceptions import ShardMergeError
+    from bfai.core.friction import FrictionEngine
+    from bfai.core.reasoning import ReasoningEngine
+    from bfai.core.stats import TransitionStats
+    from bfai.llm.cache import EnrichmentCache
+    from bfai.llm.factory import get_llm_provider
+    from bfai.utils.output import (
+        RECORD_FORMATS,
+        dump_records,
+        print_error,
+        print_info,
+        print_records,
+    )
+
+    try:
+        if output_format not in RECORD_FORMATS:
+            raise ValueError(
+                f"Unknown output format: {output_format} "
+                f"(expected one of {', '.join(RECORD_FORMATS)})"
+            )
+
+        documents = []
+        for path in partials:
+            with open(path, "r", encoding="utf-8") as f:
+                documents.append(json.load(f))
+
+        # Rebuild the detectors the shards ran with
+        options = dict(documents[0].get("options", {}))
+        baseline_digest = options.pop("baseline", None)
+        if baseline_digest and baseline is None:
+            raise ShardMergeError(
+                "The shards were scored against a baseline; pass it with --baseline."
+            )
+        if not baseline_digest and baseline is not None:
+            raise ShardMergeError(
+                f"The shards were not scored against a baseline; {baseline} would not "
+                "be used."
+            )
+        stats = TransitionStats.load(baseline) if baseline_digest else None
+        if stats is not None and stats.digest() != baseline_digest:
+            raise ShardMergeError(
+                f"The shards were scored against a different baseline than {baseline}."
+            )
+        friction_engine = FrictionEngine(baseline=stats, **options)
+
+        if verbose:
+            print_info(f"Merging {len(documents)} partial results...")
+        anomalies = friction_engine.merge_partials(documents)
+
+        if verbose:
+            print_info(f"Enriching {len(anomalies)} anomalies...")
+        llm_provider = get_llm_provider("mock")
+        cache = None if no_cache else EnrichmentCache()
+        reasoning_engine = ReasoningEngine(llm_provider, cluster=cluster, cache=cache)
+        enriched_anomalies = reasoning_engine.analyze(anomalies)
+        if verbose and cluster:
+            print_info(
+                f"Clustered similar anomalies: {reasoning_engine.calls_saved} LLM "
+                "calls saved"
+            )
+        if verbose and cache is not None:
+            print_info(
+                f"Enrichment cache: {reasoning_engine.cache_hits} hits ({cache.path})"
+            )
+
+        if output:
+            dump_records(enriched_anomalies, output, output_format)
+        else:
+            print_records(enriched_anomalies, output_format)
+
+    except Exception as e:
+        print_error(str(e))
+        raise typer.Exit(code=1)
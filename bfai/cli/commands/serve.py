@@ -0,0 +1,66 @@
+from pathlib import Path
+from typing import List, Optional
+
+import typer
+
+
+def serve_command(
+    file_paths: List[Path] = typer.Argument(
+        ...,
+        help="Logs to serve (CSV, Parquet, Arrow or .bfai store)",
+        exists=True,
+        readable=True,
+    ),
+    host: str = typer.Option("127.0.0.1", "--host", help="Interface to listen on"),
+    port: int = typer.Option(8000, "--port", "-p", help="TCP port to listen on"),
+    socket_path: Optional[Path] = typer.Option(
+        None, "--socket", help="Listen on this Unix socket instead of a TCP port"
+    ),
+    timestamp_format: Optional[str] = typer.Option(
+        None,
+        "--timestamp-format",
+        help="strftime format, ISO8601, epoch_s or epoch_ms (inferred if omitted)",
+    ),
+    no_cache: bool = typer.Option(
+        False,
+        "--no-cache",
+        help=(
+            "Rerun every stage and always call the LLM provider; do not read or write "
+            "the artifact or enrichment caches"
+        ),
+    ),
+):
+    """Keep logs analyzed in memory and answer analyze/explain/report over HTTP."""
+    from bfai.core.server import AnalysisServer
+    from bfai.core.service import AnalysisService
+    from bfai.utils.output import print_error, print_info, print_success
+
+    try:
+        service = AnalysisService(
+            file_paths, timestamp_format=timestamp_format, use_cache=not no_cache
+        )
+
+        # Load everything up front so the first queries are fast too
+        service.warm()
+        for name, log in service.metrics()["logs"].items():
+            print_info(
+                f"Loaded {name}: {log['n_cases']} cases, {log['n_anomalies']} "
+                "anomalies "
+                f"in {log['load_seconds']:.2f}s"
+            )
+
+        server = AnalysisServer(service, host=host, port=port, socket_path=socket_path)
+        print_success(
+            f"Serving on {server.url} (/analyze, /explain, /report, /metrics; Ctrl+C "
+            "to stop)"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print_info("Stopping server...")
+        finally:
+            server.close()
+
+    except Exception as e:
+        print_error(str(e))
+        raise typer.Exit(code=1)
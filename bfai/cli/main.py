@@ -2,7 +2,11 @@ import typer
 from bfai.cli.commands.analyze import analyze_command
 from bfai.cli.commands.explain import explain_command
 from bfai.cli.commands.report import report_command
-from bfai.utils.output import print_banner
+from bfai.cli.commands.convert import convert_command
+from bfai.cli.commands.baseline import baseline_command
+from bfai.cli.commands.merge import merge_command
+from bfai.cli.commands.index import index_command
+from bfai.cli.commands.serve import serve_command
 
 app = typer.Typer(
     name="bfai",
@@ -29,6 +33,11 @@ def main_callback(ctx: typer.Context):
 app.command(name="analyze")(analyze_command)
 app.command(name="explain")(explain_command)
 app.command(name="report")(report_command)
+app.command(name="convert")(convert_command)
+app.command(name="baseline")(baseline_command)
+app.command(name="merge")(merge_command)
+app.command(name="index")(index_command)
+app.command(name="serve")(serve_command)
 
 if __name__ == "__main__":
     # If running directly, we might want the banner, but individual commands import output utils too.
@@ -36,5 +45,6 @@ if __name__ == "__main__":
     # and maybe 'analyze' if verbose is on.
     # Actually, the user wants "CLI ini memiliki nama BFAI yang modern".
     # This usually means when you type `bfai` (help) it shows up.
+    from bfai.utils.output import print_banner
     print_banner() 
     app()
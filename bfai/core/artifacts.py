@@ -0,0 +1,329 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from bfai import __version__
+from bfai.core.exceptions import DataIngestionError
+from bfai.core.friction import FrictionEngine
+from bfai.core.reasoning import ReasoningEngine
+from bfai.ingestion.defaults import DEFAULT_MEMORY_BUDGET_MB, STORE_SUFFIX
+from bfai.ingestion.frame_store import is_frame_store, load_frame, save_frame
+from bfai.ingestion.loader import load_trace_frame
+from bfai.ingestion.timestamps import TimestampParser
+from bfai.llm.cache import default_cache_path
+from bfai.models.anomaly import Anomaly
+from bfai.models.trace_frame import TraceFrame
+
+# Bump when the content or layout of any stage output changes; every key also
+# includes the package version, so an upgrade never reuses older results
+ARTIFACT_VERSION = 1
+DEFAULT_MAX_BYTES = 4 << 30
+ARTIFACT_SUFFIX = ".pkl.z"
+
+# (anomalies, shard_state of every detector) of the detect and enrich stages
+StageOutput = Tuple[List[Anomaly], List[Dict[str, Any]]]
+
+
+def content_hash(path: Union[str, Path]) -> str:
+    """SHA-256 of a log's bytes (of every file, by name, for stores)."""
+    path = Path(path)
+    digest = hashlib.sha256()
+    files = (
+        sorted(p for p in path.iterdir() if p.is_file()) if path.is_dir() else [path]
+    )
+    for file in files:
+        if path.is_dir():
+            digest.update(file.name.encode("utf-8") + b"\0")
+        with open(file, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def stat_signature(path: Union[str, Path]) -> Tuple[int, int]:
+    """(size, mtime_ns) of a log (of meta.json for stores)."""
+    path = Path(path)
+    stat = (path / "meta.json" if is_frame_store(path) else path).stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def default_artifact_dir() -> Path:
+    """`artifacts/` next to the enrichment cache (see `default_cache_path`)."""
+    return default_cache_path().parent / "artifacts"
+
+
+def _digest(*parts: Any) -> str:
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+def _size(path: Path) -> int:
+    if path.is_dir():
+        return sum(p.stat().st_size for p in path.iterdir() if p.is_file())
+    return path.stat().st_size
+
+
+class ArtifactCache:
+    """
+    Directory of pipeline stage outputs, each stored under a hash of everything
+    it was computed from (see `CachedPipeline`). Frames are kept as frame stores
+    (memory-mapped when read back), anomaly lists as compressed pickles.
+
+    Reading an artifact marks it as recently used; beyond `max_bytes`, the least
+    recently used artifacts are removed. Unreadable artifacts count as missing.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Union[str, Path]] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        """
+        Args:
+            directory: Cache directory (default: `default_artifact_dir()`).
+            max_bytes: Total size above which least recently used artifacts are evicted.
+        """
+        self.directory = Path(directory) if directory else default_artifact_dir()
+        self.max_bytes = max_bytes
+
+    def load_frame(self, name: str) -> Optional[TraceFrame]:
+        path = self.directory / f"{name}{STORE_SUFFIX}"
+        if not is_frame_store(path):
+            return None
+        try:
+            frame = load_frame(path)
+        except (DataIngestionError, OSError, ValueError):
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+        os.utime(path)
+        return frame
+
+    def save_frame(self, name: str, frame: TraceFrame) -> None:
+        path = self.directory / f"{name}{STORE_SUFFIX}"
+        tmp = path.with_name(f"{path.name}.tmp{os.getpid()}")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        save_frame(frame, tmp)
+        try:
+            os.replace(tmp, path)
+        except OSError:
+            # Written concurrently by another run: same key, same content
+            shutil.rmtree(tmp, ignore_errors=True)
+        self._evict()
+
+    def load(self, name: str) -> Optional[Any]:
+        path = self.directory / f"{name}{ARTIFACT_SUFFIX}"
+        try:
+            with open(path, "rb") as f:
+                value = pickle.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            return None
+        except Exception:
+            path.unlink(missing_ok=True)
+            return None
+        os.utime(path)
+        return value
+
+    def save(self, name: str, value: Any) -> None:
+        path = self.directory / f"{name}{ARTIFACT_SUFFIX}"
+        tmp = path.with_name(f"{path.name}.tmp{os.getpid()}")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(
+                zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 1)
+            )
+        os.replace(tmp, path)
+        self._evict()
+
+    def clear(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _evict(self) -> None:
+        entries = []
+        for path in self.directory.iterdir():
+            if ".tmp" in path.name:
+                continue
+            try:
+                entries.append((path.stat().st_mtime, _size(path), path))
+            except OSError:
+                continue
+        entries.sort(key=lambda entry: entry[0])
+        total = sum(size for _, size, _ in entries)
+        # The newest artifact is kept even if it alone exceeds the budget
+        for _, size, path in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+            total -= size
+
+
+class CachedPipeline:
+    """
+    The ingest -> detect -> enrich pipeline for one log, each stage's output
+    cached in an `ArtifactCache` under a hash of its inputs:
+
+    - ingest: package version, content hash of the log and how it is read ->
+      normalized frame;
+    - detect: ingest key + `FrictionEngine.fingerprint` -> anomalies and
+      detector state (e.g. actor workload);
+    - enrich: detect key + `ReasoningEngine.fingerprint` -> enriched anomalies.
+
+    A stage only runs if its output is not cached, and earlier stages are only
+    loaded when a later one has to run. So `bfai report` right after `bfai
+    analyze` on the same log reuses every stage, and changing the scoring mode
+    re-runs detection and enrichment but not ingestion. Enrichments are only
+    cached if every anomaly was enriched, so failed requests are retried; the
+    detector output is then cached instead.
+    """
+
+    def __init__(
+        self,
+        file_path: Union[str, Path],
+        timestamp_format: Optional[str] = None,
+        artifacts: Optional[ArtifactCache] = None,
+        stream: bool = False,
+        memory_budget_mb: int = DEFAULT_MEMORY_BUDGET_MB,
+        source_hash: Optional[str] = None,
+    ):
+        """
+        Args:
+            file_path: The log (CSV, Parquet, Arrow or .bfai store).
+            timestamp_format: Timestamp format of the log (inferred if None).
+            artifacts: Stage cache (None: run every stage).
+            stream: Read CSVs with the chunked reader (see `load_trace_frame`).
+            memory_budget_mb: Memory budget for the chunked reader.
+            source_hash: `content_hash` of the log, if already known.
+        """
+        self.file_path = Path(file_path)
+        self.timestamp_format = timestamp_format
+        self.artifacts = artifacts
+        self.stream = stream
+        self.memory_budget_mb = memory_budget_mb
+        self._source_hash = source_hash
+        self._frame: Optional[TraceFrame] = None
+        # Stage names, in the order they were computed or read from the cache
+        self.ran: List[str] = []
+        self.reused: List[str] = []
+
+    @property
+    def source_hash(self) -> str:
+        """`content_hash` of the log, read once per stat signature from the cache."""
+        if self._source_hash is not None:
+            return self._source_hash
+        if self.artifacts is None:
+            self._source_hash = content_hash(self.file_path)
+            return self._source_hash
+
+        # Hashing reads the whole log; skip it while size and mtime are unchanged
+        signature = stat_signature(self.file_path)
+        name = f"source-{_digest(str(self.file_path.resolve()), *signature)}"
+        self._source_hash = self.artifacts.load(name)
+        if self._source_hash is None:
+            self._source_hash = content_hash(self.file_path)
+            self.artifacts.save(name, self._source_hash)
+        return self._source_hash
+
+    def ingest_key(self) -> str:
+        # The chunked reader orders cases by their text, so it is part of the key
+        return _digest(
+            "ingest",
+            ARTIFACT_VERSION,
+            __version__,
+            self.source_hash,
+            self.timestamp_format,
+            self.stream,
+        )
+
+    def detect_key(self, engine: FrictionEngine) -> str:
+        return _digest("detect", self.ingest_key(), engine.fingerprint)
+
+    def enrich_key(self, engine: FrictionEngine, reasoning: ReasoningEngine) -> str:
+        return _digest("enrich", self.detect_key(engine), reasoning.fingerprint)
+
+    def frame(self) -> TraceFrame:
+        """The normalized log."""
+        if self._frame is not None:
+            return self._frame
+        # Stores are normalized already; reading them costs nothing to cache
+        cacheable = self.artifacts is not None and not is_frame_store(self.file_path)
+        name = f"frame-{self.ingest_key()}" if cacheable else None
+        if cacheable:
+            self._frame = self.artifacts.load_frame(name)
+        if self._frame is not None:
+            self.reused.append("ingest")
+            return self._frame
+
+        self._frame = load_trace_frame(
+            self.file_path,
+            timestamp_parser=TimestampParser(self.timestamp_format),
+            stream=self.stream,
+            memory_budget_mb=self.memory_budget_mb,
+        )
+        self.ran.append("ingest")
+        if cacheable:
+            self.artifacts.save_frame(name, self._frame)
+        return self._frame
+
+    def detect(self, engine: FrictionEngine) -> List[Anomaly]:
+        """The detectors' anomalies; `engine` keeps its state (`actor_workload`)."""
+        anomalies = self._detect(engine)
+        if self.ran[-1:] == ["detect"]:
+            self._save(f"detect-{self.detect_key(engine)}", anomalies, engine)
+        return anomalies
+
+    def enrich(
+        self, engine: FrictionEngine, reasoning: ReasoningEngine
+    ) -> List[Anomaly]:
+        """The enriched anomalies; `engine` is left as after running the detectors."""
+        name = f"enrich-{self.enrich_key(engine, reasoning)}"
+        cached = self._load(name, engine)
+        if cached is not None:
+            self.reused.append("enrich")
+            return cached
+
+        anomalies = self._detect(engine)
+        detected = self.ran[-1:] == ["detect"]
+        enriched = reasoning.analyze(anomalies)
+        self.ran.append("enrich")
+        if all(
+            a.root_cause is not None or a.recommendation is not None for a in enriched
+        ):
+            self._save(name, enriched, engine)
+        elif detected:
+            # Writing both costs as much as detecting again; the detect stage is
+            # only kept for the next run when the enrichment could not be
+            self._save(f"detect-{self.detect_key(engine)}", anomalies, engine)
+        return enriched
+
+    def _detect(self, engine: FrictionEngine) -> List[Anomaly]:
+        cached = self._load(f"detect-{self.detect_key(engine)}", engine)
+        if cached is not None:
+            self.reused.append("detect")
+            return cached
+        anomalies = engine.run_analysis(self.frame())
+        self.ran.append("detect")
+        return anomalies
+
+    def _load(self, name: str, engine: FrictionEngine) -> Optional[List[Anomaly]]:
+        if self.artifacts is None:
+            return None
+        cached: Optional[StageOutput] = self.artifacts.load(name)
+        if cached is None:
+            return None
+        anomalies, states = cached
+        for detector, state in zip(engine.detectors, states):
+            detector.combine([state])
+        return anomalies
+
+    def _save(
+        self, name: str, anomalies: List[Anomaly], engine: FrictionEngine
+    ) -> None:
+        if self.artifacts is not None:
+            states = [detector.shard_state() for detector in engine.detectors]
+            self.artifacts.save(name, (anomalies, states))
@@ -0,0 +1,55 @@
+from typing import Dict, List, Optional, Tuple
+
+from bfai.models.anomaly import Anomaly, AnomalySeverity
+
+ClusterKey = Tuple[str, Optional[str], AnomalySeverity]
+
+
+def cluster_key(anomaly: Anomaly) -> ClusterKey:
+    """
+    Anomalies with the same key describe the same finding in different cases:
+    same type, same signature (transition, activity or cycle) and same severity.
+    """
+    return anomaly.anomaly_type, anomaly.signature, anomaly.severity
+
+
+def cluster_anomalies(anomalies: List[Anomaly]) -> List[List[int]]:
+    """
+    Groups anomalies by `cluster_key`.
+
+    Returns:
+        List[List[int]]: Indices into `anomalies` per cluster, clusters in order of
+        first appearance. The first member of each cluster is its representative.
+    """
+    clusters: Dict[ClusterKey, List[int]] = {}
+    for i, anomaly in enumerate(anomalies):
+        clusters.setdefault(cluster_key(anomaly), []).append(i)
+    return list(clusters.values())
+
+
+def fan_out(
+    anomalies: List[Anomaly],
+    clusters: List[List[int]],
+    representatives: List[Anomaly],
+) -> List[Anomaly]:
+    """
+    Copies the root cause and recommendation of each enriched representative to
+    every member of its cluster. Members of a cluster whose enrichment failed are
+    returned unchanged.
+
+    Args:
+        anomalies: All anomalies.
+        clusters: Output of `cluster_anomalies`.
+        representatives: Enriched representative of each cluster, in cluster order.
+    """
+    results = list(anomalies)
+    for members, enriched in zip(clusters, representatives):
+        if enriched.root_cause is None and enriched.recommendation is None:
+            continue
+        update = {
+            "root_cause": enriched.root_cause,
+            "recommendation": enriched.recommendation,
+        }
+        for i in members:
+            results[i] = anomalies[i].model_copy(update=update)
+    return results
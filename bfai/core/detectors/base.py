@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple, Union
+from bfai.core.features import FrameFeatures
 from bfai.models.trace import Trace
+from bfai.models.trace_frame import TraceFrame
 from bfai.models.anomaly import Anomaly
 
 class BaseDetector(ABC):
@@ -8,15 +10,49 @@ class BaseDetector(ABC):
     Abstract base class for all friction detectors.
     """
     
+    # Names of the FrameFeatures this detector reads (precomputed by the engine)
+    requires: Tuple[str, ...] = ()
+    
+    # How the engine may split the work across processes (see core.parallel):
+    # "case"   - results of a case depend on that case only; shards run `detect`
+    #            and per-shard state (`shard_state`) is folded back with `combine`.
+    # "reduce" - shards run `partial`, the engine calls `reduce` on all partials
+    #            (`partial_from_dict` reads partials back from JSON).
+    # "serial" - runs once on the whole log.
+    sharding: str = "serial"
+    
     @abstractmethod
-    def detect(self, traces: List[Trace]) -> List[Anomaly]:
+    def detect(
+        self,
+        traces: Union[TraceFrame, List[Trace]],
+        features: Optional[FrameFeatures] = None,
+    ) -> List[Anomaly]:
         """
         Analyzes a list of traces and returns a list of detected anomalies.
-        
+
         Args:
-            traces: The normalized workflow traces to analyze.
-            
+            traces: The normalized workflow traces to analyze, either as a columnar
+                    TraceFrame or a list of Trace objects (see `TraceFrame.coerce`).
+            features: Shared derived arrays of the same traces, if already built.
+
         Returns:
             List[Anomaly]: A list of detected friction points.
         """
         pass
+
+    @staticmethod
+    def features_for(
+        traces: Union[TraceFrame, List[Trace]], features: Optional[FrameFeatures] = None
+    ) -> FrameFeatures:
+        """Returns `features`, or builds them for `traces` when running standalone."""
+        if features is not None:
+            return features
+        return FrameFeatures(TraceFrame.coerce(traces))
+
+    def shard_state(self) -> Dict[str, Any]:
+        """JSON-serializable state left by the last `detect`, for sharded runs."""
+        return {}
+
+    def combine(self, states: List[Dict[str, Any]]) -> None:
+        """Folds the `shard_state` of every shard into this detector."""
+        pass
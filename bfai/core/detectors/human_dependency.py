@@ -1,69 +1,153 @@
-from typing import List
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
 
 from bfai.core.detectors.base import BaseDetector
-from bfai.models.trace import Trace
-from bfai.models.event import ActorType
+from bfai.core.features import FrameFeatures
 from bfai.models.anomaly import Anomaly, AnomalySeverity
 from bfai.models.friction import FrictionType
+from bfai.models.trace import Trace
+from bfai.models.trace_frame import TraceFrame
+from bfai.models.workload import ActorWorkload
+
 
 class HumanDependencyDetector(BaseDetector):
     """
     Detects cases where human actors contribute disproportionately to the total duration.
+
+    Each run also fills `workload`: a per-actor index of human time, built from the
+    same masked gaps, sorted by human time (largest first).
     """
     
+    requires = ("transition_src", "transition_case", "deltas", "human_mask")
+    sharding = "case"
+    
     def __init__(self, ratio_threshold: float = 0.5):
         """
         Args:
             ratio_threshold: If (Human Duration / Total Duration) > threshold, flag it.
         """
         self.ratio_threshold = ratio_threshold
+        self.workload: List[ActorWorkload] = []
 
-    def detect(self, traces: List[Trace]) -> List[Anomaly]:
+    def detect(
+        self,
+        traces: Union[TraceFrame, List[Trace]],
+        features: Optional[FrameFeatures] = None,
+    ) -> List[Anomaly]:
+        features = self.features_for(traces, features)
+        frame = features.frame
         anomalies = []
+
+        # Simple heuristic: Duration of an activity is (Timestamp of Next - Current).
+        # The last event of a case is instantaneous (point events, no lifecycle info),
+        # so only within-case transitions count.
+        human = features.human_mask
+        src = features.transition_src[human]
+        gaps = features.deltas[human]
+        src_cases = features.transition_case[human]
+        human_duration = np.bincount(src_cases, weights=gaps, minlength=frame.n_cases)
         
-        for trace in traces:
-            if trace.duration_seconds <= 0:
-                continue
-                
-            human_duration = 0.0
-            
-            # Simple heuristic: Duration of an activity is (Timestamp of Next - Timestamp of Current)
-            # For the last event, duration is 0 unless we have end info (which specific models might have).
-            # We use the basic trace calc: sum of gaps.
-            
-            events = trace.events
-            involved_actors = set()
-            
-            for i in range(len(events) - 1):
-                e1 = events[i]
-                e2 = events[i+1]
-                
-                if e1.actor_type == ActorType.HUMAN:
-                    duration = (e2.timestamp - e1.timestamp).total_seconds()
-                    human_duration += duration
-                    if e1.actor:
-                        involved_actors.add(e1.actor)
-            
-            # Check last event? Usually instantaneous unless we have start/complete lifecycle.
-            # Assuming instantaneous for point events.
+        durations = np.asarray(frame.duration_seconds, dtype=np.float64)
+        ratios = np.zeros(frame.n_cases)
+        np.divide(human_duration, durations, out=ratios, where=durations > 0)
+        flagged = (durations > 0) & (ratios > self.ratio_threshold)
+        
+        self.workload = self._workload(frame, src, gaps, src_cases, durations, flagged)
+        
+        for case in np.flatnonzero(flagged).tolist():
+            case_id = str(frame.case_ids[case])
+            duration_seconds = float(durations[case])
+            ratio = float(ratios[case])
             
-            ratio = human_duration / trace.duration_seconds
+            description = (
+                f"Human-driven delays account for {ratio:.1%} of total case duration "
+                f"({float(human_duration[case]):.0f}s / {duration_seconds:.0f}s)."
+            )
             
-            if ratio > self.ratio_threshold:
-                description = (
-                    f"Human-driven delays account for {ratio:.1%} of total case duration "
-                    f"({human_duration:.0f}s / {trace.duration_seconds:.0f}s)."
-                )
-                
-                anomalies.append(Anomaly(
-                    anomaly_id=f"HUMAN_DEP_{trace.case_id}",
-                    case_id=trace.case_id,
-                    anomaly_type=FrictionType.HUMAN_DEPENDENCY.value,
-                    description=description,
-                    severity=AnomalySeverity.LOW if ratio < 0.8 else AnomalySeverity.MEDIUM,
-                    involved_events=[], # Whole trace issue
-                    root_cause=None,
-                    recommendation=None
-                ))
+            anomalies.append(Anomaly(
+                anomaly_id=f"HUMAN_DEP_{case_id}",
+                case_id=case_id,
+                anomaly_type=FrictionType.HUMAN_DEPENDENCY.value,
+                description=description,
+                severity=AnomalySeverity.LOW if ratio < 0.8 else AnomalySeverity.MEDIUM,
+                involved_events=[], # Whole trace issue
+                root_cause=None,
+                recommendation=None
+            ))
                 
         return anomalies
+
+    @staticmethod
+    def _workload(
+        frame: TraceFrame,
+        src: np.ndarray,
+        gaps: np.ndarray,
+        src_cases: np.ndarray,
+        durations: np.ndarray,
+        flagged: np.ndarray,
+    ) -> List[ActorWorkload]:
+        """Reduces the human gaps by actor (events without one share the last slot)."""
+        n_actors = len(frame.actors)
+        actor = np.where(frame.actor_codes[src] >= 0, frame.actor_codes[src], n_actors)
+        human_seconds = np.bincount(actor, weights=gaps, minlength=n_actors + 1)
+        
+        # Distinct (actor, case) pairs give case counts and the duration they cover
+        pairs = np.unique(actor.astype(np.int64) * max(frame.n_cases, 1) + src_cases)
+        pair_actor, pair_case = (
+            pairs // max(frame.n_cases, 1),
+            pairs % max(frame.n_cases, 1),
+        )
+        cases = np.bincount(pair_actor, minlength=n_actors + 1)
+        flagged_cases = np.bincount(
+            pair_actor, weights=flagged[pair_case], minlength=n_actors + 1
+        )
+        covered = np.bincount(
+            pair_actor, weights=durations[pair_case], minlength=n_actors + 1
+        )
+
+        labels = list(frame.actors) + [None]
+        workload = [
+            ActorWorkload(
+                actor=None if labels[a] is None else str(labels[a]),
+                human_seconds=float(human_seconds[a]),
+                cases=int(cases[a]),
+                flagged_cases=int(flagged_cases[a]),
+                case_seconds=float(covered[a]),
+                share=float(human_seconds[a] / covered[a]) if covered[a] > 0 else 0.0,
+            )
+            for a in np.flatnonzero(cases).tolist()
+        ]
+        workload.sort(key=lambda w: w.human_seconds, reverse=True)
+        return workload
+
+    def shard_state(self) -> Dict[str, Any]:
+        return {"workload": [w.model_dump() for w in self.workload]}
+
+    def combine(self, states: List[Dict[str, Any]]) -> None:
+        """Merges the workload indexes of shards holding disjoint sets of cases."""
+        totals = {}
+        for state in states:
+            for w in state.get("workload", []):
+                human, cases, flagged, covered = totals.get(
+                    w["actor"], (0.0, 0, 0, 0.0)
+                )
+                totals[w["actor"]] = (
+                    human + w["human_seconds"], cases + w["cases"],
+                    flagged + w["flagged_cases"], covered + w["case_seconds"],
+                )
+        self.workload = sorted(
+            (
+                ActorWorkload(
+                    actor=actor,
+                    human_seconds=human,
+                    cases=cases,
+                    flagged_cases=flagged,
+                    case_seconds=covered,
+                    share=human / covered if covered > 0 else 0.0,
+                )
+                for actor, (human, cases, flagged, covered) in totals.items()
+            ),
+            key=lambda w: w.human_seconds,
+            reverse=True,
+        )
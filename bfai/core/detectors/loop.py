@@ -1,50 +1,171 @@
-from typing import List, Dict
-from collections import Counter
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
 
 from bfai.core.detectors.base import BaseDetector
-from bfai.models.trace import Trace
+from bfai.core.features import FrameFeatures
 from bfai.models.anomaly import Anomaly, AnomalySeverity
 from bfai.models.friction import FrictionType
+from bfai.models.trace import Trace
+from bfai.models.trace_frame import TraceFrame
+
+LOOP_MODES = ("count", "cycle")
 
 class LoopDetector(BaseDetector):
     """
     Detects repeated executions of the same activity within a single trace.
+
+    Modes:
+    - "count": an activity occurs more than `threshold` times in a case.
+    - "cycle": rework cycles such as A -> B -> A or A -> B -> C -> A, found through
+      back-edges (an activity recurring within `max_cycle_length` steps).
+    Both run in a single pass over the frame.
     """
-    
-    def __init__(self, threshold: int = 2):
+
+    requires = ("activity_groups",)
+    sharding = "case"
+
+    def __init__(
+        self,
+        threshold: int = 2,
+        mode: str = "count",
+        max_cycle_length: int = 4,
+        min_cycles: int = 1,
+    ):
         """
         Args:
             threshold: Max allowed occurrences of a single activity before flagging.
                        Default 2 means: A -> A -> B is OK (2), but A -> A -> A is bad (3).
                        Wait, usually rework is A -> B -> A.
                        So we just count total occurrences of activity type in trace.
+            mode: "count" or "cycle".
+            max_cycle_length: Longest cycle (number of distinct steps before returning)
+                              reported in "cycle" mode.
+            min_cycles: Occurrences of the same cycle in a case needed to flag it
+                        in "cycle" mode.
         """
+        if mode not in LOOP_MODES:
+            raise ValueError(f"Unknown loop detection mode: {mode}")
         self.threshold = threshold
+        self.mode = mode
+        self.max_cycle_length = max_cycle_length
+        self.min_cycles = min_cycles
+
+    def detect(
+        self,
+        traces: Union[TraceFrame, List[Trace]],
+        features: Optional[FrameFeatures] = None,
+    ) -> List[Anomaly]:
+        features = self.features_for(traces, features)
+        if features.frame.n_events == 0:
+            return []
+        if self.mode == "cycle":
+            return self._detect_cycles(features)
+        return self._detect_counts(features)
 
-    def detect(self, traces: List[Trace]) -> List[Anomaly]:
+    def _detect_counts(self, features: FrameFeatures) -> List[Anomaly]:
+        frame = features.frame
         anomalies = []
-        
-        for trace in traces:
-            # Count activity occurrences
-            counts = Counter(e.activity for e in trace.events)
-            
-            for activity, count in counts.items():
-                if count > self.threshold:
-                    # Identify specific events involved
-                    involved_ids = [e.event_id for e in trace.events if e.activity == activity]
-                    
-                    description = (
-                        f"Activity '{activity}' was repeated {count} times "
-                        f"(threshold: {self.threshold}). Potential rework/loop."
-                    )
-                    
-                    anomalies.append(Anomaly(
-                        anomaly_id=f"LOOP_{trace.case_id}_{activity}",
-                        case_id=trace.case_id,
-                        anomaly_type=FrictionType.LOOP.value,
-                        description=description,
-                        severity=AnomalySeverity.MEDIUM if count <= 5 else AnomalySeverity.HIGH,
-                        involved_events=involved_ids
-                    ))
-                    
+        order, starts, counts, first_pos, _ = features.activity_groups
+
+        # Report per case, activities in order of first appearance
+        flagged = np.flatnonzero(counts > self.threshold)
+        flagged = flagged[np.argsort(first_pos[flagged], kind="stable")]
+        cases = frame.case_of(first_pos[flagged])
+
+        # Positions of each flagged activity were collected by the sort; their
+        # event ids are built in one pass and sliced per group below
+        sizes = counts[flagged].astype(np.int64)
+        bounds = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        within = np.arange(bounds[-1]) - np.repeat(bounds[:-1], sizes)
+        all_ids = frame.event_ids_of(
+            order[np.repeat(starts[flagged], sizes) + within], np.repeat(cases, sizes)
+        )
+        bounds = bounds.tolist()
+
+        for i, (g, case) in enumerate(zip(flagged.tolist(), cases.tolist())):
+            case_id = str(frame.case_ids[case])
+            count = int(counts[g])
+            activity = str(frame.activities[frame.activity_codes[first_pos[g]]])
+            involved_ids = all_ids[bounds[i]:bounds[i + 1]]
+
+            description = (
+                f"Activity '{activity}' was repeated {count} times "
+                f"(threshold: {self.threshold}). Potential rework/loop."
+            )
+
+            anomalies.append(Anomaly(
+                anomaly_id=f"LOOP_{case_id}_{activity}",
+                case_id=case_id,
+                anomaly_type=FrictionType.LOOP.value,
+                description=description,
+                severity=AnomalySeverity.MEDIUM if count <= 5 else AnomalySeverity.HIGH,
+                involved_events=involved_ids,
+                signature=activity
+            ))
+
+        return anomalies
+
+    def _detect_cycles(self, features: FrameFeatures) -> List[Anomaly]:
+        frame = features.frame
+        anomalies = []
+        order, _, _, first_pos, event_group = features.activity_groups
+
+        # Back-edges: each event's previous occurrence of the same activity in the
+        # same case is its predecessor in the grouped order.
+        sorted_groups = event_group[order]
+        repeat = np.flatnonzero(sorted_groups[1:] == sorted_groups[:-1]) + 1
+        returns_to, returns_from = order[repeat], order[repeat - 1]
+        span = returns_to - returns_from
+        keep = span <= self.max_cycle_length
+        returns_to, returns_from = returns_to[keep], returns_from[keep]
+        back_edge = np.argsort(returns_to, kind="stable")
+
+        # Index cycles per case by their canonical step sequence: rotated to start
+        # at the activity the case reached first. Overlapping occurrences are counted
+        # once, so A->B->A->B->A is the cycle A->B->A twice.
+        first_seen = first_pos[event_group]
+        codes = frame.activity_codes
+        cycles: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+        returns_to, returns_from = returns_to[back_edge], returns_from[back_edge]
+        edge_cases = frame.case_of(returns_to)
+        for end, start, case in zip(
+            returns_to.tolist(), returns_from.tolist(), edge_cases.tolist()
+        ):
+            body = codes[start:end].tolist()
+            pivot = int(np.argmin(first_seen[start:end]))
+            steps = tuple(body[pivot:] + body[:pivot])
+            ends = cycles.setdefault((case, steps), [])
+            if not ends or start >= ends[-1]:
+                ends.append(end)
+
+        for (case, steps), ends in cycles.items():
+            if len(ends) < self.min_cycles:
+                continue
+            case_id = str(frame.case_ids[case])
+            labels = [str(frame.activities[c]) for c in steps]
+            path = " -> ".join(labels + labels[:1])
+            positions = sorted({
+                pos for end in ends for pos in range(end - len(steps), end + 1)
+            })
+
+            description = (
+                f"Rework cycle '{path}' occurred {len(ends)} time(s). "
+                "Potential rework/loop."
+            )
+
+            anomalies.append(
+                Anomaly(
+                    anomaly_id=f"LOOP_CYCLE_{case_id}_{'_'.join(labels)}",
+                    case_id=case_id,
+                    anomaly_type=FrictionType.LOOP.value,
+                    description=description,
+                    severity=AnomalySeverity.MEDIUM
+                    if len(ends) <= 4
+                    else AnomalySeverity.HIGH,
+                    involved_events=[frame.event_id(pos, case) for pos in positions],
+                    signature=path,
+                )
+            )
+
         return anomalies
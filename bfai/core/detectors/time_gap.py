@@ -1,91 +1,385 @@
 import numpy as np
-from typing import List, Dict, Tuple
-from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
 
 from bfai.core.detectors.base import BaseDetector
+from bfai.core.exceptions import BaselineError
+from bfai.core.features import FrameFeatures
+from bfai.core.stats import TransitionKey, TransitionStats
 from bfai.models.trace import Trace
+from bfai.models.trace_frame import TraceFrame
 from bfai.models.anomaly import Anomaly, AnomalySeverity
 from bfai.models.friction import FrictionType
 
+SCORING_MODES = ("zscore", "mad", "quantile")
+
+# Scales the MAD to a standard deviation for normally distributed data
+MAD_SCALE = 0.6745
+
+class TimeGapPartial:
+    """
+    Map-step output of `TimeGapDetector.partial` for one shard of cases: the shard's
+    transition statistics plus every gap long enough to be flagged (>= min gap).
+    `TimeGapDetector.reduce` merges the statistics and scores the candidates.
+
+    Events are located by (case_id, offset within the case), so partials computed
+    on different processes or machines can be put back in serial order.
+    """
+
+    def __init__(
+        self,
+        keys: List[TransitionKey],
+        first_case_id: List[str],
+        first_offset: np.ndarray,
+        stats: Optional[TransitionStats],
+        cand_transition: np.ndarray,
+        cand_delta: np.ndarray,
+        cand_case_id: List[str],
+        cand_offset: np.ndarray,
+        cand_event_id: List[str],
+    ):
+        """
+        Args:
+            keys: Transitions present in the shard.
+            first_case_id, first_offset: First source event of each transition.
+            stats: Shard statistics per key (None when scoring against a baseline).
+            cand_transition: Index into `keys` of each candidate gap.
+            cand_delta: Candidate gap durations in seconds.
+            cand_case_id, cand_offset: Target event of each candidate.
+            cand_event_id: Event id of each candidate's target event.
+        """
+        self.keys = keys
+        self.first_case_id = first_case_id
+        self.first_offset = np.asarray(first_offset, dtype=np.int64)
+        self.stats = stats
+        self.cand_transition = np.asarray(cand_transition, dtype=np.int64)
+        self.cand_delta = np.asarray(cand_delta, dtype=np.float64)
+        self.cand_case_id = cand_case_id
+        self.cand_offset = np.asarray(cand_offset, dtype=np.int64)
+        self.cand_event_id = cand_event_id
+
+    @property
+    def case_ids(self) -> Set[str]:
+        """Cases the partial refers to (whose serial order `reduce` needs)."""
+        return set(self.first_case_id) | set(self.cand_case_id)
+
+    def to_dict(self) -> Dict:
+        return {
+            "keys": [list(k) for k in self.keys],
+            "first_case_id": self.first_case_id,
+            "first_offset": self.first_offset.tolist(),
+            "stats": self.stats.to_dict() if self.stats is not None else None,
+            "cand_transition": self.cand_transition.tolist(),
+            "cand_delta": self.cand_delta.tolist(),
+            "cand_case_id": self.cand_case_id,
+            "cand_offset": self.cand_offset.tolist(),
+            "cand_event_id": self.cand_event_id,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TimeGapPartial":
+        return cls(
+            keys=[(a, b) for a, b in data["keys"]],
+            first_case_id=data["first_case_id"],
+            first_offset=data["first_offset"],
+            stats=TransitionStats.from_dict(data["stats"])
+            if data["stats"] is not None
+            else None,
+            cand_transition=data["cand_transition"],
+            cand_delta=data["cand_delta"],
+            cand_case_id=data["cand_case_id"],
+            cand_offset=data["cand_offset"],
+            cand_event_id=data["cand_event_id"],
+        )
+
+
 class TimeGapDetector(BaseDetector):
     """
     Detects statistically significant delays between consecutive events.
     Uses Z-Score to identify outliers for each specific activity transition (A -> B).
+
+    Scoring modes:
+    - "zscore": (gap - mean) / std > z_threshold.
+    - "mad": robust z-score 0.6745 * (gap - median) / MAD > z_threshold.
+    - "quantile": gap above the transition's `quantile` (e.g. p99).
+    The robust modes read medians/percentiles from a bounded-memory
+    `QuantileSketch` per transition, which stays small for heavy-tailed durations
+    and merges across chunks, shards and stored baselines.
+
+    By default the statistics come from the analyzed log itself. With a `baseline`
+    (see `fit` and `TransitionStats`), gaps are scored against stored statistics
+    instead, so only the new events have to be processed.
     """
-    
-    def __init__(self, z_threshold: float = 3.0, min_gap_seconds: float = 60.0):
+
+    requires = ("transition_src", "deltas", "transitions")
+    sharding = "reduce"
+
+    def __init__(
+        self,
+        z_threshold: float = 3.0,
+        min_gap_seconds: float = 60.0,
+        baseline: Optional[TransitionStats] = None,
+        scoring: str = "zscore",
+        quantile: float = 0.99,
+    ):
+        if scoring not in SCORING_MODES:
+            raise ValueError(f"Unknown time gap scoring mode: {scoring}")
         self.z_threshold = z_threshold
         self.min_gap_seconds = min_gap_seconds
+        self.baseline = baseline
+        self.scoring = scoring
+        self.quantile = quantile
+
+    def fit(self, traces: Union[TraceFrame, List[Trace]]) -> TransitionStats:
+        """
+        Computes transition statistics for a log, e.g. to build or extend a baseline
+        (`detector.baseline = detector.baseline.merge(detector.fit(new_log))`).
+        """
+        features = self.features_for(traces)
+        transition, _, keys = features.transitions
+        return TransitionStats.from_groups(
+            keys, transition, features.deltas, sketch=True
+        )
+
+    def _reference(
+        self, stats: TransitionStats
+    ) -> Tuple[np.ndarray, np.ndarray, float]:
+        """
+        Per-transition (center, scale) and the threshold on
+        (gap - center) / scale for the configured scoring mode.
+        """
+        if self.scoring == "zscore":
+            return stats.means, stats.stds, self.z_threshold
+
+        if stats.sketches is None:
+            raise BaselineError(
+                f"Scoring mode '{self.scoring}' needs quantile sketches, which this "
+                "baseline does not have; rebuild it with `bfai baseline --reset`."
+            )
+        if self.scoring == "mad":
+            center = np.array([sk.quantile(0.5) for sk in stats.sketches])
+            scale = np.array([sk.mad() for sk in stats.sketches]) / MAD_SCALE
+            return center, scale, self.z_threshold
+        scale = np.array([sk.quantile(self.quantile) for sk in stats.sketches])
+        return np.zeros(len(stats)), scale, 1.0
+
+    def _describe_reference(self, center: float, scale: float, score: float) -> str:
+        if self.scoring == "mad":
+            return f"Median is {center:.0f}s (Robust Z-Score: {score:.1f})."
+        if self.scoring == "quantile":
+            return f"p{self.quantile * 100:g} is {scale:.0f}s ({score:.1f}x)."
+        return f"Average is {center:.0f}s (Z-Score: {score:.1f})."
+
+    def _score(
+        self, stats: TransitionStats, occ_index: np.ndarray, deltas: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Scores gaps against per-transition statistics.
+
+        Args:
+            stats: Statistics to score against.
+            occ_index: Index into `stats` of each gap's transition (-1: unknown).
+            deltas: Gap durations in seconds.
+
+        Returns:
+            (flagged, z_scores, center, scale) per gap.
+        """
+        # Transitions need >= 3 samples and some spread; gaps must also exceed
+        # the absolute minimum threshold.
+        # Unknown transitions point at an extra empty slot (count 0, never usable)
+        center, scale, threshold = self._reference(stats)
+        slot = np.where(occ_index >= 0, occ_index, len(stats))
+        counts = np.append(stats.counts, 0)[slot]
+        occ_center = np.append(center, 0.0)[slot]
+        occ_scale = np.append(scale, 0.0)[slot]
+        deviation = deltas - occ_center
+        usable = (counts >= 3) & (occ_scale > 0) & (deltas >= self.min_gap_seconds)
+        z_scores = np.zeros_like(deltas)
+        np.divide(deviation, occ_scale, out=z_scores, where=usable)
+        return usable & (z_scores > threshold), z_scores, occ_center, occ_scale
 
-    def detect(self, traces: List[Trace]) -> List[Anomaly]:
+    def _anomaly(
+        self,
+        case_id: str,
+        transition: TransitionKey,
+        event_id: str,
+        dur: float,
+        z_score: float,
+        center: float,
+        scale: float,
+    ) -> Anomaly:
+        act_from, act_to = transition
+        description = (
+            f"Significant delay of {dur:.0f}s detected between '{act_from}' and '{act_to}'. "
+            + self._describe_reference(center, scale, z_score)
+        )
+        # Quantile scores are ratios to the percentile: twice the p99 is severe
+        high_score = 2.0 if self.scoring == "quantile" else 5.0
+
+        return Anomaly(
+            anomaly_id=f"TIME_GAP_{case_id}_{act_from}_{act_to}",
+            case_id=case_id,
+            anomaly_type=FrictionType.TIME_GAP.value,
+            description=description,
+            severity=AnomalySeverity.MEDIUM
+            if z_score < high_score
+            else AnomalySeverity.HIGH,
+            involved_events=[event_id],
+            signature=f"{act_from} -> {act_to}",
+        )
+
+    def detect(
+        self,
+        traces: Union[TraceFrame, List[Trace]],
+        features: Optional[FrameFeatures] = None,
+    ) -> List[Anomaly]:
+        features = self.features_for(traces, features)
+        frame = features.frame
         anomalies = []
-        
+
+        if frame.n_events < 2:
+            return anomalies
+
         # 1. Collect Durations per Transition
-        # transitions[("Activity A", "Activity B")] = [duration1, duration2, ...]
-        transitions: Dict[Tuple[str, str], List[float]] = defaultdict(list)
-        trace_map: Dict[Tuple[str, str], List[Trace]] = defaultdict(list)
-        
-        # We need to map back which specific occurrence caused the gap, 
-        # so we'll store tuples of (duration, case_id, event_to_id)
-        transition_occurrences: Dict[Tuple[str, str], List[Tuple[float, str, str]]] = defaultdict(list)
-
-        for trace in traces:
-            events = trace.events
-            for i in range(len(events) - 1):
-                e1 = events[i]
-                e2 = events[i+1]
-                
-                delta = (e2.timestamp - e1.timestamp).total_seconds()
-                key = (e1.activity, e2.activity)
-                
-                transitions[key].append(delta)
-                transition_occurrences[key].append((delta, trace.case_id, e2.event_id))
-
-        # 2. Analyze Stats per Transition
-        for (act_from, act_to), durations in transitions.items():
-            if len(durations) < 3:
-                # Not enough data for stats
-                continue
-                
-            arr = np.array(durations)
-            mean = np.mean(arr)
-            std = np.std(arr)
-            
-            if std == 0:
-                continue
-                
-            # 3. Identify Outliers
-            count_outliers = 0
-            for dur, case_id, event_id in transition_occurrences[(act_from, act_to)]:
-                # Check Z-Score and absolute minimum threshold
-                if dur < self.min_gap_seconds:
-                    continue
-                    
-                z_score = (dur - mean) / std
-                
-                if z_score > self.z_threshold:
-                    # Found an anomaly
-                    count_outliers += 1
-                    
-                    # Construct Anomaly
-                    # Note: Reporting every single occurrence might be noisy.
-                    # For Step 3, we are asked to "Flag gaps". 
-                    # Let's aggregate or report individual?
-                    # "Input: Normalized Trace objects ... Output: Structured friction findings"
-                    # Usually, we report per-case friction.
-                    
-                    description = (
-                        f"Significant delay of {dur:.0f}s detected between '{act_from}' and '{act_to}'. "
-                        f"Average is {mean:.0f}s (Z-Score: {z_score:.1f})."
-                    )
-                    
-                    anomalies.append(Anomaly(
-                        anomaly_id=f"TIME_GAP_{case_id}_{act_from}_{act_to}",
-                        case_id=case_id,
-                        anomaly_type=FrictionType.TIME_GAP.value,
-                        description=description,
-                        severity=AnomalySeverity.MEDIUM if z_score < 5 else AnomalySeverity.HIGH,
-                        involved_events=[event_id]
-                    ))
-                    
+        src, deltas = features.transition_src, features.deltas
+        transition, first_seen, keys = features.transitions
+
+        # 2. Stats per Transition: the stored baseline, or grouped reductions over
+        # this log (two-pass variance). Transitions unknown to the baseline get -1.
+        if self.baseline is None:
+            stats = TransitionStats.from_groups(
+                keys, transition, deltas, sketch=self.scoring != "zscore"
+            )
+            stats_index = np.arange(len(keys))
+        else:
+            stats = self.baseline
+            stats_index = stats.lookup(keys)
+
+        # 3. Identify Outliers in one masked pass.
+        flagged_mask, z_scores, occ_center, occ_scale = self._score(
+            stats, stats_index[transition], deltas
+        )
+        flagged = np.flatnonzero(flagged_mask)
+
+        # Report in order of each transition's first appearance, then occurrence order
+        flagged = flagged[np.lexsort((flagged, first_seen[transition[flagged]]))]
+        targets = src[flagged] + 1
+        cases = frame.case_of(targets)
+
+        for idx, pos, case in zip(flagged.tolist(), targets.tolist(), cases.tolist()):
+            anomalies.append(self._anomaly(
+                case_id=str(frame.case_ids[case]),
+                transition=keys[transition[idx]],
+                event_id=frame.event_id(pos, case),
+                dur=float(deltas[idx]),
+                z_score=float(z_scores[idx]),
+                center=float(occ_center[idx]),
+                scale=float(occ_scale[idx]),
+            ))
+
         return anomalies
+
+    def partial(
+        self,
+        traces: Union[TraceFrame, List[Trace]],
+        features: Optional[FrameFeatures] = None,
+    ) -> TimeGapPartial:
+        """
+        Map step for sharded runs (see `reduce`).
+
+        Args:
+            traces: One shard of cases.
+            features: Shared derived arrays of the shard, if already built.
+        """
+        features = self.features_for(traces, features)
+        frame = features.frame
+        src, deltas = features.transition_src, features.deltas
+        transition, first_seen, keys = features.transitions
+
+        stats = None
+        if self.baseline is None:
+            stats = TransitionStats.from_groups(
+                keys, transition, deltas, sketch=self.scoring != "zscore"
+            )
+
+        first_src = src[first_seen]
+        first_cases = frame.case_of(first_src)
+        candidates = np.flatnonzero(deltas >= self.min_gap_seconds)
+        targets = src[candidates] + 1
+        cases = frame.case_of(targets)
+        return TimeGapPartial(
+            keys=keys,
+            first_case_id=[str(c) for c in frame.case_ids[first_cases]],
+            first_offset=first_src - frame.offsets[first_cases],
+            stats=stats,
+            cand_transition=transition[candidates],
+            cand_delta=deltas[candidates],
+            cand_case_id=[str(c) for c in frame.case_ids[cases]],
+            cand_offset=targets - frame.offsets[cases],
+            cand_event_id=frame.event_ids_of(targets, cases),
+        )
+
+    @staticmethod
+    def partial_from_dict(data: Dict) -> TimeGapPartial:
+        return TimeGapPartial.from_dict(data)
+
+    def reduce(
+        self,
+        partials: List[TimeGapPartial],
+        case_order: Optional[Callable[[str], Any]] = None,
+    ) -> List[Anomaly]:
+        """
+        Reduce step: merges shard statistics (unless scoring against a baseline),
+        scores all candidates and orders the anomalies like a serial `detect`.
+
+        Args:
+            partials: Map-step outputs of shards holding disjoint sets of cases.
+            case_order: Sort key giving the position of a case_id in the serial
+                        run (default: the case_id itself, i.e. the sorted case
+                        order of normalized logs).
+        """
+        if not partials:
+            return []
+        case_order = case_order or (lambda case_id: case_id)
+        stats = self.baseline
+        if stats is None:
+            stats = partials[0].stats
+            for part in partials[1:]:
+                stats = stats.merge(part.stats)
+
+        first_seen = {}
+        for part in partials:
+            for key, case_id, offset in zip(
+                part.keys, part.first_case_id, part.first_offset.tolist()
+            ):
+                order = (case_order(case_id), offset)
+                if key not in first_seen or order < first_seen[key]:
+                    first_seen[key] = order
+
+        found = []
+        for part in partials:
+            if len(part.cand_delta) == 0:
+                continue
+            occ_index = stats.lookup(part.keys)[part.cand_transition]
+            flagged, z_scores, center, scale = self._score(
+                stats, occ_index, part.cand_delta
+            )
+            for idx in np.flatnonzero(flagged).tolist():
+                key = part.keys[part.cand_transition[idx]]
+                case_id = part.cand_case_id[idx]
+                order = (
+                    first_seen[key],
+                    case_order(case_id),
+                    int(part.cand_offset[idx]),
+                )
+                found.append((order, self._anomaly(
+                    case_id=case_id,
+                    transition=key,
+                    event_id=part.cand_event_id[idx],
+                    dur=float(part.cand_delta[idx]),
+                    z_score=float(z_scores[idx]),
+                    center=float(center[idx]),
+                    scale=float(scale[idx]),
+                )))
+
+        found.sort(key=lambda item: item[0])
+        return [anomaly for _, anomaly in found]
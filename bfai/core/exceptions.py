@@ -1,3 +1,6 @@
+from typing import Optional
+
+
 class BFAIError(Exception):
     """Base exception for BFAI."""
     pass
@@ -9,3 +12,27 @@ class DataIngestionError(BFAIError):
 class SchemaValidationError(BFAIError):
     """Raised when data does not match expected schema."""
     pass
+
+class BaselineError(BFAIError):
+    """Raised when a stored detector baseline cannot be read or written."""
+    pass
+
+class ShardMergeError(BFAIError):
+    """Raised when partial results of a sharded run cannot be combined."""
+    pass
+
+class NotFoundError(BFAIError, LookupError):
+    """Raised when a requested log or case is not available."""
+    pass
+
+class LLMProviderError(BFAIError):
+    """Raised when an LLM provider request fails."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        # Seconds the provider asked us to wait before retrying (Retry-After)
+        self.retry_after = retry_after
+
+class CircuitOpenError(LLMProviderError):
+    """Raised without calling the provider while its circuit breaker is open."""
+    pass
@@ -0,0 +1,115 @@
+from functools import cached_property
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from bfai.core.stats import TransitionKey
+from bfai.models.trace_frame import HUMAN_CODE, TraceFrame
+
+
+class FrameFeatures:
+    """
+    Derived per-event arrays shared by detectors.
+
+    Every feature is computed on first access and cached, so when the engine hands
+    one FrameFeatures to all detectors (fused execution), each array is built once
+    per log no matter how many detectors consume it. Detectors list the features
+    they use in `BaseDetector.requires`.
+
+    A transition is a pair of consecutive events of the same case; transition
+    arrays are aligned with `transition_src`.
+    """
+
+    def __init__(self, frame: TraceFrame):
+        self.frame = frame
+
+    def prepare(self, names: Iterable[str]) -> "FrameFeatures":
+        """Computes the named features up front (e.g. all detector requirements)."""
+        for name in names:
+            getattr(self, name)
+        return self
+
+    @cached_property
+    def case_of_event(self) -> np.ndarray:
+        """Case index of every event."""
+        return np.repeat(
+            np.arange(self.frame.n_cases, dtype=np.int64), self.frame.case_lengths
+        )
+
+    @cached_property
+    def transition_src(self) -> np.ndarray:
+        """Position of each transition's source (all but each case's last event)."""
+        frame = self.frame
+        starts_transition = np.ones(max(frame.n_events - 1, 0), dtype=bool)
+        case_ends = frame.offsets[1:] - 1
+        starts_transition[
+            case_ends[(case_ends >= 0) & (case_ends < frame.n_events - 1)]
+        ] = False
+        return np.flatnonzero(starts_transition)
+
+    @cached_property
+    def transition_case(self) -> np.ndarray:
+        """Case index of every transition."""
+        return self.case_of_event[self.transition_src]
+
+    @cached_property
+    def deltas(self) -> np.ndarray:
+        """Duration of every transition in seconds."""
+        src = self.transition_src
+        return (self.frame.timestamps[src + 1] - self.frame.timestamps[src]) / 1_000_000
+
+    @cached_property
+    def human_mask(self) -> np.ndarray:
+        """True for transitions whose source event was performed by a human."""
+        return self.frame.actor_type_codes[self.transition_src] == HUMAN_CODE
+
+    @cached_property
+    def transitions(self) -> Tuple[np.ndarray, np.ndarray, List[TransitionKey]]:
+        """
+        (Activity A, Activity B) grouping of the transitions.
+
+        Returns:
+            (transition, first_seen, keys): group index of every transition into
+            `keys`, the first transition of each group, and the (from, to) labels.
+        """
+        frame = self.frame
+        src = self.transition_src
+        n_activities = max(len(frame.activities), 1)
+        pair_codes = (
+            frame.activity_codes[src].astype(np.int64) * n_activities
+            + frame.activity_codes[src + 1]
+        )
+        unique_codes, first_seen, transition = np.unique(
+            pair_codes, return_index=True, return_inverse=True
+        )
+        keys = [
+            (
+                str(frame.activities[code // n_activities]),
+                str(frame.activities[code % n_activities]),
+            )
+            for code in unique_codes.tolist()
+        ]
+        return transition, first_seen, keys
+
+    @cached_property
+    def activity_groups(
+        self,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Event positions grouped by (case, activity) with one stable sort.
+
+        Returns:
+            (order, starts, counts, first_pos, group): event positions sorted by group
+            (ascending within a group), each group's start in `order`, its size, its
+            first position in the frame, and the group of every event.
+        """
+        frame = self.frame
+        keys = self.case_of_event * max(len(frame.activities), 1) + frame.activity_codes
+        order = np.argsort(keys, kind="stable")
+        _, starts, group, counts = np.unique(
+            keys[order], return_index=True, return_inverse=True, return_counts=True
+        )
+        first_pos = order[starts]
+        event_group = np.empty(frame.n_events, dtype=np.int64)
+        event_group[order] = group
+        return order, starts, counts, first_pos, event_group
@@ -1,10 +1,32 @@
-from typing import List
-from bfai.models.trace import Trace
-from bfai.models.anomaly import Anomaly
+import hashlib
+import json
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+
 from bfai.core.detectors.base import BaseDetector
-from bfai.core.detectors.time_gap import TimeGapDetector
-from bfai.core.detectors.loop import LoopDetector
 from bfai.core.detectors.human_dependency import HumanDependencyDetector
+from bfai.core.detectors.loop import LoopDetector
+from bfai.core.detectors.time_gap import TimeGapDetector
+from bfai.core.exceptions import ShardMergeError
+from bfai.core.features import FrameFeatures
+from bfai.core.parallel import (
+    case_shards,
+    check_partials,
+    merge_shards,
+    referenced_case_ids,
+    run_shard,
+    run_sharded,
+    shard_from_dict,
+    shard_to_dict,
+)
+from bfai.core.stats import TransitionStats
+from bfai.models.anomaly import Anomaly
+from bfai.models.trace import Trace
+from bfai.models.trace_frame import TraceFrame
+from bfai.models.workload import ActorWorkload
+
 
 class FrictionEngine:
     """
@@ -12,28 +34,199 @@ class FrictionEngine:
     Orchestrates all registered detectors.
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        baseline: Optional[TransitionStats] = None,
+        scoring: str = "zscore",
+        quantile: float = 0.99,
+        loop_mode: str = "count",
+        fused: bool = True,
+        workers: int = 1,
+    ):
+        """
+        Args:
+            baseline: Stored transition statistics for the time gap detector
+                      (default: statistics of the analyzed log itself).
+            scoring: Time gap scoring mode ("zscore", "mad" or "quantile").
+            quantile: Percentile threshold for the "quantile" scoring mode.
+            loop_mode: Loop detection mode ("count" or "cycle").
+            fused: Compute the derived arrays all detectors need once and share
+                   them (otherwise each detector derives its own).
+            workers: Number of processes; above 1, cases are sharded by a hash of
+                     their case_id (see `core.parallel.run_sharded`). The result is
+                     the same as a serial run.
+        """
         self.detectors: List[BaseDetector] = [
-            TimeGapDetector(),
-            LoopDetector(),
+            TimeGapDetector(baseline=baseline, scoring=scoring, quantile=quantile),
+            LoopDetector(mode=loop_mode),
             HumanDependencyDetector()
         ]
+        self.baseline = baseline
+        self.fused = fused
+        self.workers = workers
+        # Detector configuration recorded in partial results of sharded runs
+        self.options = {
+            "scoring": scoring,
+            "quantile": quantile,
+            "loop_mode": loop_mode,
+            "baseline": baseline.digest() if baseline is not None else None,
+        }
 
-    def run_analysis(self, traces: List[Trace]) -> List[Anomaly]:
+    @property
+    def fingerprint(self) -> str:
+        """
+        Hash of everything the detectors' output depends on (options, including
+        the baseline's digest), for caching it. `fused` and `workers` do not
+        change results and are left out.
+        """
+        return hashlib.sha256(
+            json.dumps(self.options, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def run_analysis(self, traces: Union[TraceFrame, List[Trace]]) -> List[Anomaly]:
         """
         Runs all detectors on the provided traces.
+        A list of Trace objects is converted to a TraceFrame once, up front; in fused
+        mode the features every detector `requires` are also derived once, up front.
         """
+        frame = TraceFrame.coerce(traces)
+        if self.workers > 1:
+            return run_sharded(self.detectors, frame, self.workers)
+        
+        features = None
+        if self.fused:
+            features = FrameFeatures(frame).prepare(
+                dict.fromkeys(name for d in self.detectors for name in d.requires)
+            )
         all_anomalies = []
         
         for detector in self.detectors:
             try:
-                found = detector.detect(traces)
+                found = detector.detect(frame, features)
                 all_anomalies.extend(found)
             except Exception as e:
                 # Log error but don't crash whole engine?
                 # For Step 3, let's just re-raise or print.
                 # "Favor explicit errors"
-                print(f"Error in detector {type(detector).__name__}: {e}")
+                print(
+                    f"Error in detector {type(detector).__name__}: {e}", file=sys.stderr
+                )
                 raise e
-                
+
         return all_anomalies
+
+    def run_streaming(
+        self, batches: Iterable[Union[TraceFrame, List[Trace]]]
+    ) -> Iterator[List[Anomaly]]:
+        """
+        Runs the detectors over a log arriving as batches of complete cases (see
+        `ingestion.loader.iter_trace_batches`), holding one batch at a time.
+
+        Per-case detectors report each batch's anomalies as soon as it has been
+        processed. Time gaps are scored against statistics of the whole log, so
+        they are the only barrier: each batch contributes its statistics and
+        candidate gaps, which are scored after the last batch. The anomalies are
+        the same as `run_analysis` finds on the whole log; only their order differs
+        (per-case findings batch by batch, then all time gaps).
+
+        Yields:
+            List[Anomaly]: Per-case detector anomalies of each batch, then the
+            anomalies of each reducible detector.
+
+        Raises:
+            ValueError: If a detector needs the whole log at once.
+        """
+        serial = [
+            type(d).__name__
+            for d in self.detectors
+            if d.sharding not in ("case", "reduce")
+        ]
+        if serial:
+            raise ValueError(
+                f"Detectors cannot run on batches of cases: {', '.join(serial)}"
+            )
+
+        partials: List[List[Any]] = [[] for _ in self.detectors]
+        states: List[List[Dict[str, Any]]] = [[] for _ in self.detectors]
+        for batch in batches:
+            found = []
+            for index, result in enumerate(
+                run_shard(TraceFrame.coerce(batch), self.detectors)
+            ):
+                if self.detectors[index].sharding == "case":
+                    found.extend(result["anomalies"])
+                    states[index].append(result["state"])
+                else:
+                    partials[index].append(result)
+            if found:
+                yield found
+
+        # Barrier: everything left needs statistics of all batches
+        for detector, detector_states, detector_partials in zip(
+            self.detectors, states, partials
+        ):
+            if detector.sharding == "case":
+                detector.combine(detector_states)
+            else:
+                yield detector.reduce(detector_partials)
+
+    def analyze_shard(
+        self, traces: Union[TraceFrame, List[Trace]], shard: int, n_shards: int
+    ) -> Dict[str, Any]:
+        """
+        Runs the detectors on the cases of one shard (by case_id hash, see
+        `core.parallel.case_shards`) and returns a JSON-serializable partial result
+        for `merge_partials`.
+        """
+        frame = TraceFrame.coerce(traces)
+        if not 0 <= shard < n_shards:
+            raise ValueError(f"Shard {shard} out of range for {n_shards} shards")
+        cases = np.flatnonzero(case_shards(frame.case_ids, n_shards) == shard)
+        shard_frame = frame.take(cases)
+        results = run_shard(shard_frame, self.detectors)
+        # Serial position of every case the results mention, for merge_partials
+        positions = {
+            case_id: int(cases[shard_frame.case_index(case_id)])
+            for case_id in referenced_case_ids(self.detectors, results)
+        }
+        return shard_to_dict(
+            self.detectors, results, shard, n_shards, self.options, positions
+        )
+
+    def merge_partials(self, partials: List[Dict[str, Any]]) -> List[Anomaly]:
+        """
+        Combines the partial results of all shards of a run into the anomalies of
+        the whole log (same order as a serial run of a normalized log). Time gaps
+        are scored against statistics merged over all shards.
+
+        Raises:
+            ShardMergeError: If the partials do not form one complete run with
+                             this engine's options.
+        """
+        options = check_partials(partials)
+        if options != self.options:
+            raise ShardMergeError(
+                f"Partials were produced with options {options}, expected "
+                f"{self.options}"
+            )
+        partials = sorted(partials, key=lambda p: p["shard"])
+        shard_results = [shard_from_dict(self.detectors, p) for p in partials]
+        positions = {
+            case_id: pos
+            for p in partials
+            for case_id, pos in p["case_positions"].items()
+        }
+        merged = merge_shards(self.detectors, shard_results, positions.__getitem__)
+        if len(merged) != len(self.detectors):
+            raise ShardMergeError(
+                "Some detectors cannot be sharded; run them without --shard."
+            )
+        return [a for index in range(len(self.detectors)) for a in merged[index]]
+
+    @property
+    def actor_workload(self) -> List[ActorWorkload]:
+        """Per-actor human workload from the last run (largest first)."""
+        for detector in self.detectors:
+            if isinstance(detector, HumanDependencyDetector):
+                return detector.workload
+        return []
@@ -0,0 +1,241 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from bfai.core.detectors.base import BaseDetector
+from bfai.core.exceptions import ShardMergeError
+from bfai.core.features import FrameFeatures
+from bfai.models.anomaly import Anomaly
+from bfai.models.trace_frame import TraceFrame
+
+PARTIAL_FORMAT = "bfai-partial"
+PARTIAL_VERSION = 2
+
+
+def case_shards(case_ids: np.ndarray, n_shards: int) -> np.ndarray:
+    """
+    Shard of each case: a stable hash of its case_id modulo `n_shards` (the same
+    routing as the streaming CSV reader), independent of process, machine and run.
+    """
+    keys = pd.util.hash_pandas_object(
+        pd.Series(np.asarray(case_ids).astype(str)), index=False
+    )
+    return (keys.to_numpy() % np.uint64(n_shards)).astype(np.int64)
+
+
+def run_shard(shard: TraceFrame, detectors: List[BaseDetector]) -> List[Any]:
+    """
+    Runs the shardable detectors on one shard of cases, sharing one set of features.
+
+    Returns:
+        One result per detector with sharding "case" or "reduce", in order:
+        {"anomalies": [...], "state": {...}} for per-case detectors, the output of
+        `partial` for reducible ones.
+    """
+    remote = [d for d in detectors if d.sharding in ("case", "reduce")]
+    features = FrameFeatures(shard).prepare(
+        dict.fromkeys(name for d in remote for name in d.requires)
+    )
+    results = []
+    for detector in remote:
+        if detector.sharding == "case":
+            anomalies = detector.detect(shard, features)
+            results.append({"anomalies": anomalies, "state": detector.shard_state()})
+        else:
+            results.append(detector.partial(shard, features))
+    return results
+
+
+def merge_shards(
+    detectors: List[BaseDetector],
+    shard_results: List[List[Any]],
+    case_order: Optional[Callable[[str], Any]] = None,
+) -> Dict[int, List[Anomaly]]:
+    """
+    Combines `run_shard` results of shards holding disjoint sets of cases.
+
+    Args:
+        detectors: The detectors the shards ran, in engine order.
+        shard_results: One `run_shard` result per shard.
+        case_order: Sort key giving the position of a case_id in a serial run
+                    (default: the case_id text, which is the serial order only
+                    for text case ids; pass the frame's `case_index` or the
+                    positions recorded in partials otherwise).
+
+    Returns:
+        Dict[int, List[Anomaly]]: Anomalies per detector index, in serial order.
+    """
+    case_order = case_order or (lambda case_id: case_id)
+    remote = [i for i, d in enumerate(detectors) if d.sharding in ("case", "reduce")]
+    merged: Dict[int, List[Anomaly]] = {}
+
+    for slot, index in enumerate(remote):
+        detector = detectors[index]
+        parts = [results[slot] for results in shard_results]
+        if detector.sharding == "case":
+            found = [a for part in parts for a in part["anomalies"]]
+            # Shards keep case order internally; a stable sort restores global order
+            found.sort(key=lambda a: case_order(a.case_id))
+            detector.combine([part["state"] for part in parts])
+            merged[index] = found
+        else:
+            merged[index] = detector.reduce(parts, case_order)
+    return merged
+
+
+def run_sharded(
+    detectors: List[BaseDetector], frame: TraceFrame, workers: int
+) -> List[Anomaly]:
+    """
+    Runs detectors over case shards in a process pool.
+
+    Cases are sharded by a hash of their case_id. Per-case detectors run entirely
+    inside the workers; reducible detectors (time gaps) send back mergeable
+    statistics and candidates for a reduce step here; anything else runs on the
+    whole frame in this process. Anomalies are put back in the order of a serial
+    run: detector order, then case order (per-case detectors) or the detector's
+    own ordering (`reduce`).
+
+    Args:
+        detectors: Detectors in engine order.
+        frame: The whole log.
+        workers: Number of worker processes (and shards).
+
+    Returns:
+        List[Anomaly]: Same anomalies, same order as running the detectors serially.
+    """
+    shard_of = case_shards(frame.case_ids, workers)
+    shards = [np.flatnonzero(shard_of == s) for s in range(workers)]
+    shards = [cases for cases in shards if len(cases)]
+
+    with ProcessPoolExecutor(max_workers=min(workers, max(len(shards), 1))) as pool:
+        futures = [
+            pool.submit(run_shard, frame.take(cases), detectors) for cases in shards
+        ]
+        shard_results = [future.result() for future in futures]
+
+    merged = merge_shards(detectors, shard_results, frame.case_index)
+
+    all_anomalies: List[Anomaly] = []
+    features = None
+    for index, detector in enumerate(detectors):
+        if index in merged:
+            all_anomalies.extend(merged[index])
+        else:
+            if features is None:
+                features = FrameFeatures(frame)
+            all_anomalies.extend(detector.detect(frame, features))
+    return all_anomalies
+
+
+# ----------------------------------------------------------------------
+# Partial results of distributed runs (`bfai analyze --shard`, `bfai merge`)
+# ----------------------------------------------------------------------
+
+def referenced_case_ids(detectors: List[BaseDetector], results: List[Any]) -> Set[str]:
+    """Case ids that `run_shard` results refer to (anomalies and reduce candidates)."""
+    remote = [d for d in detectors if d.sharding in ("case", "reduce")]
+    case_ids: Set[str] = set()
+    for detector, result in zip(remote, results):
+        if detector.sharding == "case":
+            case_ids.update(a.case_id for a in result["anomalies"])
+        else:
+            case_ids.update(result.case_ids)
+    return case_ids
+
+
+def shard_to_dict(
+    detectors: List[BaseDetector],
+    results: List[Any],
+    shard: int,
+    n_shards: int,
+    options: Dict[str, Any],
+    case_positions: Dict[str, int],
+) -> Dict[str, Any]:
+    """
+    JSON-serializable partial result of one shard.
+
+    `case_positions` maps the case ids the results refer to onto their position in
+    the whole log, so merged anomalies follow the serial case order whatever the
+    type of the original case ids (numeric ids do not sort like their text).
+    """
+    remote = [d for d in detectors if d.sharding in ("case", "reduce")]
+    entries = []
+    for detector, result in zip(remote, results):
+        entry: Dict[str, Any] = {"name": type(detector).__name__}
+        if detector.sharding == "case":
+            entry["anomalies"] = [
+                a.model_dump(mode="json") for a in result["anomalies"]
+            ]
+            entry["state"] = result["state"]
+        else:
+            entry["partial"] = result.to_dict()
+        entries.append(entry)
+    return {
+        "format": PARTIAL_FORMAT,
+        "version": PARTIAL_VERSION,
+        "shard": shard,
+        "n_shards": n_shards,
+        "options": options,
+        "case_positions": case_positions,
+        "detectors": entries,
+    }
+
+
+def shard_from_dict(detectors: List[BaseDetector], data: Dict[str, Any]) -> List[Any]:
+    """Inverse of `shard_to_dict` for the same detector configuration."""
+    remote = [d for d in detectors if d.sharding in ("case", "reduce")]
+    entries = data.get("detectors", [])
+    if [e.get("name") for e in entries] != [type(d).__name__ for d in remote]:
+        raise ShardMergeError(
+            f"Partial for shard {data.get('shard')} was produced by different detectors"
+        )
+    results = []
+    for detector, entry in zip(remote, entries):
+        if detector.sharding == "case":
+            results.append({
+                "anomalies": [Anomaly(**a) for a in entry["anomalies"]],
+                "state": entry["state"],
+            })
+        else:
+            results.append(detector.partial_from_dict(entry["partial"]))
+    return results
+
+
+def check_partials(partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Validates that partial results form one complete run and returns its options.
+
+    Raises:
+        ShardMergeError: On unknown formats, mixed runs, or missing/duplicate shards.
+    """
+    if not partials:
+        raise ShardMergeError("No partial results to merge.")
+    for data in partials:
+        if data.get("format") != PARTIAL_FORMAT:
+            raise ShardMergeError(
+                "Not a BFAI partial result (see `bfai analyze --shard`)."
+            )
+        if data.get("version") != PARTIAL_VERSION:
+            raise ShardMergeError(
+                f"Partial result version {data.get('version')} is not supported "
+                f"(expected {PARTIAL_VERSION}); rerun `bfai analyze --shard`."
+            )
+
+    n_shards = partials[0]["n_shards"]
+    options = partials[0]["options"]
+    if any(p["n_shards"] != n_shards or p["options"] != options for p in partials):
+        raise ShardMergeError(
+            "Partials come from runs with different shard counts or options."
+        )
+
+    shards = sorted(p["shard"] for p in partials)
+    if shards != list(range(n_shards)):
+        missing = sorted(set(range(n_shards)) - set(shards))
+        raise ShardMergeError(
+            f"Expected shards 0..{n_shards - 1} exactly once; got {shards}"
+            + (f" (missing: {missing})" if missing else "")
+        )
+    return options
@@ -1,28 +1,289 @@
-from typing import List
+import asyncio
+import hashlib
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+    Union,
+)
+
+from bfai.core.clustering import ClusterKey, cluster_anomalies, cluster_key, fan_out
+from bfai.core.exceptions import CircuitOpenError
+from bfai.llm.batching import make_batches, match_results
+from bfai.llm.cache import EnrichmentCache, enrichment_key
+from bfai.llm.llm_interface import AsyncLLMProvider, LLMProvider
+from bfai.llm.rate_limit import TokenBucket
 from bfai.models.anomaly import Anomaly
-from bfai.llm.llm_interface import LLMProvider
+
+T = TypeVar("T")
 
 class ReasoningEngine:
     """
     Orchestrates the enrichment of anomalies using the selected LLM provider.
+
+    Synchronous providers are called one request at a time. Async providers run
+    concurrently (up to `concurrency` requests in flight), optionally rate limited,
+    with a timeout per request and retries with exponential backoff (or the delay
+    the provider asked for, if longer).
+
+    With `batch_size` > 1, anomalies are packed into batches bounded by item count
+    and estimated prompt tokens and sent through `enrich_batch`; results are mapped
+    back by anomaly_id. A failed batch falls back to per-anomaly requests, and an
+    anomaly whose enrichment fails is returned unchanged. Results keep the input
+    order.
+
+    With `cluster`, anomalies describing the same finding in different cases (same
+    type, signature and severity) are enriched once, through a representative, and
+    the result is copied to the other members of the cluster.
+
+    With a `cache`, enrichments are looked up by content hash first, and only
+    anomalies not seen before (by this provider and prompt version) are sent.
     """
-    
-    def __init__(self, provider: LLMProvider):
+
+    def __init__(
+        self,
+        provider: Union[LLMProvider, AsyncLLMProvider],
+        concurrency: int = 8,
+        rate_limit: Optional[float] = None,
+        timeout: Optional[float] = 30.0,
+        max_retries: int = 2,
+        backoff: float = 0.5,
+        batch_size: int = 1,
+        batch_tokens: Optional[int] = None,
+        cluster: bool = False,
+        cache: Optional[EnrichmentCache] = None,
+    ):
+        """
+        Args:
+            provider: Sync or async LLM provider.
+            concurrency: Max concurrent requests (async providers).
+            rate_limit: Max requests per second (async providers; None: unlimited).
+            timeout: Seconds per request before it is abandoned (None: no timeout).
+            max_retries: Retries after a failed or timed-out request (async providers).
+            backoff: Delay before the first retry; doubles on every further retry.
+            batch_size: Max anomalies per request (1: no batching).
+            batch_tokens: Max estimated prompt tokens per batch (None: unbounded).
+            cluster: Enrich one representative per cluster of similar anomalies.
+            cache: Persistent enrichment cache (None: always call the provider).
+        """
         self.provider = provider
-        
+        self.concurrency = concurrency
+        self.rate_limit = rate_limit
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.batch_size = batch_size
+        self.batch_tokens = batch_tokens
+        self.cluster = cluster
+        self.cache = cache
+        # Anomalies enriched through their cluster's representative in the last run
+        self.calls_saved = 0
+        # Enrichments served from the cache in the last run
+        self.cache_hits = 0
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Hash of the provider, its prompt version and the clustering setting, for
+        caching enrichment results. Concurrency, batching and retry settings do
+        not change results and are left out.
+        """
+        config = [self.provider.provider_id, self.provider.prompt_version, self.cluster]
+        return hashlib.sha256(json.dumps(config).encode("utf-8")).hexdigest()
+
     def analyze(self, anomalies: List[Anomaly]) -> List[Anomaly]:
         """
         Enriches a list of anomalies.
         """
-        enriched_results = []
-        for anomaly in anomalies:
+        # Counters describe this call only, also when the engine is reused
+        self.calls_saved = 0
+        self.cache_hits = 0
+        if not self.cluster:
+            return self._enrich(anomalies)
+
+        clusters = cluster_anomalies(anomalies)
+        self.calls_saved = len(anomalies) - len(clusters)
+        representatives = self._enrich([anomalies[members[0]] for members in clusters])
+        return fan_out(anomalies, clusters, representatives)
+
+    def iter_analyze(self, batches: Iterable[List[Anomaly]]) -> Iterator[Anomaly]:
+        """
+        Enriches anomalies arriving in batches (see `FrictionEngine.run_streaming`),
+        yielding each batch's anomalies as soon as the batch is enriched.
+
+        With `cluster`, a representative enriched in an earlier batch is reused for
+        later members of its cluster, so each finding is sent once per run, as with
+        `analyze`. `calls_saved` and `cache_hits` cover the whole run once the
+        iterator is exhausted.
+        """
+        known: Dict[ClusterKey, Anomaly] = {}
+        calls_saved = 0
+        cache_hits = 0
+        for anomalies in batches:
+            # `_enrich` reports the hits of its own call
+            self.cache_hits = 0
+            if not self.cluster:
+                enriched = self._enrich(anomalies)
+                cache_hits += self.cache_hits
+            else:
+                clusters = cluster_anomalies(anomalies)
+                representatives = [anomalies[members[0]] for members in clusters]
+                new = [rep for rep in representatives if cluster_key(rep) not in known]
+                if new:
+                    for rep, result in zip(new, self._enrich(new)):
+                        known[cluster_key(rep)] = result
+                    cache_hits += self.cache_hits
+                calls_saved += len(anomalies) - len(new)
+                enriched = fan_out(
+                    anomalies,
+                    clusters,
+                    [known[cluster_key(rep)] for rep in representatives],
+                )
+            self.calls_saved, self.cache_hits = calls_saved, cache_hits
+            yield from enriched
+
+    def _enrich(self, anomalies: List[Anomaly]) -> List[Anomaly]:
+        if self.cache is None:
+            return self._call_provider(anomalies)
+
+        keys = [enrichment_key(self.provider, a) for a in anomalies]
+        cached = self.cache.get_many(keys)
+        misses = [i for i, key in enumerate(keys) if key not in cached]
+        self.cache_hits = len(anomalies) - len(misses)
+
+        results = list(anomalies)
+        for i, key in enumerate(keys):
+            if key in cached:
+                root_cause, recommendation = cached[key]
+                results[i] = anomalies[i].model_copy(
+                    update={"root_cause": root_cause, "recommendation": recommendation}
+                )
+        fresh = {}
+        for i, enriched in zip(
+            misses, self._call_provider([anomalies[i] for i in misses])
+        ):
+            results[i] = enriched
+            # Failed enrichments come back unchanged and are not cached
+            if enriched.root_cause is not None or enriched.recommendation is not None:
+                fresh[keys[i]] = (enriched.root_cause, enriched.recommendation)
+        if fresh:
+            self.cache.put_many(fresh)
+        return results
+
+    def _call_provider(self, anomalies: List[Anomaly]) -> List[Anomaly]:
+        if isinstance(self.provider, AsyncLLMProvider):
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return asyncio.run(self.analyze_async(anomalies))
+            # Called from async code (notebook, async service): asyncio.run cannot
+            # nest, so run the requests on their own loop in a worker thread
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                return executor.submit(
+                    asyncio.run, self.analyze_async(anomalies)
+                ).result()
+
+        if self.batch_size <= 1:
+            return [self._enrich_one(anomaly) for anomaly in anomalies]
+
+        enriched_results = list(anomalies)
+        for batch in make_batches(anomalies, self.batch_size, self.batch_tokens):
+            items = [anomalies[i] for i in batch]
             try:
-                enriched = self.provider.enrich_anomaly(anomaly)
-                enriched_results.append(enriched)
+                enriched = match_results(items, self.provider.enrich_batch(items))
             except Exception as e:
-                # Fallback: just return original if enrichment fails
-                # In Step 4, we want robustness.
-                print(f"Reasoning failed for anomaly {anomaly.anomaly_id}: {e}")
-                enriched_results.append(anomaly)
-                
+                print(
+                    f"Reasoning failed for batch of {len(items)} anomalies: {e}",
+                    file=sys.stderr,
+                )
+                enriched = [self._enrich_one(anomaly) for anomaly in items]
+            for i, result in zip(batch, enriched):
+                enriched_results[i] = result
+
         return enriched_results
+
+    def _enrich_one(self, anomaly: Anomaly) -> Anomaly:
+        try:
+            return self.provider.enrich_anomaly(anomaly)
+        except Exception as e:
+            # Fallback: just return original if enrichment fails
+            # In Step 4, we want robustness.
+            print(
+                f"Reasoning failed for anomaly {anomaly.anomaly_id}: {e}",
+                file=sys.stderr,
+            )
+            return anomaly
+
+    async def analyze_async(self, anomalies: List[Anomaly]) -> List[Anomaly]:
+        """
+        Enriches a list of anomalies with an async provider, concurrently.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        bucket = TokenBucket(self.rate_limit) if self.rate_limit else None
+
+        async def enrich(anomaly: Anomaly) -> Anomaly:
+            async with semaphore:
+                result = await self._request(
+                    lambda: self.provider.enrich_anomaly(anomaly), bucket,
+                    f"anomaly {anomaly.anomaly_id}"
+                )
+            return anomaly if result is None else result
+
+        async def enrich_batch(items: List[Anomaly]) -> List[Anomaly]:
+            async with semaphore:
+                result = await self._request(
+                    lambda: self.provider.enrich_batch(items), bucket,
+                    f"batch of {len(items)} anomalies"
+                )
+            if result is None:
+                return list(await asyncio.gather(*(enrich(a) for a in items)))
+            return match_results(items, result)
+
+        if self.batch_size <= 1:
+            return list(await asyncio.gather(*(enrich(a) for a in anomalies)))
+
+        batches = make_batches(anomalies, self.batch_size, self.batch_tokens)
+        batch_results = await asyncio.gather(
+            *(enrich_batch([anomalies[i] for i in batch]) for batch in batches)
+        )
+        enriched_results = list(anomalies)
+        for batch, results in zip(batches, batch_results):
+            for i, result in zip(batch, results):
+                enriched_results[i] = result
+        return enriched_results
+
+    async def _request(
+        self,
+        call: Callable[[], Awaitable[T]],
+        bucket: Optional[TokenBucket],
+        label: str,
+    ) -> Optional[T]:
+        """One request with rate limiting, timeout and retries; None if all fail."""
+        for attempt in range(self.max_retries + 1):
+            if bucket is not None:
+                await bucket.acquire()
+            try:
+                return await asyncio.wait_for(call(), self.timeout)
+            except Exception as e:
+                # An open circuit breaker means the provider is down: fail fast
+                if attempt == self.max_retries or isinstance(e, CircuitOpenError):
+                    reason = (
+                        "timed out" if isinstance(e, asyncio.TimeoutError) else str(e)
+                    )
+                    print(f"Reasoning failed for {label}: {reason}", file=sys.stderr)
+                    return None
+                delay = self.backoff * 2**attempt
+                # Wait at least as long as the provider asked (Retry-After)
+                retry_after = getattr(e, "retry_after", None)
+                await asyncio.sleep(
+                    max(delay, retry_after) if retry_after is not None else delay
+                )
+        return None
@@ -0,0 +1,81 @@
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+
+from bfai.models.anomaly import Anomaly
+from bfai.models.trace_frame import TraceFrame
+from bfai.models.workload import ActorWorkload
+
+
+def render_report(
+    input_name: str,
+    frame: TraceFrame,
+    anomalies: List[Anomaly],
+    workload: List[ActorWorkload],
+    generated_at: Optional[datetime] = None,
+) -> str:
+    """
+    Renders the Markdown friction report.
+
+    Args:
+        input_name: Name of the analyzed log, shown in the header.
+        frame: The analyzed traces.
+        anomalies: Enriched anomalies of the log.
+        workload: Human workload per actor (`FrictionEngine.actor_workload`).
+        generated_at: Report date (default: now).
+
+    Returns:
+        str: The report as Markdown.
+    """
+    generated_at = generated_at or datetime.now()
+    total_cases = frame.n_cases
+    avg_duration = (
+        float(frame.duration_seconds.sum()) / total_cases if total_cases > 0 else 0
+    )
+    total_friction = len(anomalies)
+
+    friction_counts = Counter(a.anomaly_type for a in anomalies)
+
+    md_lines = []
+    md_lines.append("# Business Friction Analysis Report")
+    md_lines.append(f"**Date:** {generated_at.strftime('%Y-%m-%d %H:%M:%S')}")
+    md_lines.append(f"**Input:** `{input_name}`")
+    md_lines.append("")
+
+    md_lines.append("## Executive Summary")
+    md_lines.append(f"- **Total Cases Analyzed:** {total_cases}")
+    md_lines.append(f"- **Average Duration:** {avg_duration:.2f}s")
+    md_lines.append(f"- **Total Friction Points Detected:** {total_friction}")
+    md_lines.append("")
+
+    md_lines.append("## Friction Distribution")
+    md_lines.append("| Friction Type | Count |")
+    md_lines.append("|---|---|")
+    for ftype, count in friction_counts.items():
+        md_lines.append(f"| {ftype} | {count} |")
+    md_lines.append("")
+
+    if workload:
+        md_lines.append("## Human Workload by Actor")
+        md_lines.append(
+            "| Actor | Human Time | Cases | Flagged Cases | Share of Case Duration |"
+        )
+        md_lines.append("|---|---|---|---|---|")
+        for w in workload[:10]:
+            md_lines.append(
+                f"| {w.actor or '(unknown)'} | {w.human_seconds:.0f}s | {w.cases} | "
+                f"{w.flagged_cases} | {w.share:.1%} |"
+            )
+        md_lines.append("")
+
+    md_lines.append("## Top Findings")
+    for i, anomaly in enumerate(anomalies[:5], 1):
+        md_lines.append(f"### {i}. {anomaly.anomaly_type} (Case: `{anomaly.case_id}`)")
+        md_lines.append(f"> {anomaly.description}")
+        md_lines.append("")
+        md_lines.append(f"**Root Cause:** {anomaly.root_cause}")
+        md_lines.append("")
+        md_lines.append(f"**Recommendation:** {anomaly.recommendation}")
+        md_lines.append("---")
+
+    return "\n".join(md_lines)
@@ -0,0 +1,186 @@
+import json
+import os
+import socketserver
+import stat
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
+
+from bfai.core.exceptions import NotFoundError
+from bfai.core.service import AnalysisService
+
+# (status, content type, body) of a response
+Response = Tuple[int, str, bytes]
+
+JSON_TYPE = "application/json"
+MARKDOWN_TYPE = "text/markdown; charset=utf-8"
+
+
+def _json(payload: object, status: int = 200) -> Response:
+    return status, JSON_TYPE, json.dumps(payload, default=str).encode("utf-8")
+
+
+def _health(service: AnalysisService, params: Dict[str, str]) -> Response:
+    return _json({"status": "ok", "logs": service.log_names})
+
+
+def _analyze(service: AnalysisService, params: Dict[str, str]) -> Response:
+    anomalies = service.analyze(params.get("log"))
+    return _json([a.model_dump() for a in anomalies])
+
+
+def _explain(service: AnalysisService, params: Dict[str, str]) -> Response:
+    if "case_id" not in params:
+        raise ValueError("Missing query parameter: case_id")
+    trace, anomalies = service.explain(params["case_id"], params.get("log"))
+    return _json(
+        {"trace": trace.model_dump(), "anomalies": [a.model_dump() for a in anomalies]}
+    )
+
+
+def _report(service: AnalysisService, params: Dict[str, str]) -> Response:
+    return 200, MARKDOWN_TYPE, service.report(params.get("log")).encode("utf-8")
+
+
+def _metrics(service: AnalysisService, params: Dict[str, str]) -> Response:
+    return _json(service.metrics())
+
+
+ROUTES: Dict[str, Callable[[AnalysisService, Dict[str, str]], Response]] = {
+    "/health": _health,
+    "/analyze": _analyze,
+    "/explain": _explain,
+    "/report": _report,
+    "/metrics": _metrics,
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1: connections stay open between requests
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; don't let Nagle delay the body
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        start = time.perf_counter()
+        url = urlsplit(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        route = ROUTES.get(url.path)
+        try:
+            if route is None:
+                raise NotFoundError(
+                    f"Unknown endpoint: {url.path} (one of {', '.join(ROUTES)})"
+                )
+            status, content_type, body = route(self.server.service, params)
+        except NotFoundError as e:
+            status, content_type, body = _json({"error": str(e)}, 404)
+        except ValueError as e:
+            status, content_type, body = _json({"error": str(e)}, 400)
+        except Exception as e:
+            status, content_type, body = _json({"error": str(e)}, 500)
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if route is not None and url.path != "/metrics":
+            self.server.service.record(
+                url.path, time.perf_counter() - start, status < 400
+            )
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _UnixHandler(_Handler):
+    # TCP_NODELAY does not apply to Unix sockets
+    disable_nagle_algorithm = False
+
+
+class _TCPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class AnalysisServer:
+    """
+    HTTP API over an `AnalysisService`, on a TCP port or a Unix socket. Each
+    connection is handled on its own thread.
+
+    Endpoints (GET; `log` selects the log when several are served):
+        /analyze?log=            enriched anomalies (JSON, as `bfai analyze`)
+        /explain?case_id=&log=   the case's trace and anomalies (JSON)
+        /report?log=             Markdown report (as `bfai report`)
+        /metrics                 request latency and cache statistics (JSON)
+        /health                  served logs (JSON)
+
+    Usage:
+        with AnalysisServer(AnalysisService(["log.csv"]), port=0) as server:
+            urlopen(server.url + "/analyze")
+    """
+
+    def __init__(
+        self,
+        service: AnalysisService,
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        socket_path: Optional[Union[str, Path]] = None,
+    ):
+        """
+        Args:
+            service: The service answering queries.
+            host: Interface to listen on.
+            port: Port to listen on (0: any free port).
+            socket_path: Listen on this Unix socket instead of a TCP port.
+        """
+        self.service = service
+        self.socket_path = Path(socket_path) if socket_path else None
+        if self.socket_path is not None:
+            # Leftover socket of a previous run
+            if self.socket_path.exists() and stat.S_ISSOCK(
+                self.socket_path.stat().st_mode
+            ):
+                self.socket_path.unlink()
+            self._server = _UnixServer(str(self.socket_path), _UnixHandler)
+        else:
+            self._server = _TCPServer((host, port), _Handler)
+        self._server.service = service
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        if self.socket_path is not None:
+            return f"unix://{self.socket_path}"
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def start(self) -> "AnalysisServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._server.shutdown()
+        self.close()
+
+    def close(self) -> None:
+        self._server.server_close()
+        if self.socket_path is not None and self.socket_path.exists():
+            os.unlink(self.socket_path)
+
+    def __enter__(self) -> "AnalysisServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
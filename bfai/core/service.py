@@ -0,0 +1,301 @@
+import functools
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+from bfai.core.artifacts import (
+    ArtifactCache,
+    CachedPipeline,
+    content_hash,
+    stat_signature,
+)
+from bfai.core.exceptions import NotFoundError
+from bfai.core.friction import FrictionEngine
+from bfai.core.reasoning import ReasoningEngine
+from bfai.core.report import render_report
+from bfai.llm.cache import EnrichmentCache
+from bfai.llm.factory import get_llm_provider
+from bfai.models.anomaly import Anomaly
+from bfai.models.trace import Trace
+from bfai.models.trace_frame import TraceFrame
+
+# Cases whose `explain` result is kept per loaded log
+EXPLAIN_CACHE_SIZE = 1024
+# Requests per endpoint the latency percentiles are computed over
+LATENCY_WINDOW = 1024
+
+
+class LatencyStats:
+    """Request count, errors and latency percentiles of one endpoint."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        """
+        Args:
+            window: Number of most recent requests the percentiles are computed over.
+        """
+        self.requests = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self._recent: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, ok: bool = True) -> None:
+        with self._lock:
+            self.requests += 1
+            self.errors += not ok
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self._recent.append(seconds)
+
+    def summary(self) -> Dict[str, float]:
+        """Counts plus mean, p50, p95, p99 and max latency in milliseconds."""
+        with self._lock:
+            recent = sorted(self._recent)
+            summary = {
+                "requests": self.requests,
+                "errors": self.errors,
+                "mean_ms": 1000 * self.total_seconds / self.requests
+                if self.requests
+                else 0.0,
+                "max_ms": 1000 * self.max_seconds,
+            }
+        for q in (50, 95, 99):
+            # Nearest-rank percentile
+            rank = max(math.ceil(q / 100 * len(recent)) - 1, 0)
+            summary[f"p{q}_ms"] = 1000 * recent[rank] if recent else 0.0
+        return summary
+
+
+class _Analysis:
+    """Everything computed from one version of a log; replaced, never mutated."""
+
+    def __init__(
+        self,
+        frame: TraceFrame,
+        anomalies: List[Anomaly],
+        engine: FrictionEngine,
+        explain_case: Callable[[TraceFrame, str], Tuple[Trace, List[Anomaly]]],
+    ):
+        self.frame = frame
+        self.anomalies = anomalies
+        self.workload = engine.actor_workload
+        # case_id -> (trace, enriched anomalies), for the most recently explained cases
+        self.explain = functools.lru_cache(maxsize=EXPLAIN_CACHE_SIZE)(
+            functools.partial(explain_case, frame)
+        )
+
+
+class _LoadedLog:
+    """A served log: its path, the current analysis and what it was computed from."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.analysis: Optional[_Analysis] = None
+        self.signature: Optional[Tuple[int, int]] = None
+        self.digest: Optional[str] = None
+        # Statistics
+        self.loads = 0
+        self.hits = 0
+        self.load_seconds = 0.0
+        self.loaded_at: Optional[float] = None
+        # Pipeline stages the last load read from the artifact cache
+        self.reused: List[str] = []
+
+
+class AnalysisService:
+    """
+    Answers analyze, explain and report queries about a fixed set of logs,
+    loading, normalizing and analyzing each log once and keeping the results in
+    memory (used by `bfai serve`). Loads go through the stage artifact cache, so
+    a log analyzed before by `bfai analyze` or `bfai report` loads quickly.
+
+    Before every query the log is checked for changes: if its size or mtime
+    changed and its content hash did too, it is loaded and analyzed again. Queries
+    may come from several threads; a log is loaded by one thread at a time while
+    queries about other logs proceed.
+    """
+
+    def __init__(
+        self,
+        logs: List[Union[str, Path]],
+        timestamp_format: Optional[str] = None,
+        provider_mode: str = "mock",
+        use_cache: bool = True,
+        cache_path: Optional[Union[str, Path]] = None,
+        artifact_dir: Optional[Union[str, Path]] = None,
+    ):
+        """
+        Args:
+            logs: Logs to serve (CSV, Parquet, Arrow or .bfai store).
+            timestamp_format: Timestamp format of the logs (inferred if None).
+            provider_mode: LLM provider (see `get_llm_provider`).
+            use_cache: Read and write the enrichment and stage artifact caches.
+            cache_path: Enrichment cache file (None: the default location).
+            artifact_dir: Stage artifact directory (None: the default location).
+        """
+        self.timestamp_format = timestamp_format
+        self.provider = get_llm_provider(provider_mode)
+        self.use_cache = use_cache
+        self.cache_path = cache_path
+        self.artifact_dir = artifact_dir
+        self.started_at = time.time()
+        self._logs: Dict[str, _LoadedLog] = {}
+        for path in map(Path, logs):
+            name = path.name if path.name not in self._logs else str(path)
+            self._logs[name] = _LoadedLog(path)
+        self._latency: Dict[str, LatencyStats] = {}
+        self._latency_lock = threading.Lock()
+
+    @property
+    def log_names(self) -> List[str]:
+        return list(self._logs)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def analyze(self, log: Optional[str] = None) -> List[Anomaly]:
+        """Enriched anomalies of the whole log."""
+        return self._current(self._resolve(log)).anomalies
+
+    def explain(
+        self, case_id: str, log: Optional[str] = None
+    ) -> Tuple[Trace, List[Anomaly]]:
+        """
+        A case's trace and the enriched anomalies found in it, analyzed on its own
+        (as `bfai explain` does).
+
+        Raises:
+            NotFoundError: If the case is not in the log.
+        """
+        return self._current(self._resolve(log)).explain(case_id)
+
+    def report(self, log: Optional[str] = None) -> str:
+        """Markdown report of the log (as written by `bfai report`)."""
+        entry = self._resolve(log)
+        analysis = self._current(entry)
+        return render_report(
+            entry.path.name, analysis.frame, analysis.anomalies, analysis.workload
+        )
+
+    def warm(self) -> None:
+        """Loads every log that is not loaded yet (or changed)."""
+        for entry in self._logs.values():
+            self._current(entry)
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def record(self, endpoint: str, seconds: float, ok: bool = True) -> None:
+        """Records the latency of one request to `endpoint`."""
+        with self._latency_lock:
+            stats = self._latency.setdefault(endpoint, LatencyStats())
+        stats.record(seconds, ok)
+
+    def metrics(self) -> Dict[str, object]:
+        """Uptime, per-endpoint request latency and per-log cache statistics."""
+        with self._latency_lock:
+            endpoints = dict(self._latency)
+        logs = {}
+        for name, entry in self._logs.items():
+            analysis = entry.analysis
+            logs[name] = {
+                "path": str(entry.path),
+                "loaded": analysis is not None,
+                "loads": entry.loads,
+                "hits": entry.hits,
+                "load_seconds": round(entry.load_seconds, 6),
+                "reused_stages": entry.reused,
+                "loaded_at": entry.loaded_at,
+                "n_cases": analysis.frame.n_cases if analysis else None,
+                "n_anomalies": len(analysis.anomalies) if analysis else None,
+            }
+        return {
+            "uptime_seconds": round(time.time() - self.started_at, 3),
+            "endpoints": {name: stats.summary() for name, stats in endpoints.items()},
+            "logs": logs,
+        }
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def _resolve(self, log: Optional[str]) -> _LoadedLog:
+        if log is None:
+            if len(self._logs) != 1:
+                raise ValueError(
+                    "Several logs are served; choose one with "
+                    f"log= ({', '.join(self._logs)})"
+                )
+            return next(iter(self._logs.values()))
+        if log in self._logs:
+            return self._logs[log]
+        for entry in self._logs.values():
+            if str(entry.path) == log:
+                return entry
+        raise NotFoundError(
+            f"Log '{log}' is not served (serving: {', '.join(self._logs)})"
+        )
+
+    def _current(self, entry: _LoadedLog) -> _Analysis:
+        """The log's analysis, (re)loaded first if it is new or its content changed."""
+        with entry.lock:
+            signature = stat_signature(entry.path)
+            digest = None
+            if entry.analysis is not None and signature != entry.signature:
+                # Touched or rewritten: only a different content invalidates the cache
+                digest = content_hash(entry.path)
+                if digest == entry.digest:
+                    entry.signature = signature
+                else:
+                    entry.analysis = None
+            if entry.analysis is None:
+                self._load(entry, signature, digest or content_hash(entry.path))
+            else:
+                entry.hits += 1
+            return entry.analysis
+
+    def _load(self, entry: _LoadedLog, signature: Tuple[int, int], digest: str) -> None:
+        start = time.perf_counter()
+        artifacts = ArtifactCache(self.artifact_dir) if self.use_cache else None
+        pipeline = CachedPipeline(
+            entry.path, self.timestamp_format, artifacts=artifacts, source_hash=digest
+        )
+        engine = FrictionEngine()
+        with self._reasoning() as reasoning:
+            anomalies = pipeline.enrich(engine, reasoning)
+        analysis = _Analysis(pipeline.frame(), anomalies, engine, self._explain_case)
+
+        entry.analysis = analysis
+        entry.signature = signature
+        entry.digest = digest
+        entry.reused = pipeline.reused
+        entry.loads += 1
+        entry.load_seconds = time.perf_counter() - start
+        entry.loaded_at = time.time()
+
+    def _explain_case(
+        self, frame: TraceFrame, case_id: str
+    ) -> Tuple[Trace, List[Anomaly]]:
+        trace = frame.get_trace(case_id)
+        if trace is None:
+            raise NotFoundError(f"Case ID '{case_id}' not found in logs.")
+        with self._reasoning() as reasoning:
+            return trace, reasoning.analyze(FrictionEngine().run_analysis([trace]))
+
+    @contextmanager
+    def _reasoning(self) -> Iterator[ReasoningEngine]:
+        # SQLite connections belong to the thread that opened them: one per call
+        cache = EnrichmentCache(self.cache_path) if self.use_cache else None
+        try:
+            yield ReasoningEngine(self.provider, cluster=True, cache=cache)
+        finally:
+            if cache is not None:
+                cache.close()
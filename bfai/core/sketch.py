@@ -0,0 +1,178 @@
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Relative accuracy of quantile estimates: a returned quantile is within 1% of a
+# value of the right rank. At 1% a bucket covers ~2% of the value range, so
+# durations from 1 ms to ~3 years need fewer than 1,300 buckets.
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_MAX_BUCKETS = 2048
+
+# Values at or below this (in seconds) are counted in a dedicated zero bucket
+MIN_VALUE = 1e-3
+
+
+class QuantileSketch:
+    """
+    Bounded-memory, mergeable quantile sketch for non-negative values
+    (log-bucketed histogram in the style of DDSketch).
+
+    Each value v > MIN_VALUE is counted in bucket ceil(log_gamma(v)), with
+    gamma = (1 + a) / (1 - a) for relative accuracy `a`. Bucket counts simply add
+    up, so sketches built on different chunks or shards merge exactly. When more
+    than `max_buckets` buckets are in use, the lowest ones are collapsed, which
+    only degrades the accuracy of the smallest quantiles.
+    """
+
+    def __init__(
+        self,
+        relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+        max_buckets: int = DEFAULT_MAX_BUCKETS,
+        bins: Optional[Dict[int, int]] = None,
+        zero_count: int = 0,
+    ):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.bins: Dict[int, int] = dict(bins or {})
+        self.zero_count = zero_count
+        self._collapse()
+
+    @property
+    def count(self) -> int:
+        return self.zero_count + sum(self.bins.values())
+
+    @staticmethod
+    def bucket_keys(values: np.ndarray, gamma: float) -> np.ndarray:
+        """Bucket key of each value (values <= MIN_VALUE map to the smallest int64)."""
+        keys = np.full(len(values), np.iinfo(np.int64).min, dtype=np.int64)
+        positive = values > MIN_VALUE
+        keys[positive] = np.ceil(np.log(values[positive]) / math.log(gamma)).astype(
+            np.int64
+        )
+        return keys
+
+    @classmethod
+    def from_groups(
+        cls,
+        group: np.ndarray,
+        values: np.ndarray,
+        n_groups: int,
+        relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+        max_buckets: int = DEFAULT_MAX_BUCKETS,
+    ) -> List["QuantileSketch"]:
+        """
+        Builds one sketch per group in a single vectorized pass.
+
+        Args:
+            group: Group index of each value.
+            values: Non-negative values.
+            n_groups: Number of groups (sketches returned).
+        """
+        sketches = [cls(relative_accuracy, max_buckets) for _ in range(n_groups)]
+        if len(values) == 0:
+            return sketches
+
+        keys = cls.bucket_keys(values, sketches[0].gamma)
+        zero = keys == np.iinfo(np.int64).min
+        for g, n in zip(*np.unique(group[zero], return_counts=True)):
+            sketches[int(g)].zero_count = int(n)
+
+        # Count (group, bucket) pairs at once, then distribute to the sketches
+        offset = int(keys[~zero].min()) if (~zero).any() else 0
+        width = int(keys[~zero].max()) - offset + 1 if (~zero).any() else 1
+        pairs, counts = np.unique(
+            group[~zero].astype(np.int64) * width + (keys[~zero] - offset),
+            return_counts=True,
+        )
+        for pair, n in zip(pairs.tolist(), counts.tolist()):
+            sketches[pair // width].bins[pair % width + offset] = n
+        for sketch in sketches:
+            sketch._collapse()
+        return sketches
+
+    def add(self, values: np.ndarray) -> None:
+        """Adds an array of values."""
+        values = np.asarray(values, dtype=np.float64)
+        keys = self.bucket_keys(values, self.gamma)
+        zero = keys == np.iinfo(np.int64).min
+        self.zero_count += int(zero.sum())
+        for key, n in zip(*np.unique(keys[~zero], return_counts=True)):
+            self.bins[int(key)] = self.bins.get(int(key), 0) + int(n)
+        self._collapse()
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """Returns a sketch of the union of both value sets."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        bins = dict(self.bins)
+        for key, n in other.bins.items():
+            bins[key] = bins.get(key, 0) + n
+        return QuantileSketch(
+            self.relative_accuracy,
+            max(self.max_buckets, other.max_buckets),
+            bins,
+            self.zero_count + other.zero_count,
+        )
+
+    def _collapse(self) -> None:
+        """Folds the lowest buckets together until at most `max_buckets` remain."""
+        if len(self.bins) <= self.max_buckets:
+            return
+        keys = sorted(self.bins)
+        excess = keys[: len(keys) - self.max_buckets + 1]
+        target = excess[-1]
+        self.bins[target] = (
+            sum(self.bins.pop(k) for k in excess[:-1]) + self.bins[target]
+        )
+
+    def _histogram(self):
+        """(representative values, counts) in ascending order, zero bucket first."""
+        keys = np.array(sorted(self.bins), dtype=np.float64)
+        values = 2 * self.gamma ** keys / (self.gamma + 1)
+        counts = np.array([self.bins[k] for k in sorted(self.bins)], dtype=np.int64)
+        return np.append(0.0, values), np.append(self.zero_count, counts)
+
+    @staticmethod
+    def _weighted_quantile(values: np.ndarray, counts: np.ndarray, q: float) -> float:
+        cumulative = np.cumsum(counts)
+        rank = q * (cumulative[-1] - 1)
+        return float(values[np.searchsorted(cumulative, rank, side="right")])
+
+    def quantile(self, q: float) -> float:
+        """Estimated q-quantile (0 <= q <= 1), NaN for an empty sketch."""
+        if self.count == 0:
+            return float("nan")
+        values, counts = self._histogram()
+        return self._weighted_quantile(values, counts, q)
+
+    def mad(self) -> float:
+        """Estimated median absolute deviation, NaN for an empty sketch."""
+        if self.count == 0:
+            return float("nan")
+        values, counts = self._histogram()
+        deviations = np.abs(values - self._weighted_quantile(values, counts, 0.5))
+        order = np.argsort(deviations, kind="stable")
+        return self._weighted_quantile(deviations[order], counts[order], 0.5)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def to_dict(self) -> Dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "max_buckets": self.max_buckets,
+            "zero_count": self.zero_count,
+            "bins": {str(k): n for k, n in sorted(self.bins.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "QuantileSketch":
+        return cls(
+            data["relative_accuracy"],
+            data["max_buckets"],
+            {int(k): int(n) for k, n in data["bins"].items()},
+            int(data["zero_count"]),
+        )
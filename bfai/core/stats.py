@@ -0,0 +1,170 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from bfai.core.exceptions import BaselineError
+from bfai.core.sketch import QuantileSketch
+
+TransitionKey = Tuple[str, str]
+
+BASELINE_VERSION = 1
+
+
+class TransitionStats:
+    """
+    Per-transition sufficient statistics of gap durations: count, mean and M2
+    (sum of squared deviations from the mean), keyed by (activity from, activity to).
+
+    Statistics from disjoint sets of events can be merged exactly (Chan et al.'s
+    parallel form of Welford's algorithm), so a baseline fitted once on history can
+    be updated with each new batch in time proportional to the batch alone.
+
+    Optionally, each transition also carries a `QuantileSketch` of its durations
+    for robust (median/MAD or percentile) scoring; sketches merge the same way.
+    """
+
+    def __init__(
+        self,
+        keys: Optional[List[TransitionKey]] = None,
+        counts: Optional[np.ndarray] = None,
+        means: Optional[np.ndarray] = None,
+        m2s: Optional[np.ndarray] = None,
+        sketches: Optional[List[QuantileSketch]] = None,
+    ):
+        self.keys: List[TransitionKey] = list(keys or [])
+        self.counts = np.asarray(counts if counts is not None else [], dtype=np.int64)
+        self.means = np.asarray(means if means is not None else [], dtype=np.float64)
+        self.m2s = np.asarray(m2s if m2s is not None else [], dtype=np.float64)
+        self.sketches = sketches
+        self.index: Dict[TransitionKey, int] = {
+            key: i for i, key in enumerate(self.keys)
+        }
+
+    @classmethod
+    def from_groups(
+        cls,
+        keys: List[TransitionKey],
+        group: np.ndarray,
+        durations: np.ndarray,
+        sketch: bool = False,
+    ) -> "TransitionStats":
+        """
+        Computes statistics from raw durations.
+
+        Args:
+            keys: Transition key of each group.
+            group: Group index (into `keys`) of each duration.
+            durations: Gap durations in seconds.
+            sketch: Also build a quantile sketch per transition.
+        """
+        counts = np.bincount(group, minlength=len(keys))
+        means = np.bincount(group, weights=durations, minlength=len(keys)) / np.maximum(
+            counts, 1
+        )
+        deviation = durations - means[group]
+        m2s = np.bincount(group, weights=deviation * deviation, minlength=len(keys))
+        sketches = (
+            QuantileSketch.from_groups(group, durations, len(keys)) if sketch else None
+        )
+        return cls(keys, counts, means, m2s, sketches)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def stds(self) -> np.ndarray:
+        """Population standard deviation per transition."""
+        return np.sqrt(self.m2s / np.maximum(self.counts, 1))
+
+    def lookup(self, keys: List[TransitionKey]) -> np.ndarray:
+        """Index of each key in this table, -1 for unknown transitions."""
+        return np.array([self.index.get(key, -1) for key in keys], dtype=np.int64)
+
+    def merge(self, other: "TransitionStats") -> "TransitionStats":
+        """
+        Returns the statistics of the union of both event sets.
+        Sketches are kept only if both sides have them.
+        """
+        keys = self.keys + [k for k in other.keys if k not in self.index]
+        size = len(keys)
+        pos = np.array([self.index.get(k, -1) for k in other.keys], dtype=np.int64)
+        new = pos < 0
+        pos[new] = len(self.keys) + np.arange(int(new.sum()))
+
+        def widen(
+            stats: "TransitionStats", at: np.ndarray
+        ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+            n, mean, m2 = np.zeros(size, np.int64), np.zeros(size), np.zeros(size)
+            n[at], mean[at], m2[at] = stats.counts, stats.means, stats.m2s
+            return n, mean, m2
+
+        n_a, mean_a, m2_a = widen(self, np.arange(len(self.keys)))
+        n_b, mean_b, m2_b = widen(other, pos)
+        n = n_a + n_b
+        safe_n = np.maximum(n, 1)
+        delta = mean_b - mean_a
+        means = mean_a + delta * n_b / safe_n
+        m2s = m2_a + m2_b + delta * delta * n_a * n_b / safe_n
+
+        sketches = None
+        if self.sketches is not None and other.sketches is not None:
+            sketches = list(self.sketches) + [
+                QuantileSketch() for _ in range(size - len(self.keys))
+            ]
+            for i, sketch in zip(pos.tolist(), other.sketches):
+                sketches[i] = sketches[i].merge(sketch) if sketches[i].count else sketch
+        return TransitionStats(keys, n, means, m2s, sketches)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def to_dict(self) -> Dict:
+        rows = [
+            {"from": a, "to": b, "count": int(n), "mean": float(mean), "m2": float(m2)}
+            for (a, b), n, mean, m2 in zip(self.keys, self.counts, self.means, self.m2s)
+        ]
+        if self.sketches is not None:
+            for row, sketch in zip(rows, self.sketches):
+                row["sketch"] = sketch.to_dict()
+        return {"version": BASELINE_VERSION, "transitions": rows}
+
+    def digest(self) -> str:
+        """SHA-256 of the statistics, identifying a baseline (e.g. in partials)."""
+        return hashlib.sha256(
+            json.dumps(self.to_dict(), sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TransitionStats":
+        if data.get("version") != BASELINE_VERSION:
+            raise BaselineError(f"Unsupported baseline version: {data.get('version')}")
+        rows = data.get("transitions", [])
+        return cls(
+            [(r["from"], r["to"]) for r in rows],
+            [r["count"] for r in rows],
+            [r["mean"] for r in rows],
+            [r["m2"] for r in rows],
+            [QuantileSketch.from_dict(r["sketch"]) for r in rows]
+            if rows and all("sketch" in r for r in rows) else None,
+        )
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Writes the statistics as JSON."""
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f, indent=2)
+        except OSError as e:
+            raise BaselineError(f"Failed to write baseline {path}: {e}") from e
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "TransitionStats":
+        """Reads statistics written by `save`."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError) as e:
+            raise BaselineError(f"Failed to read baseline {path}: {e}") from e
@@ -0,0 +1,121 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import pandas as pd
+
+from bfai.core.exceptions import DataIngestionError, SchemaValidationError
+from bfai.ingestion.csv_loader import COLUMN_DTYPES
+from bfai.ingestion.normalizer import resolve_schema
+
+PARQUET_SUFFIXES = {".parquet", ".pq"}
+ARROW_SUFFIXES = {".arrow", ".feather", ".ipc"}
+
+
+def _require_pyarrow() -> None:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise DataIngestionError(
+            "Parquet/Arrow input requires the optional 'pyarrow' package "
+            "(pip install pyarrow)."
+        ) from e
+
+
+def _resolve(names: List[str]) -> Optional[Dict[str, str]]:
+    """Standard field -> source column, or None if required columns are missing."""
+    lowered = [str(n).lower().strip() for n in names]
+    try:
+        schema = resolve_schema(lowered)
+    except SchemaValidationError:
+        return None  # leave the error to the normalizer
+    return {
+        standard: names[lowered.index(source)] for standard, source in schema.items()
+    }
+
+
+def _used_columns(names: List[str]) -> Optional[List[str]]:
+    """Source columns the normalizer needs, or None to read everything."""
+    schema = _resolve(names)
+    return list(schema.values()) if schema else None
+
+
+def _column_names(file_path: Union[str, Path]) -> List[str]:
+    """Reads the column names from the file footer/header without loading data."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if Path(file_path).suffix.lower() in PARQUET_SUFFIXES:
+        return pq.read_schema(file_path).names
+    with pa.memory_map(str(file_path)) as source:
+        return pa.ipc.open_file(source).schema.names
+
+
+def sniff_arrow_schema(file_path: Union[str, Path]) -> Optional[Dict[str, str]]:
+    """Parquet/Arrow counterpart of `csv_loader.sniff_schema`."""
+    _require_pyarrow()
+    try:
+        return _resolve(_column_names(file_path))
+    except Exception as e:
+        raise DataIngestionError(f"Failed to read schema: {str(e)}") from e
+
+
+def _to_dataframe(table: Any) -> pd.DataFrame:
+    """Converts an Arrow table, dictionary-encoding the label columns."""
+    schema = _resolve(table.column_names) or {}
+    categories = [
+        source for standard, source in schema.items()
+        if COLUMN_DTYPES.get(standard) == "category"
+    ]
+    df = table.to_pandas(categories=categories)
+    if df.empty:
+        raise DataIngestionError("Input file is empty.")
+    return df
+
+
+def load_parquet(file_path: Union[str, Path]) -> pd.DataFrame:
+    """
+    Loads a Parquet file, reading only the columns the normalizer uses.
+
+    Args:
+        file_path: Path to the Parquet file.
+
+    Returns:
+        pd.DataFrame: Raw rows (source column names, unnormalized values).
+
+    Raises:
+        DataIngestionError: If pyarrow is missing or the file cannot be read.
+    """
+    _require_pyarrow()
+    import pyarrow.parquet as pq
+
+    try:
+        table = pq.read_table(
+            file_path, columns=_used_columns(_column_names(file_path))
+        )
+    except Exception as e:
+        raise DataIngestionError(f"Failed to ingest Parquet: {str(e)}") from e
+    return _to_dataframe(table)
+
+
+def load_arrow(file_path: Union[str, Path]) -> pd.DataFrame:
+    """
+    Loads an Arrow IPC / Feather file, reading only the columns the normalizer uses.
+
+    Args:
+        file_path: Path to the Arrow file.
+
+    Returns:
+        pd.DataFrame: Raw rows (source column names, unnormalized values).
+
+    Raises:
+        DataIngestionError: If pyarrow is missing or the file cannot be read.
+    """
+    _require_pyarrow()
+    import pyarrow.feather as feather
+
+    try:
+        columns = _used_columns(_column_names(file_path))
+        table = feather.read_table(file_path, columns=columns, memory_map=True)
+    except Exception as e:
+        raise DataIngestionError(f"Failed to ingest Arrow file: {str(e)}") from e
+    return _to_dataframe(table)
@@ -0,0 +1,413 @@
+import io
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from bfai.core.exceptions import DataIngestionError
+from bfai.ingestion.csv_loader import read_options, sniff_schema
+from bfai.ingestion.frame_store import is_frame_store, load_frame
+from bfai.ingestion.normalizer import normalize_to_frame
+from bfai.ingestion.timestamps import TimestampParser
+from bfai.models.trace_frame import TraceFrame
+
+INDEX_SUFFIX = ".index.sqlite"
+INDEX_VERSION = 1
+
+# Bytes scanned per block when locating CSV row boundaries
+SCAN_BLOCK_BYTES = 16 << 20
+# Rows per chunk when reading case ids and timestamps
+INDEX_CHUNK_ROWS = 1_000_000
+
+_NEWLINE = ord("\n")
+_QUOTE = ord('"')
+
+
+def default_index_path(log_path: Union[str, Path]) -> Path:
+    """Conventional index location: next to the log, named <log>.index.sqlite."""
+    log_path = Path(log_path)
+    return log_path.with_name(log_path.name + INDEX_SUFFIX)
+
+
+def _source_signature(log_path: Path) -> Dict[str, int]:
+    """Size and mtime of the log (of meta.json for stores), to detect stale indexes."""
+    target = log_path / "meta.json" if is_frame_store(log_path) else log_path
+    stat = target.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+# ----------------------------------------------------------------------
+# CSV row boundaries
+# ----------------------------------------------------------------------
+
+def _row_spans(path: Path) -> Tuple[int, np.ndarray, np.ndarray]:
+    """
+    Byte spans of the CSV's rows, found by a vectorized scan: a newline ends a row
+    unless it lies inside a quoted field (odd number of quotes before it).
+    Blank lines are skipped, like `pd.read_csv` does.
+
+    Returns:
+        (header_end, starts, ends): end of the header line, and the start/end
+        offset (including the newline) of every data row.
+    """
+    starts: List[np.ndarray] = []
+    ends: List[np.ndarray] = []
+    position = 0  # file offset of `pending`
+    pending = b""
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(SCAN_BLOCK_BYTES)
+            data = pending + block
+            buf = np.frombuffer(data, dtype=np.uint8)
+            newlines = np.flatnonzero(buf == _NEWLINE)
+            if len(newlines) and _QUOTE in buf:
+                # Only the parity matters, so a wrapping uint8 count is enough
+                quotes_before = np.cumsum(buf == _QUOTE, dtype=np.uint8)[newlines]
+                boundaries = newlines[quotes_before % 2 == 0]
+            else:
+                boundaries = newlines
+            if not block:
+                # End of file: a last row without a trailing newline
+                if len(buf) and (not len(boundaries) or boundaries[-1] != len(buf) - 1):
+                    boundaries = np.append(boundaries, len(buf) - 1)
+            line_ends = (boundaries + 1).astype(np.int64)
+            line_starts = np.concatenate([[0], line_ends[:-1]])[
+                : len(line_ends)
+            ].astype(np.int64)
+            starts.append(line_starts + position)
+            ends.append(line_ends + position)
+            if not block:
+                break
+            consumed = int(line_ends[-1]) if len(line_ends) else 0
+            pending = data[consumed:]
+            position += consumed
+
+    starts_all = np.concatenate(starts) if starts else np.empty(0, dtype=np.int64)
+    ends_all = np.concatenate(ends) if ends else np.empty(0, dtype=np.int64)
+    if len(starts_all) == 0:
+        raise DataIngestionError("Input CSV file is empty.")
+
+    header_end = int(ends_all[0])
+    starts_all, ends_all = starts_all[1:], ends_all[1:]
+    # Blank lines ("\n" or "\r\n") are not rows
+    blank = np.zeros(len(starts_all), dtype=bool)
+    with open(path, "rb") as f:
+        for i in np.flatnonzero(ends_all - starts_all <= 2).tolist():
+            f.seek(int(starts_all[i]))
+            blank[i] = f.read(int(ends_all[i] - starts_all[i])) in (b"\n", b"\r\n")
+    return header_end, starts_all[~blank], ends_all[~blank]
+
+
+# ----------------------------------------------------------------------
+# Building
+# ----------------------------------------------------------------------
+
+def _csv_rows(
+    path: Path, schema: Dict[str, str], parser: TimestampParser
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """(case_id, timestamp in UTC microseconds) of every data row, in chunks."""
+    case_col, ts_col = schema["case_id"], schema["timestamp"]
+    reader = pd.read_csv(
+        path,
+        usecols=[case_col, ts_col],
+        dtype={case_col: str},
+        chunksize=INDEX_CHUNK_ROWS,
+    )
+    for chunk in reader:
+        timestamps = (
+            parser.parse(chunk[ts_col]).dt.tz_convert("UTC").dt.tz_localize(None)
+            .to_numpy(dtype="datetime64[us]").view(np.int64)
+        )
+        yield chunk[case_col].to_numpy(dtype=object), timestamps
+
+
+def _csv_entries(
+    path: Path, parser: TimestampParser
+) -> Tuple[Dict[str, Any], List[Tuple]]:
+    schema = sniff_schema(path, strict=True)
+    header_end, starts, ends = _row_spans(path)
+
+    chunks = list(_csv_rows(path, schema, parser))
+    case_values = (
+        np.concatenate([c for c, _ in chunks]) if chunks else np.empty(0, dtype=object)
+    )
+    timestamps = (
+        np.concatenate([t for _, t in chunks])
+        if chunks
+        else np.empty(0, dtype=np.int64)
+    )
+    if len(case_values) != len(starts):
+        raise DataIngestionError(
+            f"Cannot index {path}: found {len(starts)} rows but parsed "
+            f"{len(case_values)}"
+        )
+
+    case_codes, case_ids = pd.factorize(pd.Series(case_values), sort=True)
+    rows = np.flatnonzero(case_codes >= 0)
+    rows = rows[np.argsort(case_codes[rows], kind="stable")]
+    codes = case_codes[rows]
+
+    # A range is a run of consecutive rows of one case
+    breaks = np.flatnonzero((codes[1:] != codes[:-1]) | (rows[1:] != rows[:-1] + 1)) + 1
+    range_first = np.concatenate([[0], breaks]).astype(np.int64)
+    range_last = np.append(breaks - 1, len(rows) - 1).astype(np.int64)
+    case_first = np.flatnonzero(
+        np.diff(np.concatenate([[-1], codes[range_first]])) != 0
+    )
+
+    ts = timestamps[rows]
+    case_starts = np.flatnonzero(np.diff(np.concatenate([[-1], codes])) != 0)
+    first_ts = np.minimum.reduceat(ts, case_starts) if len(ts) else ts
+    last_ts = np.maximum.reduceat(ts, case_starts) if len(ts) else ts
+    n_events = np.diff(np.append(case_starts, len(rows)))
+
+    # Ranges as JSON [offset, length, first_row, n_rows], formatted in bulk
+    range_rows = rows[range_first]
+    range_offsets = starts[range_rows]
+    range_text = [
+        f"[{offset},{length},{row},{n}]"
+        for offset, length, row, n in zip(
+            range_offsets.tolist(),
+            (ends[rows[range_last]] - range_offsets).tolist(),
+            range_rows.tolist(),
+            (range_last - range_first + 1).tolist(),
+        )
+    ]
+    bounds = np.append(case_first, len(range_first)).tolist()
+    entries = [
+        (
+            case_id,
+            n,
+            t0,
+            t1,
+            (t1 - t0) / 1_000_000,
+            "[" + ",".join(range_text[a:b]) + "]",
+            None,
+        )
+        for case_id, n, t0, t1, a, b in zip(
+            [str(c) for c in case_ids],
+            n_events.tolist(),
+            first_ts.tolist(),
+            last_ts.tolist(),
+            bounds[:-1],
+            bounds[1:],
+        )
+    ]
+
+    with open(path, "rb") as f:
+        header = f.read(header_end).decode("utf-8")
+    meta = {"kind": "csv", "header": header, "timestamp_format": parser.fmt}
+    return meta, entries
+
+
+def _store_entries(path: Path) -> Tuple[Dict[str, Any], List[Tuple]]:
+    frame = load_frame(path)
+    first = (
+        frame.timestamps[frame.offsets[:-1]]
+        if frame.n_events
+        else np.empty(0, dtype=np.int64)
+    )
+    last = (
+        frame.timestamps[frame.offsets[1:] - 1]
+        if frame.n_events
+        else np.empty(0, dtype=np.int64)
+    )
+    entries = [
+        (str(case_id), int(n), int(t0), int(t1), float(d), None, case)
+        for case, (case_id, n, t0, t1, d) in enumerate(zip(
+            frame.case_ids.tolist(), frame.case_lengths.tolist(), first.tolist(),
+            last.tolist(), frame.duration_seconds.tolist(),
+        ))
+    ]
+    return {"kind": "store"}, entries
+
+
+def build_case_index(
+    log_path: Union[str, Path],
+    index_path: Optional[Union[str, Path]] = None,
+    timestamp_parser: Optional[TimestampParser] = None,
+) -> "CaseIndex":
+    """
+    Builds a persistent case index for a CSV log or a frame store.
+
+    For CSV logs every case maps to the byte ranges (and source row numbers) of
+    its rows, so a single case can later be read without parsing the rest of the
+    file. For frame stores it maps to the case's position in the store. Each case
+    also gets summary stats: event count, first/last timestamp and duration.
+
+    Args:
+        log_path: CSV file or .bfai store directory.
+        index_path: Where to write the index (default: `default_index_path`).
+        timestamp_parser: Parser for the timestamp column (CSV only). The format
+                          used is stored, so reads parse timestamps the same way.
+
+    Returns:
+        CaseIndex: The opened index.
+
+    Raises:
+        DataIngestionError: For unsupported or unreadable logs.
+    """
+    log_path = Path(log_path)
+    index_path = Path(index_path) if index_path else default_index_path(log_path)
+
+    if is_frame_store(log_path):
+        meta, entries = _store_entries(log_path)
+    elif log_path.suffix.lower() in (".parquet", ".pq", ".arrow", ".feather", ".ipc"):
+        raise DataIngestionError(
+            "Case indexes support CSV logs and .bfai stores; convert Parquet/Arrow "
+            "logs first."
+        )
+    else:
+        meta, entries = _csv_entries(log_path, timestamp_parser or TimestampParser())
+
+    meta.update({
+        "version": INDEX_VERSION,
+        "source": str(log_path.resolve()),
+        **_source_signature(log_path),
+    })
+
+    tmp_path = index_path.with_name(index_path.name + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+    conn = sqlite3.connect(str(tmp_path))
+    try:
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute(
+            "CREATE TABLE cases ("
+            " case_id TEXT PRIMARY KEY,"
+            " n_events INTEGER, first_ts INTEGER, last_ts INTEGER,"
+            " duration_seconds REAL,"
+            " ranges TEXT, position INTEGER)"
+        )
+        conn.executemany(
+            "INSERT INTO meta VALUES (?, ?)",
+            [(k, json.dumps(v)) for k, v in meta.items()],
+        )
+        conn.executemany("INSERT INTO cases VALUES (?, ?, ?, ?, ?, ?, ?)", entries)
+        conn.commit()
+    finally:
+        conn.close()
+    tmp_path.replace(index_path)
+    return CaseIndex(index_path)
+
+
+# ----------------------------------------------------------------------
+# Reading
+# ----------------------------------------------------------------------
+
+class CaseIndex:
+    """A case index written by `build_case_index`."""
+
+    def __init__(self, index_path: Union[str, Path]):
+        self.path = Path(index_path)
+        try:
+            self._conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self.meta = {
+                k: json.loads(v)
+                for k, v in self._conn.execute("SELECT key, value FROM meta")
+            }
+        except sqlite3.Error as e:
+            raise DataIngestionError(f"Not a BFAI case index: {self.path} ({e})") from e
+        if self.meta.get("version") != INDEX_VERSION:
+            raise DataIngestionError(f"Unsupported case index version in {self.path}")
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM cases").fetchone()[0]
+
+    def is_current(self, log_path: Union[str, Path]) -> bool:
+        """True if the log has not changed since the index was built."""
+        try:
+            signature = _source_signature(Path(log_path))
+        except OSError:
+            return False
+        return all(self.meta.get(k) == v for k, v in signature.items())
+
+    def summary(self, case_id: str) -> Optional[Dict[str, Any]]:
+        """Indexed stats of a case (n_events, first/last_ts, duration), or None."""
+        row = self._conn.execute(
+            "SELECT n_events, first_ts, last_ts, duration_seconds FROM cases WHERE "
+            "case_id = ?",
+            (case_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        n_events, first_ts, last_ts, duration = row
+        return {
+            "case_id": case_id,
+            "n_events": n_events,
+            "start_time": pd.Timestamp(first_ts, unit="us", tz="UTC").isoformat(),
+            "end_time": pd.Timestamp(last_ts, unit="us", tz="UTC").isoformat(),
+            "duration_seconds": duration,
+        }
+
+    def read_case(
+        self,
+        log_path: Union[str, Path],
+        case_id: str,
+        timestamp_parser: Optional[TimestampParser] = None,
+    ) -> Optional[TraceFrame]:
+        """
+        Reads a single case from the indexed log.
+
+        Args:
+            log_path: The log the index was built for.
+            case_id: Case to read.
+            timestamp_parser: Parser for CSV timestamps (default: the format
+                              recorded when indexing).
+
+        Returns:
+            Optional[TraceFrame]: A frame holding only that case, or None if the
+            case is not in the index.
+        """
+        row = self._conn.execute(
+            "SELECT ranges, position FROM cases WHERE case_id = ?", (case_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        ranges, position = row
+
+        if self.meta["kind"] == "store":
+            return load_frame(log_path).take([position])
+
+        ranges = json.loads(ranges)
+        chunks = [self.meta["header"].encode("utf-8")]
+        row_index = []
+        with open(log_path, "rb") as f:
+            for offset, length, first_row, n_rows in ranges:
+                f.seek(offset)
+                data = f.read(length)
+                chunks.append(data if data.endswith(b"\n") else data + b"\n")
+                row_index.append(
+                    np.arange(first_row, first_row + n_rows, dtype=np.int64)
+                )
+
+        schema = sniff_schema(io.StringIO(self.meta["header"]))
+        df = pd.read_csv(io.BytesIO(b"".join(chunks)), **read_options(schema))
+        df.index = np.concatenate(row_index)
+
+        if timestamp_parser is None:
+            # Reuse the format inferred over the whole log, with the same fallbacks
+            timestamp_parser = TimestampParser()
+            timestamp_parser.fmt = self.meta.get("timestamp_format")
+        return normalize_to_frame(df, timestamp_parser)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def open_case_index(
+    log_path: Union[str, Path], index_path: Optional[Union[str, Path]] = None
+) -> Optional[CaseIndex]:
+    """
+    Opens the index of `log_path` if it exists and is up to date, else None.
+    """
+    index_path = Path(index_path) if index_path else default_index_path(log_path)
+    if not index_path.is_file():
+        return None
+    index = CaseIndex(index_path)
+    if not index.is_current(log_path):
+        index.close()
+        return None
+    return index
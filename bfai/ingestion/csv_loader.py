@@ -1,19 +1,80 @@
 import pandas as pd
 from pathlib import Path
-from typing import Union, List, Dict, Any
-from bfai.core.exceptions import DataIngestionError
+from typing import Union, List, Dict, Any, Optional
+from bfai.core.exceptions import DataIngestionError, SchemaValidationError
+from bfai.ingestion.normalizer import resolve_schema
 
-def load_csv(file_path: Union[str, Path]) -> List[Dict[str, Any]]:
+# Parse hints per standard field: ids stay text, repetitive labels are categorical.
+COLUMN_DTYPES = {
+    "case_id": str,
+    "activity": "category",
+    "actor": "category",
+    "actor_type": "category",
+    "status": "category",
+}
+
+def sniff_schema(
+    file_path: Union[str, Path], strict: bool = False
+) -> Optional[Dict[str, str]]:
     """
-    Loads a CSV file and converts it to a list of dictionaries (raw records).
-    Does NOT perform normalization or validation against Event models yet.
-    
+    Reads only the CSV header and resolves the source column for each standard field.
+
     Args:
         file_path: Path to the CSV file.
-        
+        strict: Raise instead of returning None when required columns are missing.
+
     Returns:
-        List[Dict[str, Any]]: Raw records.
-        
+        Optional[Dict[str, str]]: Standard field -> source column name (as spelled in
+        the file), or None if the required columns cannot be resolved.
+
+    Raises:
+        DataIngestionError: If the header cannot be read.
+        SchemaValidationError: If `strict` and required columns are missing.
+    """
+    try:
+        header = list(pd.read_csv(file_path, nrows=0).columns)
+    except pd.errors.EmptyDataError:
+        raise DataIngestionError("Input CSV file is empty.")
+    except Exception as e:
+        raise DataIngestionError(f"Failed to ingest CSV: {str(e)}") from e
+
+    lowered = [str(c).lower().strip() for c in header]
+    try:
+        schema = resolve_schema(lowered)
+    except SchemaValidationError:
+        if strict:
+            raise
+        return None
+    return {
+        standard: header[lowered.index(source)] for standard, source in schema.items()
+    }
+
+
+def read_options(schema: Optional[Dict[str, str]]) -> Dict[str, Any]:
+    """
+    Builds `pd.read_csv` keyword arguments (usecols/dtype) for a sniffed schema.
+    An unresolved schema reads every column, leaving the error to the normalizer.
+    """
+    if schema is None:
+        return {}
+    return {
+        "usecols": list(schema.values()),
+        "dtype": {
+            source: COLUMN_DTYPES[standard]
+            for standard, source in schema.items() if standard in COLUMN_DTYPES
+        },
+    }
+
+def load_dataframe(file_path: Union[str, Path]) -> pd.DataFrame:
+    """
+    Loads only the columns the normalizer uses, with dtype hints.
+
+    Args:
+        file_path: Path to the CSV file.
+
+    Returns:
+        pd.DataFrame: Raw rows (source column names, unnormalized values).
+
     Raises:
         DataIngestionError: If file cannot be read or is empty.
     """
@@ -21,17 +82,34 @@ def load_csv(file_path: Union[str, Path]) -> List[Dict[str, Any]]:
         path = Path(file_path)
         if not path.exists():
             raise FileNotFoundError(f"File not found: {path}")
-            
-        # Read simple CSV
-        df = pd.read_csv(path)
-        
+
+        df = pd.read_csv(path, **read_options(sniff_schema(path)))
+
         if df.empty:
             raise DataIngestionError("Input CSV file is empty.")
-            
-        # Convert to records logic (list of dicts)
-        # We process as list of dicts to stay flexible before strict typing
-        records = df.to_dict(orient="records")
-        return records
 
+        return df
+
+    except DataIngestionError:
+        raise
     except Exception as e:
         raise DataIngestionError(f"Failed to ingest CSV: {str(e)}") from e
+
+def load_csv(file_path: Union[str, Path]) -> List[Dict[str, Any]]:
+    """
+    Loads a CSV file and converts it to a list of dictionaries (raw records).
+    Does NOT perform normalization or validation against Event models yet.
+    Columns the normalizer does not use are never parsed (see `load_dataframe`).
+
+    Args:
+        file_path: Path to the CSV file.
+
+    Returns:
+        List[Dict[str, Any]]: Raw records.
+
+    Raises:
+        DataIngestionError: If file cannot be read or is empty.
+    """
+    # Convert to records logic (list of dicts)
+    # We process as list of dicts to stay flexible before strict typing
+    return load_dataframe(file_path).to_dict(orient="records")
@@ -0,0 +1,7 @@
+# Ingestion defaults that CLI option declarations need. This module must stay free
+# of heavy imports (pandas, numpy): command signatures are built for `bfai --help`.
+
+DEFAULT_MEMORY_BUDGET_MB = 512
+
+# Conventional name suffix of frame store directories (see frame_store)
+STORE_SUFFIX = ".bfai"
@@ -0,0 +1,105 @@
+import json
+import shutil
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+
+from bfai.core.exceptions import DataIngestionError
+from bfai.ingestion.defaults import STORE_SUFFIX as STORE_SUFFIX
+from bfai.models.trace_frame import TraceFrame
+
+# A frame store is a directory (conventionally named *.bfai) holding one .npy file
+# per TraceFrame column plus a small meta.json. Plain .npy files can be
+# memory-mapped, so opening a store costs almost nothing regardless of its size.
+FORMAT_VERSION = 1
+
+# Numeric arrays (integer codes, offsets and microsecond timestamps, float
+# durations) and the label arrays their codes index into
+_NUMERIC_COLUMNS = [
+    "offsets", "timestamps", "activity_codes", "actor_codes",
+    "actor_type_codes", "status_codes", "row_index", "duration_seconds",
+]
+_LABEL_COLUMNS = ["case_ids", "activities", "actors", "statuses"]
+
+
+def is_frame_store(path: Union[str, Path]) -> bool:
+    """True if `path` is a directory written by `save_frame`."""
+    return (Path(path) / "meta.json").is_file()
+
+
+def _as_text(values: np.ndarray) -> np.ndarray:
+    """Fixed-width unicode copy of a label array (object arrays cannot be mmapped)."""
+    if len(values) == 0:
+        return np.zeros(0, dtype="U1")
+    return np.asarray(values.astype(str))
+
+
+def save_frame(frame: TraceFrame, path: Union[str, Path]) -> Path:
+    """
+    Writes a TraceFrame to a frame store directory, replacing any existing store.
+
+    Args:
+        frame: Frame to persist (cases sorted by case_id, events by timestamp).
+        path: Target directory.
+
+    Returns:
+        Path: The store directory.
+    """
+    path = Path(path)
+    if path.exists():
+        if not is_frame_store(path):
+            raise DataIngestionError(f"Refusing to overwrite non-store path: {path}")
+        shutil.rmtree(path)
+    path.mkdir(parents=True)
+
+    for name in _NUMERIC_COLUMNS:
+        np.save(path / f"{name}.npy", np.ascontiguousarray(getattr(frame, name)))
+    for name in _LABEL_COLUMNS:
+        np.save(path / f"{name}.npy", _as_text(getattr(frame, name)))
+    if frame.event_ids is not None:
+        np.save(path / "event_ids.npy", _as_text(frame.event_ids))
+
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "n_cases": frame.n_cases,
+        "n_events": frame.n_events,
+        "has_event_ids": frame.event_ids is not None,
+    }
+    (path / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    return path
+
+
+def load_frame(path: Union[str, Path], mmap: bool = True) -> TraceFrame:
+    """
+    Opens a frame store written by `save_frame`.
+
+    Args:
+        path: Store directory.
+        mmap: Memory-map the column files instead of reading them into memory.
+
+    Returns:
+        TraceFrame: Frame backed by the store's arrays.
+
+    Raises:
+        DataIngestionError: If the directory is not a readable store.
+    """
+    path = Path(path)
+    try:
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        raise DataIngestionError(f"Not a BFAI frame store: {path} ({e})") from e
+    if meta.get("format_version") != FORMAT_VERSION:
+        raise DataIngestionError(
+            f"Unsupported frame store version {meta.get('format_version')} in {path}"
+        )
+
+    mode = "r" if mmap else None
+    columns = {
+        name: np.load(path / f"{name}.npy", mmap_mode=mode)
+        for name in _NUMERIC_COLUMNS + _LABEL_COLUMNS
+    }
+    if meta.get("has_event_ids"):
+        columns["event_ids"] = np.load(path / "event_ids.npy", mmap_mode=mode)
+
+    return TraceFrame(**columns)
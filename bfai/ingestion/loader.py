@@ -0,0 +1,114 @@
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Union
+
+import numpy as np
+
+from bfai.ingestion.arrow_loader import (
+    ARROW_SUFFIXES,
+    PARQUET_SUFFIXES,
+    load_arrow,
+    load_parquet,
+    sniff_arrow_schema,
+)
+from bfai.ingestion.csv_loader import load_dataframe, sniff_schema
+from bfai.ingestion.frame_store import is_frame_store, load_frame
+from bfai.ingestion.normalizer import normalize_to_frame
+from bfai.ingestion.streaming import (
+    DEFAULT_MEMORY_BUDGET_MB,
+    iter_csv_partitions,
+    load_csv_streaming,
+)
+from bfai.ingestion.timestamps import TimestampParser
+from bfai.models.trace_frame import TraceFrame
+
+# Cases per batch when a log that is already in columnar form is read in batches
+BATCH_CASES = 50_000
+
+
+def load_trace_frame(
+    file_path: Union[str, Path],
+    timestamp_parser: Optional[TimestampParser] = None,
+    stream: bool = False,
+    memory_budget_mb: int = DEFAULT_MEMORY_BUDGET_MB,
+) -> TraceFrame:
+    """
+    Loads and normalizes an event log, picking the reader from the path.
+
+    - `*.bfai` frame store (see `bfai convert`): memory-mapped, no parsing at all.
+    - `.parquet` / `.pq`: Parquet via pyarrow.
+    - `.arrow` / `.feather` / `.ipc`: Arrow IPC via pyarrow.
+    - anything else: CSV (chunked and spilled to disk if `stream`).
+
+    Args:
+        file_path: Path to the log.
+        timestamp_parser: Parser for the timestamp column (ignored for stores).
+        stream: Use the chunked CSV reader.
+        memory_budget_mb: Memory budget for the chunked CSV reader.
+
+    Returns:
+        TraceFrame: Columnar event log.
+    """
+    path = Path(file_path)
+    if is_frame_store(path):
+        return load_frame(path)
+
+    suffix = path.suffix.lower()
+    if suffix in PARQUET_SUFFIXES:
+        return normalize_to_frame(load_parquet(path), timestamp_parser)
+    if suffix in ARROW_SUFFIXES:
+        return normalize_to_frame(load_arrow(path), timestamp_parser)
+
+    if stream:
+        return load_csv_streaming(
+            path, memory_budget_mb=memory_budget_mb, timestamp_parser=timestamp_parser
+        )
+    return normalize_to_frame(load_dataframe(path), timestamp_parser)
+
+
+def iter_trace_batches(
+    file_path: Union[str, Path],
+    timestamp_parser: Optional[TimestampParser] = None,
+    memory_budget_mb: int = DEFAULT_MEMORY_BUDGET_MB,
+    batch_cases: int = BATCH_CASES,
+) -> Iterator[TraceFrame]:
+    """
+    Reads an event log as a sequence of frames holding disjoint, complete cases,
+    for pipelines that process one batch of cases at a time.
+
+    CSV files are read by the chunked reader, one spilled case partition per batch
+    (see `iter_csv_partitions`). Other formats are loaded as by `load_trace_frame`
+    (stores are memory-mapped) and cut into batches of `batch_cases` cases.
+
+    Args:
+        file_path: Path to the log.
+        timestamp_parser: Parser for the timestamp column (ignored for stores).
+        memory_budget_mb: Memory budget for the chunked CSV reader.
+        batch_cases: Cases per batch for non-CSV logs.
+
+    Yields:
+        TraceFrame: One batch of cases, sorted by case_id within the batch.
+    """
+    path = Path(file_path)
+    suffix = path.suffix.lower()
+    if not is_frame_store(path) and suffix not in PARQUET_SUFFIXES | ARROW_SUFFIXES:
+        yield from iter_csv_partitions(
+            path, memory_budget_mb=memory_budget_mb, timestamp_parser=timestamp_parser
+        )
+        return
+
+    frame = load_trace_frame(path, timestamp_parser)
+    for start in range(0, frame.n_cases, batch_cases):
+        yield frame.take(np.arange(start, min(start + batch_cases, frame.n_cases)))
+
+
+def sniff_source_schema(file_path: Union[str, Path]) -> Optional[Dict[str, str]]:
+    """
+    Resolves standard field -> source column for a log without reading its rows.
+    Returns None for frame stores (already normalized) or unresolvable schemas.
+    """
+    path = Path(file_path)
+    if is_frame_store(path):
+        return None
+    if path.suffix.lower() in PARQUET_SUFFIXES | ARROW_SUFFIXES:
+        return sniff_arrow_schema(path)
+    return sniff_schema(path)
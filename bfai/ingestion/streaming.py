@@ -0,0 +1,178 @@
+import math
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from bfai.core.exceptions import DataIngestionError
+from bfai.ingestion.csv_loader import read_options, sniff_schema
+from bfai.ingestion.defaults import DEFAULT_MEMORY_BUDGET_MB
+from bfai.ingestion.normalizer import normalize_to_frame
+from bfai.ingestion.timestamps import TimestampParser
+from bfai.models.trace_frame import TraceFrame
+
+# Rough in-memory size of a parsed row relative to its size on disk
+# (pandas object columns + index + temporaries during normalization).
+MEMORY_EXPANSION = 8
+
+# Upper bound on case partitions: one spill file per partition is open while
+# the CSV is read, which must stay well below the open-file limit (often 1024).
+MAX_PARTITIONS = 256
+
+
+def _average_row_bytes(path: Path, sample_bytes: int = 1 << 16) -> float:
+    """Estimates the average CSV line length from the head of the file."""
+    with open(path, "rb") as f:
+        sample = f.read(sample_bytes)
+    lines = sample.count(b"\n")
+    return len(sample) / max(lines, 1)
+
+
+def iter_csv_partitions(
+    file_path: Union[str, Path],
+    memory_budget_mb: int = DEFAULT_MEMORY_BUDGET_MB,
+    spill_dir: Optional[Union[str, Path]] = None,
+    n_partitions: Optional[int] = None,
+    timestamp_parser: Optional[TimestampParser] = None,
+) -> Iterator[TraceFrame]:
+    """
+    Reads a CSV that may be larger than memory as a sequence of normalized case
+    partitions.
+
+    The file is read in bounded chunks. Rows are routed by a stable hash of their
+    case_id into per-case partitions spilled to disk, so every case lives in exactly
+    one partition. Each partition is then normalized on its own and yielded, so
+    peak memory is one partition, not the whole file. Spill files are removed as
+    soon as their partition has been read. At most `MAX_PARTITIONS` partitions are
+    used; beyond that, partitions may exceed the budget.
+
+    Args:
+        file_path: Path to the CSV file.
+        memory_budget_mb: Approximate peak memory to stay within while parsing.
+        spill_dir: Directory for partition files. A temporary directory is used
+                   (and removed afterwards) if omitted.
+        n_partitions: Number of case partitions (at most `MAX_PARTITIONS`).
+                      Derived from the file size and the budget if omitted.
+        timestamp_parser: Parser shared by all partitions, so the timestamp
+                          format is inferred once per file.
+
+    Yields:
+        TraceFrame: The complete cases of one partition, sorted by case_id text.
+
+    Raises:
+        DataIngestionError: If the file cannot be read or is empty.
+        SchemaValidationError: If required columns are missing or rows are invalid.
+    """
+    path = Path(file_path)
+    if not path.exists():
+        raise DataIngestionError(f"Failed to ingest CSV: File not found: {path}")
+
+    # Resolve the synonym mapping once, from the header; only those columns are parsed
+    schema = sniff_schema(path, strict=True)
+    mapping = {source: standard for standard, source in schema.items()}
+
+    budget_bytes = max(memory_budget_mb, 1) * 1024 * 1024
+    row_bytes = _average_row_bytes(path) * MEMORY_EXPANSION
+    # Each partition must fit the budget once parsed; chunks use a fraction of it
+    if n_partitions is None:
+        n_partitions = max(
+            1, math.ceil(os.path.getsize(path) * MEMORY_EXPANSION / budget_bytes)
+        )
+    n_partitions = min(n_partitions, MAX_PARTITIONS)
+    chunk_rows = max(1_000, int(budget_bytes / row_bytes / 4))
+
+    with tempfile.TemporaryDirectory(prefix="bfai-spill-", dir=spill_dir) as tmp:
+        part_paths = [Path(tmp) / f"part-{p:05d}.pkl" for p in range(n_partitions)]
+        handles: Dict[int, object] = {}
+        n_rows = 0
+        try:
+            reader = pd.read_csv(path, chunksize=chunk_rows, **read_options(schema))
+            for chunk in reader:
+                # Index continues across chunks, so it keeps the global row number
+                chunk.rename(columns=mapping, inplace=True)
+                n_rows += len(chunk)
+
+                if n_partitions == 1:
+                    parts = {0: chunk}
+                else:
+                    keys = pd.util.hash_pandas_object(chunk["case_id"], index=False)
+                    route = (keys.to_numpy() % np.uint64(n_partitions)).astype(np.int64)
+                    parts = {
+                        int(p): part for p, part in chunk.groupby(route, sort=False)
+                    }
+
+                for p, part in parts.items():
+                    if p not in handles:
+                        handles[p] = open(part_paths[p], "wb")
+                    pickle.dump(part, handles[p], protocol=pickle.HIGHEST_PROTOCOL)
+        except (pd.errors.ParserError, UnicodeDecodeError) as e:
+            raise DataIngestionError(f"Failed to ingest CSV: {str(e)}") from e
+        finally:
+            for handle in handles.values():
+                handle.close()
+
+        if n_rows == 0:
+            raise DataIngestionError("Input CSV file is empty.")
+
+        parser = timestamp_parser or TimestampParser()
+        for p in sorted(handles):
+            pieces = []
+            with open(part_paths[p], "rb") as f:
+                while True:
+                    try:
+                        pieces.append(pickle.load(f))
+                    except EOFError:
+                        break
+            part_paths[p].unlink()
+            frame = normalize_to_frame(pd.concat(pieces), parser)
+            del pieces
+            yield frame.take(np.argsort(frame.case_ids.astype(str), kind="stable"))
+
+
+def load_csv_streaming(
+    file_path: Union[str, Path],
+    memory_budget_mb: int = DEFAULT_MEMORY_BUDGET_MB,
+    spill_dir: Optional[Union[str, Path]] = None,
+    n_partitions: Optional[int] = None,
+    timestamp_parser: Optional[TimestampParser] = None,
+) -> TraceFrame:
+    """
+    Loads and normalizes a CSV whose parsing would not fit in memory: the
+    partitions of `iter_csv_partitions`, stacked into one frame.
+
+    Only parsing is bounded by `memory_budget_mb`; the returned frame holds the
+    whole log (columnar, much smaller than the parsed CSV), and stacking briefly
+    needs it twice. To stay within the budget end to end, consume
+    `iter_csv_partitions` (or `loader.iter_trace_batches`) instead.
+
+    Unlike `load_csv`, case ids are read as text exactly as they appear in the file
+    and cases are ordered by that text.
+
+    Args:
+        file_path: Path to the CSV file.
+        memory_budget_mb: Approximate peak memory to stay within while parsing.
+        spill_dir: Directory for partition files. A temporary directory is used
+                   (and removed afterwards) if omitted.
+        n_partitions: Number of case partitions (at most `MAX_PARTITIONS`).
+                      Derived from the file size and the budget if omitted.
+        timestamp_parser: Parser shared by all partitions, so the timestamp
+                          format is inferred once per file.
+
+    Returns:
+        TraceFrame: Columnar event log, cases sorted by case_id.
+
+    Raises:
+        DataIngestionError: If the file cannot be read or is empty.
+        SchemaValidationError: If required columns are missing or rows are invalid.
+    """
+    frames = list(
+        iter_csv_partitions(
+            file_path, memory_budget_mb, spill_dir, n_partitions, timestamp_parser
+        )
+    )
+    frame = TraceFrame.concat(frames)
+    return frame.take(np.argsort(frame.case_ids.astype(str), kind="stable"))
@@ -0,0 +1,148 @@
+import warnings
+from collections import Counter
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+from bfai.core.exceptions import SchemaValidationError
+
+# Special values accepted for an explicit format
+EPOCH_FORMATS = {"epoch_s": "s", "epoch_ms": "ms", "epoch_us": "us"}
+ISO8601 = "ISO8601"
+MIXED = "mixed"
+
+# Largest magnitude still read as seconds / milliseconds when the epoch unit is
+# inferred (1e11 s is ~year 5138, 1e14 ms is ~year 5138).
+_MAX_EPOCH_SECONDS = 1e11
+_MAX_EPOCH_MILLIS = 1e14
+
+# How many offending rows to quote in a parse error
+_MAX_REPORTED_ROWS = 5
+
+
+def _infer_epoch_unit(values: np.ndarray) -> str:
+    """Guesses the epoch unit from the magnitude of the values."""
+    finite = np.abs(values[np.isfinite(values)])
+    magnitude = float(np.median(finite)) if len(finite) else 0.0
+    if magnitude < _MAX_EPOCH_SECONDS:
+        return "s"
+    if magnitude < _MAX_EPOCH_MILLIS:
+        return "ms"
+    return "us"
+
+
+class TimestampParser:
+    """
+    Parses timestamp columns into UTC datetimes.
+
+    String formats are inferred from a sample of the first column parsed and the
+    result is cached on the parser, so chunks/partitions of the same log reuse it.
+    Numeric columns (or an explicit `epoch_*` format) are read as epoch offsets,
+    as are digit strings only when they match no date format (`%Y%m%d`, ...).
+    Parsing runs as one vectorized call; only when it fails are the offending rows
+    located and reported.
+    """
+
+    def __init__(self, fmt: Optional[str] = None, sample_size: int = 100):
+        """
+        Args:
+            fmt: strftime format, "ISO8601", "mixed", "epoch_s", "epoch_ms",
+                 "epoch_us", or None to infer it from the data.
+            sample_size: Number of non-null values inspected when inferring.
+        """
+        self.fmt = fmt
+        self.sample_size = sample_size
+        self.explicit = fmt is not None
+
+    def infer_format(self, values: pd.Series) -> str:
+        """Infers (and caches) the format from a sample of non-null values."""
+        if self.fmt is not None:
+            return self.fmt
+
+        sample = values.dropna().head(self.sample_size)
+        if pd.api.types.is_numeric_dtype(values.dtype):
+            return self._infer_epoch(sample)
+
+        with warnings.catch_warnings():
+            # pandas warns about dayfirst/unguessable values; the fallbacks handle them
+            warnings.simplefilter("ignore", UserWarning)
+            guesses = Counter(guess_datetime_format(str(v)) for v in sample)
+        guesses.pop(None, None)
+        if not guesses:
+            if len(sample) and sample.astype(str).str.fullmatch(r"-?\d+").all():
+                # Digit strings that are no date format (e.g. not %Y%m%d) are epochs
+                return self._infer_epoch(sample)
+            # Unrecognized sample: let pandas handle each element
+            self.fmt = MIXED
+        elif len(guesses) > 1 and all(g.startswith("%Y-%m-%d") for g in guesses):
+            # ISO dates with varying precision/offsets still have a fast parser
+            self.fmt = ISO8601
+        else:
+            # Most common format; rows it does not fit are parsed by the fallbacks
+            self.fmt = guesses.most_common(1)[0][0]
+        return self.fmt
+
+    def _infer_epoch(self, sample: pd.Series) -> str:
+        as_numbers = pd.to_numeric(sample, errors="coerce").to_numpy(dtype=float)
+        self.fmt = f"epoch_{_infer_epoch_unit(as_numbers)}"
+        return self.fmt
+
+    def parse(self, values: pd.Series) -> pd.Series:
+        """
+        Parses `values` into a tz-aware UTC datetime Series (same index).
+
+        Raises:
+            SchemaValidationError: Listing the rows (by index) that are missing or
+                                   do not match the format.
+        """
+        fmt = self.infer_format(values)
+
+        try:
+            parsed = self._convert(values, fmt, errors="raise")
+        except (ValueError, TypeError, OverflowError):
+            parsed = self._convert(values, fmt, errors="coerce")
+            if (
+                not self.explicit
+                and fmt not in (ISO8601, MIXED)
+                and fmt not in EPOCH_FORMATS
+            ):
+                # Inferred format only fits part of the column: fill in the rest
+                failed = parsed.isna() & values.notna()
+                retry = self._convert(values[failed], ISO8601, errors="coerce")
+                retry = retry.fillna(
+                    self._convert(values[failed], MIXED, errors="coerce")
+                )
+                parsed = parsed.where(~failed, retry)
+
+        self._check(values, parsed, fmt)
+        return parsed
+
+    @staticmethod
+    def _convert(values: pd.Series, fmt: str, errors: str) -> pd.Series:
+        if fmt in EPOCH_FORMATS:
+            numbers = pd.to_numeric(
+                values, errors="raise" if errors == "raise" else "coerce"
+            )
+            return pd.to_datetime(
+                numbers, unit=EPOCH_FORMATS[fmt], utc=True, errors=errors
+            )
+        return pd.to_datetime(values, format=fmt, utc=True, errors=errors)
+
+    @staticmethod
+    def _check(values: pd.Series, parsed: pd.Series, fmt: str) -> None:
+        bad = parsed.isna()
+        if not bad.any():
+            return
+
+        rows: List[str] = [
+            f"row {idx}: {value!r}"
+            for idx, value in values[bad].head(_MAX_REPORTED_ROWS).items()
+        ]
+        more = int(bad.sum()) - len(rows)
+        raise SchemaValidationError(
+            f"Timestamp parsing failed for {int(bad.sum())} row(s) (format: {fmt}): "
+            + "; ".join(rows)
+            + (f"; ... and {more} more" if more > 0 else "")
+        )
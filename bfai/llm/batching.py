@@ -0,0 +1,60 @@
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Optional
+
+from bfai.models.anomaly import Anomaly
+
+# Rough prompt cost: ~4 characters per token, plus fixed per-item framing
+CHARS_PER_TOKEN = 4
+ITEM_OVERHEAD_TOKENS = 16
+
+
+def estimate_tokens(anomaly: Anomaly) -> int:
+    """Approximate prompt tokens needed to describe one anomaly."""
+    text = (
+        len(anomaly.anomaly_id) + len(anomaly.anomaly_type) + len(anomaly.description)
+    )
+    return ITEM_OVERHEAD_TOKENS + text // CHARS_PER_TOKEN
+
+
+def make_batches(
+    anomalies: List[Anomaly], max_items: int, max_tokens: Optional[int] = None
+) -> List[List[int]]:
+    """
+    Packs anomalies, in order, into batches of at most `max_items` items and
+    `max_tokens` estimated tokens (an item larger than the token limit gets a
+    batch of its own).
+
+    Returns:
+        List[List[int]]: Indices into `anomalies`, per batch.
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    tokens = 0
+    for i, anomaly in enumerate(anomalies):
+        cost = estimate_tokens(anomaly)
+        if current and (
+            len(current) >= max_items
+            or (max_tokens is not None and tokens + cost > max_tokens)
+        ):
+            batches.append(current)
+            current, tokens = [], 0
+        current.append(i)
+        tokens += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def match_results(requested: List[Anomaly], results: List[Anomaly]) -> List[Anomaly]:
+    """
+    Maps batch results back to the requested anomalies by `anomaly_id`, whatever
+    order the provider returned them in. Repeated ids are matched in order; a
+    requested anomaly without a result is kept as it was.
+    """
+    by_id: Dict[str, Deque[Anomaly]] = defaultdict(deque)
+    for result in results:
+        by_id[result.anomaly_id].append(result)
+    return [
+        by_id[a.anomaly_id].popleft() if by_id[a.anomaly_id] else a
+        for a in requested
+    ]
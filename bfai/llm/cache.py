@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from bfai.llm.llm_interface import AsyncLLMProvider, LLMProvider
+from bfai.models.anomaly import Anomaly
+
+DEFAULT_MAX_ENTRIES = 50_000
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+
+# (root_cause, recommendation)
+Enrichment = Tuple[Optional[str], Optional[str]]
+
+
+def default_cache_path() -> Path:
+    """$BFAI_CACHE_DIR, else $XDG_CACHE_HOME/bfai, else ~/.cache/bfai."""
+    directory = os.environ.get("BFAI_CACHE_DIR")
+    if not directory:
+        base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+        directory = Path(base) / "bfai"
+    return Path(directory) / "enrichment.sqlite"
+
+
+def enrichment_key(
+    provider: Union[LLMProvider, AsyncLLMProvider], anomaly: Anomaly
+) -> str:
+    """
+    Content hash of everything an enrichment depends on: the provider, its
+    model/prompt version and the fields of the anomaly sent to it. Ids and
+    involved events are left out, so the same finding reported again (e.g. by a
+    later run on the same log) maps to the same entry.
+    """
+    payload = json.dumps([
+        provider.provider_id,
+        provider.prompt_version,
+        anomaly.anomaly_type,
+        anomaly.signature,
+        anomaly.severity.value,
+        anomaly.description,
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class EnrichmentCache:
+    """
+    On-disk (SQLite) cache of enrichments, keyed by `enrichment_key`.
+
+    Entries expire `ttl_seconds` after they were written. When the cache holds more
+    than `max_entries`, the least recently used entries are evicted.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            path: SQLite file (default: `default_cache_path()`); ":memory:" for a
+                  cache that lives only as long as this object.
+            max_entries: Size bound enforced by LRU eviction.
+            ttl_seconds: Lifetime of an entry (None: entries never expire).
+            clock: Time source (seconds), for tests.
+        """
+        path = path or default_cache_path()
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._conn = sqlite3.connect(str(path))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS enrichments ("
+            " key TEXT PRIMARY KEY,"
+            " root_cause TEXT,"
+            " recommendation TEXT,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS enrichments_accessed ON enrichments (accessed)"
+        )
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM enrichments").fetchone()[0]
+
+    def _expiry(self, now: float) -> float:
+        return now - self.ttl_seconds if self.ttl_seconds is not None else float("-inf")
+
+    def get_many(self, keys: List[str]) -> Dict[str, Enrichment]:
+        """Returns the live entries among `keys` and marks them as recently used."""
+        now = self.clock()
+        found: Dict[str, Enrichment] = {}
+        unique = list(dict.fromkeys(keys))
+        # Stay under SQLite's host parameter limit
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT key, root_cause, recommendation FROM enrichments"
+                f" WHERE created > ? AND key IN ({','.join('?' * len(chunk))})",
+                [self._expiry(now), *chunk],
+            ).fetchall()
+            found.update(
+                (key, (root_cause, recommendation))
+                for key, root_cause, recommendation in rows
+            )
+        if found:
+            self._conn.executemany(
+                "UPDATE enrichments SET accessed = ? WHERE key = ?",
+                [(now, key) for key in found],
+            )
+            self._conn.commit()
+        return found
+
+    def put_many(self, entries: Dict[str, Enrichment]) -> None:
+        """Stores entries, then drops expired ones and evicts down to `max_entries`."""
+        now = self.clock()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO enrichments VALUES (?, ?, ?, ?, ?)",
+            [(key, root_cause, recommendation, now, now)
+             for key, (root_cause, recommendation) in entries.items()],
+        )
+        self._conn.execute(
+            "DELETE FROM enrichments WHERE created <= ?", (self._expiry(now),)
+        )
+        excess = len(self) - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM enrichments WHERE key IN"
+                " (SELECT key FROM enrichments ORDER BY accessed, rowid LIMIT ?)",
+                (excess,),
+            )
+        self._conn.commit()
+
+    def clear(self) -> None:
+        self._conn.execute("DELETE FROM enrichments")
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
@@ -1,18 +1,42 @@
-from bfai.llm.llm_interface import LLMProvider
+import os
+from typing import Union
+
+from bfai.llm.llm_interface import AsyncLLMProvider, LLMProvider
 from bfai.llm.mock_provider import MockLLMProvider
+from bfai.llm.stub_provider import StubLLMProvider
+
 
-def get_llm_provider(mode: str = "mock") -> LLMProvider:
+def get_llm_provider(mode: str = "mock") -> Union[LLMProvider, AsyncLLMProvider]:
     """
     Factory to get the appropriate LLM provider.
     
     Args:
-        mode: 'mock' (default) or 'gemini' (future).
+        mode: 'mock' (default), 'stub' (async mock with simulated latency),
+              'http' (enrichment service at $BFAI_LLM_URL, model $BFAI_LLM_MODEL,
+              key $BFAI_LLM_API_KEY) or 'gemini' (future).
     """
     if mode == "mock":
         return MockLLMProvider()
     
+    if mode == "stub":
+        return StubLLMProvider()
+    
+    if mode == "http":
+        from bfai.llm.http_provider import HTTPLLMProvider
+        url = os.environ.get("BFAI_LLM_URL")
+        if not url:
+            raise ValueError(
+                "LLM provider mode 'http' requires the BFAI_LLM_URL environment "
+                "variable"
+            )
+        return HTTPLLMProvider(
+            url,
+            model=os.environ.get("BFAI_LLM_MODEL", "default"),
+            api_key=os.environ.get("BFAI_LLM_API_KEY"),
+        )
+
     # Future:
     # if mode == "gemini":
     #     return GeminiLLMProvider()
-        
+
     raise ValueError(f"Unknown LLM provider mode: {mode}")
@@ -0,0 +1,159 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from bfai.llm.mock_provider import MockLLMProvider
+
+
+class FakeLLMServer:
+    """
+    Local stand-in for an HTTP enrichment service (the `HTTPLLMProvider`
+    protocol), answering like `MockLLMProvider`. It can add latency, fail a share
+    of requests with a given status and Retry-After, and counts requests and
+    connections, so throughput and failure handling can be tested and benchmarked
+    without network access.
+
+    Usage:
+        with FakeLLMServer(latency=0.01) as server:
+            provider = HTTPLLMProvider(server.url)
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        failure_status: int = 503,
+        retry_after: Optional[float] = None,
+        seed: Optional[int] = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        """
+        Args:
+            latency: Seconds spent on each request.
+            failure_rate: Probability that a request fails with `failure_status`.
+            failure_status: HTTP status of simulated failures.
+            retry_after: Retry-After (seconds) sent with failures (None: omitted).
+            seed: Random seed, for reproducible failures (None: unseeded).
+            host: Interface to listen on.
+            port: Port to listen on (0: any free port).
+        """
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.mock = MockLLMProvider()
+        self._lock = threading.Lock()
+        # Observed statistics
+        self.requests = 0
+        self.failures = 0
+        self.items = 0
+        self.connections = 0
+
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/enrich"
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _answer(self, body: bytes):
+        """(status, headers, payload) for one request."""
+        with self._lock:
+            self.requests += 1
+            failed = self.random.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            headers = (
+                {"Retry-After": f"{self.retry_after:g}"}
+                if self.retry_after is not None
+                else {}
+            )
+            return self.failure_status, headers, {"error": "simulated failure"}
+
+        anomalies = json.loads(body).get("anomalies", [])
+        with self._lock:
+            self.items += len(anomalies)
+        results = []
+        for anomaly in anomalies:
+            root_cause, recommendation = self.mock._advice(anomaly.get("anomaly_type"))
+            results.append({
+                "anomaly_id": anomaly.get("anomaly_id"),
+                "root_cause": root_cause,
+                "recommendation": recommendation,
+            })
+        return 200, {}, {"results": results}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1: connections stay open between requests
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; don't let Nagle delay the body
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                status, headers, payload = server._answer(body)
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a fake LLM enrichment server.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake = FakeLLMServer(
+        latency=args.latency, failure_rate=args.failure_rate, port=args.port
+    )
+    print(f"Fake LLM server listening on {fake.url}")
+    try:
+        fake._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
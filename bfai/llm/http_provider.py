@@ -0,0 +1,336 @@
+import asyncio
+import http.client
+import json
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Deque, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from bfai.core.exceptions import CircuitOpenError, LLMProviderError
+from bfai.llm.llm_interface import AsyncLLMProvider
+from bfai.models.anomaly import Anomaly
+
+# Errors on a reused keep-alive connection that the server may have closed while idle
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+# Statuses worth retrying (after Retry-After, if given)
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+
+def parse_retry_after(
+    value: Optional[str], now: Optional[float] = None
+) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delay in seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(when - (now if now is not None else time.time()), 0.0)
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing backend: after `failure_threshold` consecutive
+    failures the circuit opens and calls fail fast for `reset_timeout` seconds.
+    Then one trial call is let through (half-open); its success closes the
+    circuit, its failure opens it again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self) -> None:
+        """Raises CircuitOpenError unless a call may go through now."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return
+            remaining = max(self.reset_timeout - (self.clock() - self.opened_at), 0.0)
+            raise CircuitOpenError(
+                f"Circuit open after {self.failures} consecutive failures",
+                retry_after=remaining,
+            )
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self._trial = False
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of persistent (keep-alive) HTTP connections to one host,
+    shared by the provider's worker threads.
+    """
+
+    def __init__(self, url: str, size: int = 8, timeout: Optional[float] = 30.0):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme for HTTP provider: {url}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port
+        self.size = size
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        # Connections opened so far (reuse keeps this close to `size`)
+        self.connections_opened = 0
+
+    def _connect(self) -> http.client.HTTPConnection:
+        with self._lock:
+            self.connections_opened += 1
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(
+                self.host, self.port, timeout=self.timeout
+            )
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method: str, path: str, body: bytes, headers: Dict[str, str]):
+        """
+        Sends one request over a pooled connection.
+
+        Returns:
+            (status, headers, body) of the response.
+        """
+        with self._slots:
+            try:
+                conn, reused = self._idle.get_nowait(), True
+            except queue.Empty:
+                conn, reused = self._connect(), False
+            try:
+                try:
+                    response = self._send(conn, method, path, body, headers)
+                except STALE_CONNECTION_ERRORS:
+                    if not reused:
+                        raise
+                    # The server dropped the idle connection: retry once on a new one
+                    conn.close()
+                    conn = self._connect()
+                    response = self._send(conn, method, path, body, headers)
+            except Exception:
+                conn.close()
+                raise
+            if response[1].get("connection", "").lower() == "close":
+                conn.close()
+            else:
+                self._idle.put(conn)
+            return response
+
+    @staticmethod
+    def _send(conn, method, path, body, headers):
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        data = response.read()
+        return response.status, {k.lower(): v for k, v in response.getheaders()}, data
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class HTTPLLMProvider(AsyncLLMProvider):
+    """
+    Provider for an LLM enrichment service over HTTP/JSON.
+
+    Protocol: POST `url` with
+    {"model", "prompt_version",
+     "anomalies": [{anomaly_id, anomaly_type, description, severity, signature}]}
+    answered by {"results": [{anomaly_id, root_cause, recommendation}]}.
+    A single anomaly is a batch of one.
+
+    Requests reuse a pool of keep-alive connections; up to `pool_size` of them are
+    in flight at once when `ReasoningEngine` issues concurrent requests. This is
+    concurrency over persistent connections driven from a thread pool, not HTTP/1.1
+    pipelining: each connection carries one request at a time (`http.client` does
+    not pipeline, and few servers support it).
+
+    Retryable failures (connection errors, 429 and 5xx) raise LLMProviderError
+    carrying the server's Retry-After, which `ReasoningEngine` honours. Repeated
+    failures open a circuit breaker, after which calls fail fast until it resets.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        model: str = "default",
+        api_key: Optional[str] = None,
+        pool_size: int = 8,
+        timeout: Optional[float] = 30.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ):
+        """
+        Args:
+            url: Endpoint URL (http or https).
+            model: Model name sent with every request (and part of cache keys).
+            api_key: Sent as a bearer token, if given.
+            pool_size: Persistent connections (and max concurrent requests).
+            timeout: Socket timeout per request in seconds.
+            failure_threshold: Consecutive failures that open the circuit.
+            reset_timeout: Seconds the circuit stays open before a trial call.
+        """
+        self.url = url
+        self.path = urlsplit(url).path or "/"
+        self.model = model
+        self.headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
+        if api_key:
+            self.headers["Authorization"] = f"Bearer {api_key}"
+        self.pool = ConnectionPool(url, pool_size, timeout)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._executor = ThreadPoolExecutor(
+            max_workers=pool_size, thread_name_prefix="bfai-http"
+        )
+        # Observed request statistics, updated from the worker threads
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def provider_id(self) -> str:
+        return f"http:{self.url}#{self.model}"
+
+    async def enrich_anomaly(self, anomaly: Anomaly) -> Anomaly:
+        results = await self.enrich_batch([anomaly])
+        if not results:
+            raise LLMProviderError(f"No result for anomaly {anomaly.anomaly_id}")
+        return results[0]
+
+    async def enrich_batch(self, anomalies: List[Anomaly]) -> List[Anomaly]:
+        payload = {
+            "model": self.model,
+            "prompt_version": self.prompt_version,
+            "anomalies": [
+                a.model_dump(
+                    mode="json",
+                    include={
+                        "anomaly_id",
+                        "anomaly_type",
+                        "description",
+                        "severity",
+                        "signature",
+                    },
+                )
+                for a in anomalies
+            ],
+        }
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(
+            self._executor, self._post, json.dumps(payload).encode("utf-8")
+        )
+        return self._apply(anomalies, data.get("results", []))
+
+    def _post(self, body: bytes) -> Dict[str, Any]:
+        """Blocking request on a worker thread, guarded by the circuit breaker."""
+        self.breaker.before_call()
+        with self._stats_lock:
+            self.requests += 1
+        try:
+            status, headers, data = self.pool.request(
+                "POST", self.path, body, self.headers
+            )
+        except (OSError, http.client.HTTPException) as e:
+            self._failed()
+            raise LLMProviderError(f"HTTP provider request failed: {e}") from e
+        except BaseException:
+            # Never leave a half-open trial call unresolved
+            self._failed()
+            raise
+
+        if status in RETRYABLE_STATUSES:
+            self._failed()
+            raise LLMProviderError(
+                f"HTTP provider returned {status}",
+                retry_after=parse_retry_after(headers.get("retry-after")),
+            )
+        if status != 200:
+            # The request itself is wrong: not a sign of an unhealthy backend,
+            # which answered, so a trial call still closes the circuit
+            with self._stats_lock:
+                self.failures += 1
+            self.breaker.record_success()
+            raise LLMProviderError(f"HTTP provider returned {status}: {data[:200]!r}")
+
+        self.breaker.record_success()
+        try:
+            return json.loads(data)
+        except ValueError as e:
+            raise LLMProviderError(f"HTTP provider returned invalid JSON: {e}") from e
+
+    def _failed(self) -> None:
+        with self._stats_lock:
+            self.failures += 1
+        self.breaker.record_failure()
+
+    @staticmethod
+    def _apply(
+        anomalies: List[Anomaly], results: List[Dict[str, Any]]
+    ) -> List[Anomaly]:
+        """Enriched copies of the anomalies with a result (repeated ids in order)."""
+        by_id: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        for result in results:
+            by_id[str(result.get("anomaly_id"))].append(result)
+        enriched = []
+        for anomaly in anomalies:
+            if by_id[anomaly.anomaly_id]:
+                result = by_id[anomaly.anomaly_id].popleft()
+                enriched.append(anomaly.model_copy(update={
+                    "root_cause": result.get("root_cause"),
+                    "recommendation": result.get("recommendation"),
+                }))
+        return enriched
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        self.pool.close()
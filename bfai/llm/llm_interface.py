@@ -1,20 +1,78 @@
+import asyncio
 from abc import ABC, abstractmethod
+from typing import List
+
 from bfai.models.anomaly import Anomaly
 
+
 class LLMProvider(ABC):
     """
     Abstract adapter for LLM interactions.
     """
     
+    # Version of the model + prompt template; bump it when enrichments would change
+    # so cached results of the old version are no longer used.
+    prompt_version = "1"
+    
+    @property
+    def provider_id(self) -> str:
+        """Identifies the provider (and model) in enrichment cache keys."""
+        return type(self).__name__
+    
     @abstractmethod
     def enrich_anomaly(self, anomaly: Anomaly) -> Anomaly:
         """
         Enriches an anomaly with root cause and recommendations.
-        
+
+        Args:
+            anomaly: The anomaly detected by the friction engine.
+
+        Returns:
+            Anomaly: The same anomaly with `root_cause` and `recommendation` populated.
+        """
+        pass
+
+    def enrich_batch(self, anomalies: List[Anomaly]) -> List[Anomaly]:
+        """
+        Enriches several anomalies in one request. Results are matched back by
+        `anomaly_id`, so they may come back in any order.
+
+        The default makes one `enrich_anomaly` call per item; providers with a
+        batched API override it.
+        """
+        return [self.enrich_anomaly(a) for a in anomalies]
+
+
+class AsyncLLMProvider(ABC):
+    """
+    Abstract adapter for LLM interactions over asyncio (e.g. network-backed models).
+    `ReasoningEngine` runs many of these calls concurrently.
+    """
+
+    # See LLMProvider
+    prompt_version = "1"
+
+    @property
+    def provider_id(self) -> str:
+        """Identifies the provider (and model) in enrichment cache keys."""
+        return type(self).__name__
+
+    @abstractmethod
+    async def enrich_anomaly(self, anomaly: Anomaly) -> Anomaly:
+        """
+        Enriches an anomaly with root cause and recommendations.
+
         Args:
             anomaly: The anomaly detected by the friction engine.
-            
+
         Returns:
             Anomaly: The same anomaly object with `root_cause` and `recommendation` populated.
         """
         pass
+
+    async def enrich_batch(self, anomalies: List[Anomaly]) -> List[Anomaly]:
+        """
+        Enriches several anomalies in one request (see `LLMProvider.enrich_batch`).
+        The default runs one `enrich_anomaly` call per item, concurrently.
+        """
+        return list(await asyncio.gather(*(self.enrich_anomaly(a) for a in anomalies)))
@@ -0,0 +1,63 @@
+import asyncio
+import random
+from typing import List, Optional
+
+from bfai.llm.llm_interface import AsyncLLMProvider
+from bfai.llm.mock_provider import MockLLMProvider
+from bfai.models.anomaly import Anomaly
+
+
+class StubLLMProvider(AsyncLLMProvider):
+    """
+    Local async stand-in for a network-backed provider: answers like
+    `MockLLMProvider` after a simulated latency, and fails a configurable share of
+    calls. Used to exercise concurrency, rate limiting, timeouts and retries
+    without a real model.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: Optional[int] = 0,
+    ):
+        """
+        Args:
+            latency: Seconds each call takes.
+            jitter: Extra random latency, uniformly in [0, jitter] seconds.
+            failure_rate: Probability that a call raises an error.
+            seed: Random seed, for reproducible failures (None: unseeded).
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.mock = MockLLMProvider()
+        # Observed call statistics
+        self.calls = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _request(self) -> None:
+        """One simulated round trip: latency, then maybe a failure."""
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency + self.random.uniform(0, self.jitter))
+            if self.random.random() < self.failure_rate:
+                self.failures += 1
+                raise ConnectionError("Simulated provider failure")
+        finally:
+            self.in_flight -= 1
+
+    async def enrich_anomaly(self, anomaly: Anomaly) -> Anomaly:
+        await self._request()
+        return self.mock.enrich_anomaly(anomaly)
+
+    async def enrich_batch(self, anomalies: List[Anomaly]) -> List[Anomaly]:
+        # A whole batch costs one round trip
+        await self._request()
+        return self.mock.enrich_batch(anomalies)
@@ -21,7 +21,13 @@ class Anomaly(BaseModel):
     
     # Context for UI/Reasoning
     involved_events: List[str] = Field(default_factory=list, description="List of event_ids involved")
-    
+    signature: Optional[str] = Field(
+        default=None,
+        description=(
+            "Case-independent subject of the finding (transition, activity, cycle)"
+        ),
+    )
+
     # AI Reasoning/Analysis (populated later)
     root_cause: Optional[str] = None
     recommendation: Optional[str] = None
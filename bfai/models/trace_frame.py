@@ -0,0 +1,380 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from bfai.models.event import ActorType, Event
+from bfai.models.trace import Trace
+
+# Actor types are stored as small integer codes (index into this tuple).
+ACTOR_TYPES: Tuple[ActorType, ...] = (ActorType.SYSTEM, ActorType.HUMAN)
+HUMAN_CODE = ACTOR_TYPES.index(ActorType.HUMAN)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def to_micros(ts: datetime) -> int:
+    """Converts a datetime to integer microseconds since the epoch (naive = UTC)."""
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return (ts - _EPOCH) // _MICROSECOND
+
+
+def _encode(values: Sequence[Optional[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Dictionary-encodes values in order of first appearance. None -> -1."""
+    lookup: Dict[str, int] = {}
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, value in enumerate(values):
+        if value is None:
+            codes[i] = -1
+            continue
+        codes[i] = lookup.setdefault(value, len(lookup))
+    return codes, np.array(list(lookup), dtype=object)
+
+
+class TraceFrame:
+    """
+    Columnar, read-only store of a normalized event log.
+
+    Events are laid out case by case (events sorted by timestamp inside each case),
+    so ``offsets[i]:offsets[i + 1]`` is the slice of events belonging to case ``i``.
+    Timestamps are int64 microseconds since the epoch (UTC) and string columns are
+    categorical codes into a per-column array of labels.
+
+    `Trace` / `Event` objects are only built on demand via `trace()` / `get_trace()`.
+    """
+
+    def __init__(
+        self,
+        case_ids: np.ndarray,
+        offsets: np.ndarray,
+        timestamps: np.ndarray,
+        activity_codes: np.ndarray,
+        activities: np.ndarray,
+        actor_codes: np.ndarray,
+        actors: np.ndarray,
+        actor_type_codes: np.ndarray,
+        status_codes: np.ndarray,
+        statuses: np.ndarray,
+        row_index: np.ndarray,
+        duration_seconds: Optional[np.ndarray] = None,
+        event_ids: Optional[np.ndarray] = None,
+        traces: Optional[List[Trace]] = None,
+    ):
+        """
+        Args:
+            case_ids: Case identifier per case (length n_cases).
+            offsets: Event offsets per case (length n_cases + 1).
+            timestamps: Event timestamps in microseconds since the epoch (UTC).
+            activity_codes / activities: Activity code per event and its labels.
+            actor_codes / actors: Actor code per event (-1 = no actor) and its labels.
+            actor_type_codes: Index into `ACTOR_TYPES` per event.
+            status_codes / statuses: Lifecycle status code per event and its labels.
+            row_index: Source row number per event (used to build event ids).
+            duration_seconds: Per-case duration. Derived from timestamps if omitted.
+            event_ids: Explicit event ids. Derived as "{case_id}_{row}" if omitted.
+            traces: Already-built Trace objects backing this frame, if any.
+        """
+        self.case_ids = case_ids
+        self.offsets = offsets
+        self.timestamps = timestamps
+        self.activity_codes = activity_codes
+        self.activities = activities
+        self.actor_codes = actor_codes
+        self.actors = actors
+        self.actor_type_codes = actor_type_codes
+        self.status_codes = status_codes
+        self.statuses = statuses
+        self.row_index = row_index
+        self.event_ids = event_ids
+
+        if duration_seconds is None:
+            if len(case_ids):
+                spans = timestamps[offsets[1:] - 1] - timestamps[offsets[:-1]]
+            else:
+                spans = np.zeros(0, dtype=np.int64)
+            duration_seconds = spans / 1_000_000
+        self.duration_seconds = duration_seconds
+
+        self._traces: Dict[int, Trace] = dict(enumerate(traces)) if traces else {}
+        self._case_lookup: Optional[Dict[str, int]] = None
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_traces(cls, traces: List[Trace]) -> "TraceFrame":
+        """
+        Builds a frame from already materialized traces (kept as-is for lookups).
+        """
+        events = [e for t in traces for e in t.events]
+        lengths = [len(t.events) for t in traces]
+
+        activity_codes, activities = _encode([e.activity for e in events])
+        actor_codes, actors = _encode([e.actor for e in events])
+        status_codes, statuses = _encode([e.status for e in events])
+
+        return cls(
+            case_ids=np.array([t.case_id for t in traces], dtype=object),
+            offsets=np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]).astype(
+                np.int64
+            ),
+            timestamps=np.array(
+                [to_micros(e.timestamp) for e in events], dtype=np.int64
+            ),
+            activity_codes=activity_codes,
+            activities=activities,
+            actor_codes=actor_codes,
+            actors=actors,
+            actor_type_codes=np.array(
+                [ACTOR_TYPES.index(e.actor_type) for e in events], dtype=np.int8
+            ),
+            status_codes=status_codes,
+            statuses=statuses,
+            row_index=np.arange(len(events), dtype=np.int64),
+            duration_seconds=np.array(
+                [t.duration_seconds for t in traces], dtype=np.float64
+            ),
+            event_ids=np.array([e.event_id for e in events], dtype=object),
+            traces=list(traces),
+        )
+
+    @classmethod
+    def coerce(cls, traces: Union["TraceFrame", List[Trace]]) -> "TraceFrame":
+        """Returns `traces` unchanged if it is a frame, otherwise wraps the list."""
+        if isinstance(traces, TraceFrame):
+            return traces
+        return cls.from_traces(list(traces))
+
+    @classmethod
+    def concat(cls, frames: List["TraceFrame"]) -> "TraceFrame":
+        """
+        Stacks frames holding disjoint sets of cases (e.g. spilled partitions).
+        Categorical labels are unified; case order is frames in sequence.
+        """
+        if not frames:
+            return cls.from_traces([])
+        if len(frames) == 1:
+            return frames[0]
+
+        def merge_codes(
+            codes_attr: str, labels_attr: str
+        ) -> Tuple[np.ndarray, np.ndarray]:
+            labels = np.unique(np.concatenate(
+                [getattr(f, labels_attr).astype(object) for f in frames]
+            ).astype(str)).astype(object)
+            parts = []
+            for f in frames:
+                # Map each frame's codes into the merged label space (-1 stays -1)
+                remap = np.append(
+                    np.searchsorted(labels, getattr(f, labels_attr).astype(str)), -1
+                )
+                parts.append(remap[getattr(f, codes_attr)].astype(np.int32))
+            return np.concatenate(parts), labels
+
+        activity_codes, activities = merge_codes("activity_codes", "activities")
+        actor_codes, actors = merge_codes("actor_codes", "actors")
+        status_codes, statuses = merge_codes("status_codes", "statuses")
+
+        lengths = np.concatenate([f.case_lengths for f in frames])
+        has_ids = all(f.event_ids is not None for f in frames)
+        return cls(
+            case_ids=np.concatenate([f.case_ids for f in frames]).astype(object),
+            offsets=np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+            timestamps=np.concatenate([f.timestamps for f in frames]),
+            activity_codes=activity_codes,
+            activities=activities,
+            actor_codes=actor_codes,
+            actors=actors,
+            actor_type_codes=np.concatenate([f.actor_type_codes for f in frames]),
+            status_codes=status_codes,
+            statuses=statuses,
+            row_index=np.concatenate([f.row_index for f in frames]),
+            duration_seconds=np.concatenate([f.duration_seconds for f in frames]),
+            event_ids=np.concatenate([f.event_ids for f in frames])
+            if has_ids
+            else None,
+        )
+
+    def positions_of(self, cases: Union[Sequence[int], np.ndarray]) -> np.ndarray:
+        """Global event positions of the given cases, case after case."""
+        cases = np.asarray(cases, dtype=np.int64)
+        lengths = self.case_lengths[cases]
+        starts = np.cumsum(lengths) - lengths
+        return (
+            np.arange(int(lengths.sum()), dtype=np.int64)
+            - np.repeat(starts, lengths)
+            + np.repeat(self.offsets[cases], lengths)
+        )
+
+    def take(self, cases: Union[Sequence[int], np.ndarray]) -> "TraceFrame":
+        """
+        Returns a new frame holding only the given cases, in the given order.
+        Categorical labels are shared with this frame.
+        """
+        cases = np.asarray(cases, dtype=np.int64)
+        lengths = self.case_lengths[cases]
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        positions = self.positions_of(cases)
+        frame = TraceFrame(
+            case_ids=self.case_ids[cases],
+            offsets=offsets,
+            timestamps=self.timestamps[positions],
+            activity_codes=self.activity_codes[positions],
+            activities=self.activities,
+            actor_codes=self.actor_codes[positions],
+            actors=self.actors,
+            actor_type_codes=self.actor_type_codes[positions],
+            status_codes=self.status_codes[positions],
+            statuses=self.statuses,
+            row_index=self.row_index[positions],
+            duration_seconds=self.duration_seconds[cases],
+            event_ids=self.event_ids[positions] if self.event_ids is not None else None,
+        )
+        # Carry over already materialized traces
+        frame._traces = {
+            i: self._traces[int(c)]
+            for i, c in enumerate(cases)
+            if int(c) in self._traces
+        }
+        return frame
+
+    # ------------------------------------------------------------------
+    # Shape & lookups
+    # ------------------------------------------------------------------
+
+    @property
+    def n_cases(self) -> int:
+        return len(self.case_ids)
+
+    @property
+    def n_events(self) -> int:
+        return len(self.timestamps)
+
+    def __len__(self) -> int:
+        return self.n_cases
+
+    @property
+    def case_lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def case_of(self, positions: np.ndarray) -> np.ndarray:
+        """Case index owning each of the given global event positions."""
+        return np.searchsorted(self.offsets, positions, side="right") - 1
+
+    def case_index(self, case_id: str) -> Optional[int]:
+        """Returns the position of `case_id` in the frame, or None."""
+        if self._case_lookup is None:
+            self._case_lookup = {str(c): i for i, c in enumerate(self.case_ids)}
+        return self._case_lookup.get(case_id)
+
+    def event_id(self, pos: int, case: Optional[int] = None) -> str:
+        """
+        Returns the event id of the event at position `pos`.
+
+        Args:
+            pos: Global event position.
+            case: Case index owning the event, if already known by the caller.
+        """
+        if self.event_ids is not None:
+            return str(self.event_ids[pos])
+        if case is None:
+            case = int(self.case_of(pos))
+        return f"{self.case_ids[case]}_{self.row_index[pos]}"
+
+    def event_ids_of(
+        self, positions: np.ndarray, cases: Optional[np.ndarray] = None
+    ) -> List[str]:
+        """
+        Returns the event ids of the events at `positions` (vectorized `event_id`).
+
+        Args:
+            positions: Global event positions.
+            cases: Case index owning each event, if already known by the caller.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        if self.event_ids is not None:
+            return [str(e) for e in self.event_ids[positions].tolist()]
+        if cases is None:
+            cases = self.case_of(positions)
+        case_ids = self.case_ids[np.asarray(cases, dtype=np.int64)].tolist()
+        return [
+            f"{c}_{r}" for c, r in zip(case_ids, self.row_index[positions].tolist())
+        ]
+
+    # ------------------------------------------------------------------
+    # Lazy materialization
+    # ------------------------------------------------------------------
+
+    def _event_columns(self, start: int, end: int) -> Tuple[List, ...]:
+        """Decodes events[start:end] into plain Python column lists in bulk."""
+        naive = self.timestamps[start:end].astype("datetime64[us]").astype(object)
+        actors = np.append(self.actors, None)  # code -1 -> None
+        return (
+            self.activities[self.activity_codes[start:end]].tolist(),
+            [ts.replace(tzinfo=timezone.utc) for ts in naive],
+            actors[self.actor_codes[start:end]].tolist(),
+            self.actor_type_codes[start:end].tolist(),
+            self.statuses[self.status_codes[start:end]].tolist(),
+        )
+
+    def _build_trace(self, case: int, columns: Tuple[List, ...], base: int) -> Trace:
+        """Builds the Trace for `case` from columns decoded starting at event `base`."""
+        activities, timestamps, actors, actor_types, statuses = columns
+        case_id = str(self.case_ids[case])
+        start, end = int(self.offsets[case]), int(self.offsets[case + 1])
+
+        events = []
+        for pos in range(start, end):
+            i = pos - base
+            events.append(Event(
+                event_id=self.event_id(pos, case),
+                case_id=case_id,
+                activity=str(activities[i]),
+                timestamp=timestamps[i],
+                actor=str(actors[i]) if actors[i] is not None else None,
+                actor_type=ACTOR_TYPES[actor_types[i]],
+                status=str(statuses[i]),
+                metadata={}
+            ))
+
+        return Trace(
+            case_id=case_id,
+            events=events,
+            start_time=events[0].timestamp,
+            end_time=events[-1].timestamp,
+            duration_seconds=float(self.duration_seconds[case])
+        )
+
+    def trace(self, case: int) -> Trace:
+        """Materializes (and memoizes) the Trace for case index `case`."""
+        cached = self._traces.get(case)
+        if cached is not None:
+            return cached
+
+        start, end = int(self.offsets[case]), int(self.offsets[case + 1])
+        trace = self._build_trace(case, self._event_columns(start, end), start)
+        self._traces[case] = trace
+        return trace
+
+    def get_trace(self, case_id: str) -> Optional[Trace]:
+        """Materializes the Trace for `case_id`, or returns None if unknown."""
+        case = self.case_index(case_id)
+        return self.trace(case) if case is not None else None
+
+    def iter_traces(self) -> Iterator[Trace]:
+        for case in range(self.n_cases):
+            yield self.trace(case)
+
+    def to_traces(self) -> List[Trace]:
+        """Materializes every case, decoding all columns in one bulk pass."""
+        if len(self._traces) == self.n_cases:
+            return [self._traces[case] for case in range(self.n_cases)]
+
+        columns = self._event_columns(0, self.n_events)
+        for case in range(self.n_cases):
+            if case not in self._traces:
+                self._traces[case] = self._build_trace(case, columns, 0)
+        return [self._traces[case] for case in range(self.n_cases)]
@@ -0,0 +1,22 @@
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class ActorWorkload(BaseModel):
+    """
+    Human time attributed to one actor across a log: the gaps following the
+    actor's human events, as counted by the human dependency detector.
+    """
+    model_config = ConfigDict(frozen=True)
+
+    actor: Optional[str] = Field(
+        description="Actor name (None if the log has no actor)"
+    )
+    human_seconds: float = Field(description="Total human-attributed time in seconds")
+    cases: int = Field(description="Cases in which the actor accumulated human time")
+    flagged_cases: int = Field(
+        description="Of those, cases flagged for human dependency"
+    )
+    case_seconds: float = Field(description="Total duration of those cases in seconds")
+    share: float = Field(description="human_seconds / case_seconds")
@@ -0,0 +1,89 @@
+import os
+import shutil
+from pathlib import Path
+
+from bfai.core import artifacts as artifacts_module
+from bfai.core.artifacts import ArtifactCache, CachedPipeline
+from bfai.core.friction import FrictionEngine
+from bfai.core.reasoning import ReasoningEngine
+from bfai.llm.mock_provider import MockLLMProvider
+
+SAMPLE_CSV = Path(__file__).parent.parent / "examples" / "sample_logs.csv"
+
+
+def _run(log, artifacts, scoring="zscore"):
+    pipeline = CachedPipeline(log, artifacts=artifacts)
+    engine = FrictionEngine(scoring=scoring)
+    enriched = pipeline.enrich(engine, ReasoningEngine(MockLLMProvider(), cluster=True))
+    return pipeline, engine, enriched
+
+
+def test_pipeline_reuses_unchanged_stages(tmp_path, monkeypatch):
+    log = tmp_path / "log.csv"
+    shutil.copy(SAMPLE_CSV, log)
+    artifacts = ArtifactCache(tmp_path / "artifacts")
+
+    first, first_engine, expected = _run(log, artifacts)
+    assert first.ran == ["ingest", "detect", "enrich"]
+    assert first.reused == []
+
+    # Same log and configuration: nothing is recomputed, detector state included
+    second, engine, enriched = _run(log, artifacts)
+    assert (second.ran, second.reused) == ([], ["enrich"])
+    assert enriched == expected
+    assert engine.actor_workload == first_engine.actor_workload
+    assert second.frame().n_events == first.frame().n_events
+    assert second.reused == ["enrich", "ingest"]
+
+    # Different detector configuration: ingestion is reused
+    third, _, _ = _run(log, artifacts, scoring="mad")
+    assert (third.ran, third.reused) == (["detect", "enrich"], ["ingest"])
+
+    # Another package version: every stage runs again
+    monkeypatch.setattr(artifacts_module, "__version__", "0.0.0-test")
+    upgraded, _, _ = _run(log, artifacts)
+    assert upgraded.ran == ["ingest", "detect", "enrich"]
+
+    # Different content: every stage runs again
+    with open(log, "a", encoding="utf-8") as f:
+        f.write("ord-003,Order Placed,2023-10-03 10:00:00,System,system\n")
+    fourth, _, _ = _run(log, artifacts)
+    assert fourth.ran == ["ingest", "detect", "enrich"]
+
+    # No cache: always recomputed
+    uncached, _, enriched = _run(log, None)
+    assert uncached.ran == ["ingest", "detect", "enrich"]
+
+
+def test_artifact_cache_evicts_least_recently_used(tmp_path):
+    artifacts = ArtifactCache(tmp_path, max_bytes=1)
+    artifacts.save("a", list(range(100)))
+    os.utime(tmp_path / "a.pkl.z", (0, 0))
+    artifacts.save("b", list(range(100)))
+    assert artifacts.load("a") is None
+    assert artifacts.load("b") == list(range(100))
+
+    # Corrupt artifacts count as missing
+    (tmp_path / "b.pkl.z").write_bytes(b"not zlib")
+    assert artifacts.load("b") is None
+    assert not (tmp_path / "b.pkl.z").exists()
+
+
+def test_pipeline_hashes_log_once_per_stat_signature(tmp_path, monkeypatch):
+    log = tmp_path / "log.csv"
+    shutil.copy(SAMPLE_CSV, log)
+    artifacts = ArtifactCache(tmp_path / "artifacts")
+    expected = CachedPipeline(log, artifacts=artifacts).source_hash
+
+    # Unchanged size and mtime: the log is not read again
+    def rehash(path):
+        raise AssertionError("log was rehashed")
+
+    monkeypatch.setattr(artifacts_module, "content_hash", rehash)
+    assert CachedPipeline(log, artifacts=artifacts).source_hash == expected
+    monkeypatch.undo()
+
+    # A write changes the signature, and the hash is taken again
+    with open(log, "a", encoding="utf-8") as f:
+        f.write("ord-003,Order Placed,2023-10-03 10:00:00,System,system\n")
+    assert CachedPipeline(log, artifacts=artifacts).source_hash != expected
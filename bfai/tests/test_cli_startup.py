@@ -0,0 +1,54 @@
+import json
+import subprocess
+import sys
+
+# Import time the CLI may add on top of typer itself (which `bfai --help` always pays)
+IMPORT_BUDGET_SECONDS = 0.15
+
+HEAVY_MODULES = (
+    "pandas",
+    "numpy",
+    "pyarrow",
+    "pydantic",
+    "bfai.core",
+    "bfai.models",
+    "bfai.ingestion.loader",
+)
+
+
+def _run_python(code: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code], capture_output=True, text=True, check=True
+    )
+
+
+def test_help_does_not_import_heavy_modules():
+    code = (
+        "import json, sys\n"
+        "from bfai.cli.main import app\n"
+        "for args in (['--help'], ['analyze', '--help'], ['explain', '--help'], "
+        "['serve', '--help']):\n"
+        "    try:\n"
+        "        app(args)\n"
+        "    except SystemExit:\n"
+        "        pass\n"
+        "print(json.dumps(sorted(sys.modules)))\n"
+    )
+    loaded = json.loads(_run_python(code).stdout.strip().splitlines()[-1])
+    heavy = [m for m in loaded if m.startswith(HEAVY_MODULES)]
+    assert heavy == []
+
+
+def test_cli_import_time_budget():
+    # -X importtime lines: "import time: self [us] | cumulative | module"
+    stderr = _run_python("import bfai.cli.main", "-X", "importtime").stderr
+    cumulative = {}
+    for line in stderr.splitlines():
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[1].isdigit():
+            cumulative[parts[2]] = int(parts[1])
+
+    own = cumulative["bfai.cli.main"] - cumulative.get("typer", 0)
+    assert own / 1e6 < IMPORT_BUDGET_SECONDS, (
+        f"bfai CLI adds {own / 1e6:.3f}s of imports"
+    )
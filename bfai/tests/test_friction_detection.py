@@ -1,9 +1,14 @@
-import pytest
 from datetime import datetime, timedelta
-from bfai.models.event import Event, ActorType
-from bfai.models.trace import Trace
-from bfai.models.friction import FrictionType
+
+import numpy as np
+import pytest
+
+from bfai.core.exceptions import BaselineError
 from bfai.core.friction import FrictionEngine
+from bfai.models.event import ActorType, Event
+from bfai.models.friction import FrictionType
+from bfai.models.trace import Trace
+
 
 # Helper to create simple trace
 def create_trace(case_id: str, events_data: list) -> Trace:
@@ -90,3 +95,457 @@ def test_human_dependency_detection():
     # Check strict formatting or substring
     print(f"DEBUG: Description is '{hd[0].description}'")
     assert "90.0%" in hd[0].description
+
+def test_time_gap_rules_and_order():
+    from bfai.core.detectors.time_gap import TimeGapDetector
+
+    traces = []
+    for i in range(10):
+        traces.append(
+            create_trace(
+                f"n{i}",
+                [
+                    ("X", 0, ActorType.SYSTEM),
+                    ("Y", 100, ActorType.SYSTEM),
+                    ("A", 110, ActorType.SYSTEM),
+                    ("B", 120, ActorType.SYSTEM),
+                ],
+            )
+        )
+    # Outliers on both transitions; Y->A first appears before A->B
+    traces.append(
+        create_trace(
+            "late_ab", [("A", 0, ActorType.SYSTEM), ("B", 5000, ActorType.SYSTEM)]
+        )
+    )
+    traces.append(
+        create_trace(
+            "late_ya", [("Y", 0, ActorType.SYSTEM), ("A", 9000, ActorType.SYSTEM)]
+        )
+    )
+    # Constant transition (std == 0) and a rare one (< 3 samples) are never flagged
+    traces.append(
+        create_trace(
+            "rare", [("P", 0, ActorType.SYSTEM), ("Q", 99999, ActorType.SYSTEM)]
+        )
+    )
+
+    gaps = TimeGapDetector().detect(traces)
+
+    assert [a.case_id for a in gaps] == ["late_ya", "late_ab"]
+    assert gaps[0].involved_events == ["late_ya_1"]
+    assert "between 'Y' and 'A'" in gaps[0].description
+
+    # Below the absolute minimum gap nothing is flagged, whatever the z-score
+    assert TimeGapDetector(min_gap_seconds=10_000).detect(traces) == []
+
+def test_time_gap_baseline(tmp_path):
+    import numpy as np
+
+    from bfai.core.detectors.time_gap import TimeGapDetector
+    from bfai.core.stats import TransitionStats
+
+    history = [
+        create_trace(
+            f"h{i}",
+            [
+                ("A", 0, ActorType.SYSTEM),
+                ("B", 10 + i % 4, ActorType.SYSTEM),
+                ("C", 30 + i, ActorType.SYSTEM),
+            ],
+        )
+        for i in range(12)
+    ]
+    detector = TimeGapDetector()
+
+    # Merging the stats of two halves equals fitting everything at once
+    full = detector.fit(history)
+    merged = detector.fit(history[:5]).merge(detector.fit(history[5:]))
+    assert merged.keys == full.keys
+    assert np.array_equal(merged.counts, full.counts)
+    assert np.allclose(merged.means, full.means)
+    assert np.allclose(merged.stds, full.stds)
+
+    path = tmp_path / "baseline.json"
+    merged.save(path)
+    baseline = TransitionStats.load(path)
+    assert np.allclose(baseline.m2s, merged.m2s)
+
+    # A single new case has no in-batch statistics, but stands out against the baseline
+    today = [
+        create_trace(
+            "today",
+            [
+                ("A", 0, ActorType.SYSTEM),
+                ("B", 900, ActorType.SYSTEM),
+                ("Z", 950, ActorType.SYSTEM),
+            ],
+        )
+    ]
+    assert detector.detect(today) == []
+    gaps = TimeGapDetector(baseline=baseline).detect(today)
+    assert [a.involved_events for a in gaps] == [["today_1"]]
+    assert "Average is 12s" in gaps[0].description
+
+def test_time_gap_robust_scoring(tmp_path):
+    import numpy as np
+
+    from bfai.core.detectors.time_gap import TimeGapDetector
+    from bfai.core.sketch import QuantileSketch
+    from bfai.core.stats import TransitionStats
+
+    # Sketch quantiles stay within the relative accuracy and merge exactly
+    values = np.random.default_rng(7).lognormal(4, 1.5, 20_000)
+    a, b = QuantileSketch(), QuantileSketch()
+    a.add(values[:7_000])
+    b.add(values[7_000:])
+    merged = a.merge(b)
+    assert merged.count == len(values)
+    for q in (0.5, 0.95, 0.99):
+        assert abs(merged.quantile(q) / np.quantile(values, q) - 1) < 0.03
+    assert (
+        len(QuantileSketch(max_buckets=16, bins={i: 1 for i in range(100)}).bins) == 16
+    )
+
+    # Heavy tail: one extreme gap inflates the std and masks a clear outlier
+    traces = [
+        create_trace(
+            f"n{i}", [("A", 0, ActorType.SYSTEM), ("B", 100 + i % 5, ActorType.SYSTEM)]
+        )
+        for i in range(30)
+    ]
+    traces.append(
+        create_trace(
+            "slow", [("A", 0, ActorType.SYSTEM), ("B", 2_000, ActorType.SYSTEM)]
+        )
+    )
+    traces.append(
+        create_trace(
+            "stuck", [("A", 0, ActorType.SYSTEM), ("B", 500_000, ActorType.SYSTEM)]
+        )
+    )
+
+    assert [a.case_id for a in TimeGapDetector().detect(traces)] == ["stuck"]
+    robust = TimeGapDetector(scoring="mad").detect(traces)
+    assert [a.case_id for a in robust] == ["slow", "stuck"]
+    assert "Robust Z-Score" in robust[0].description
+    assert [
+        a.case_id
+        for a in TimeGapDetector(scoring="quantile", quantile=0.9).detect(traces)
+    ] == ["slow", "stuck"]
+
+    # Sketches persist with the baseline; sketch-less baselines cannot do robust scoring
+    path = tmp_path / "baseline.json"
+    TimeGapDetector().fit(traces[:30]).save(path)
+    baseline = TransitionStats.load(path)
+    today = [traces[-2]]
+    assert [
+        a.case_id
+        for a in TimeGapDetector(baseline=baseline, scoring="mad").detect(today)
+    ] == ["slow"]
+    bare = TransitionStats(baseline.keys, baseline.counts, baseline.means, baseline.m2s)
+    with pytest.raises(BaselineError):
+        TimeGapDetector(baseline=bare, scoring="quantile").detect(today)
+    with pytest.raises(ValueError):
+        TimeGapDetector(scoring="p99")
+
+def test_loop_cycle_mode():
+    from bfai.core.detectors.loop import LoopDetector
+
+    t1 = create_trace(
+        "rework", [(a, i * 10, ActorType.SYSTEM) for i, a in enumerate("SABABAXCDEX")]
+    )
+    loops = LoopDetector(mode="cycle").detect([t1])
+
+    assert [a.description for a in loops] == [
+        "Rework cycle 'A -> B -> A' occurred 2 time(s). Potential rework/loop.",
+        "Rework cycle 'X -> C -> D -> E -> X' occurred 1 time(s). "
+        "Potential rework/loop.",
+    ]
+    assert loops[0].involved_events == [f"rework_{i}" for i in range(1, 6)]
+    assert loops[1].anomaly_id == "LOOP_CYCLE_rework_X_C_D_E"
+
+    # Cycles over max_cycle_length are not back-edges; min_cycles drops rare ones
+    assert len(LoopDetector(mode="cycle", max_cycle_length=3).detect([t1])) == 1
+    assert len(LoopDetector(mode="cycle", min_cycles=2).detect([t1])) == 1
+
+    # Count mode collects each activity's positions in one pass
+    counted = LoopDetector().detect([t1])
+    assert [a.anomaly_id for a in counted] == ["LOOP_rework_A"]
+    assert counted[0].involved_events == ["rework_1", "rework_3", "rework_5"]
+
+def test_human_dependency_workload():
+    from bfai.core.detectors.human_dependency import HumanDependencyDetector
+
+    def case(case_id, steps):
+        trace = create_trace(
+            case_id, [(act, offset, atype) for act, offset, atype, _ in steps]
+        )
+        events = [
+            e.model_copy(update={"actor": actor})
+            for e, (*_, actor) in zip(trace.events, steps)
+        ]
+        return trace.model_copy(update={"events": events})
+
+    traces = [
+        case(
+            "c1",
+            [
+                ("Review", 0, ActorType.HUMAN, "ann"),
+                ("Approve", 80, ActorType.HUMAN, "bob"),
+                ("Done", 100, ActorType.SYSTEM, "sys"),
+            ],
+        ),
+        case(
+            "c2",
+            [
+                ("Review", 0, ActorType.HUMAN, "ann"),
+                ("Sync", 10, ActorType.SYSTEM, "sys"),
+                ("Done", 100, ActorType.SYSTEM, "sys"),
+            ],
+        ),
+    ]
+    detector = HumanDependencyDetector()
+    anomalies = detector.detect(traces)
+
+    assert [a.case_id for a in anomalies] == ["c1"]
+    assert "100.0%" in anomalies[0].description
+    workload = {w.actor: w for w in detector.workload}
+    assert [w.actor for w in detector.workload] == ["ann", "bob"]
+    assert (
+        workload["ann"].human_seconds,
+        workload["ann"].cases,
+        workload["ann"].flagged_cases,
+    ) == (90.0, 2, 1)
+    assert workload["ann"].share == pytest.approx(90 / 200)
+    assert workload["bob"].share == pytest.approx(0.2)
+
+def test_fused_engine_shares_features():
+    from bfai.core.detectors.base import BaseDetector
+
+    traces = [
+        create_trace(
+            f"c{i}",
+            [
+                ("A", 0, ActorType.HUMAN),
+                ("B", 10, ActorType.SYSTEM),
+                ("A", 20, ActorType.HUMAN),
+                ("A", 50_000 if i == 19 else 25 + i, ActorType.SYSTEM),
+            ],
+        )
+        for i in range(20)
+    ]
+
+    seen = []
+
+    class ProbeDetector(BaseDetector):
+        requires = ("deltas",)
+
+        def detect(self, traces, features=None):
+            features = self.features_for(traces, features)
+            seen.append((features, "deltas" in vars(features)))
+            return []
+
+    fused = FrictionEngine()
+    fused.detectors.append(ProbeDetector())
+    expected = FrictionEngine(fused=False).run_analysis(traces)
+
+    assert fused.run_analysis(traces) == expected
+    assert {a.anomaly_type for a in expected} == {
+        "time_gap",
+        "loop",
+        "human_dependency",
+    }
+    # The probe received the shared, already computed features
+    features, precomputed = seen[0]
+    assert precomputed
+    assert "activity_groups" in vars(features) and "human_mask" in vars(features)
+
+def test_sharded_engine_matches_serial():
+    from bfai.core.parallel import case_shards
+
+    traces = []
+    for i in range(40):
+        steps = [
+            ("A", 0, ActorType.HUMAN),
+            ("B", 10 + i % 7, ActorType.SYSTEM),
+            ("A", 40, ActorType.HUMAN),
+            ("A", 60 + (90_000 if i in (5, 31) else i), ActorType.SYSTEM),
+        ]
+        traces.append(create_trace(f"case{i:02d}", steps))
+
+    shards = case_shards(np.array([t.case_id for t in traces]), 3)
+    assert set(shards.tolist()) == {0, 1, 2}
+    assert np.array_equal(shards, case_shards(np.array([t.case_id for t in traces]), 3))
+
+    for options in ({}, {"scoring": "mad"}, {"loop_mode": "cycle"}):
+        serial = FrictionEngine(**options)
+        sharded = FrictionEngine(workers=3, **options)
+        expected = serial.run_analysis(traces)
+        assert sharded.run_analysis(traces) == expected
+        assert {a.anomaly_type for a in expected} == {
+            "time_gap",
+            "loop",
+            "human_dependency",
+        }
+        assert [(w.actor, w.cases) for w in sharded.actor_workload] == [
+            (w.actor, w.cases) for w in serial.actor_workload
+        ]
+        assert sharded.actor_workload[0].human_seconds == pytest.approx(
+            serial.actor_workload[0].human_seconds
+        )
+
+
+def test_shard_partials_merge_to_serial_result():
+    import json
+
+    from bfai.core.exceptions import ShardMergeError
+
+    traces = []
+    for i in range(30):
+        steps = [
+            ("A", 0, ActorType.HUMAN),
+            ("B", 10 + i % 5, ActorType.SYSTEM),
+            ("A", 40, ActorType.HUMAN),
+            ("C", 60 + (70_000 if i == 17 else i), ActorType.SYSTEM),
+        ]
+        traces.append(create_trace(f"case{i:02d}", steps))
+
+    serial = FrictionEngine()
+    expected = serial.run_analysis(traces)
+
+    # Each shard runs in its own engine; partials travel as JSON
+    partials = [
+        json.loads(json.dumps(FrictionEngine().analyze_shard(traces, i, 3)))
+        for i in range(3)
+    ]
+    merger = FrictionEngine()
+    assert merger.merge_partials(partials[::-1]) == expected
+    assert [w.actor for w in merger.actor_workload] == [
+        w.actor for w in serial.actor_workload
+    ]
+
+    with pytest.raises(ShardMergeError):
+        merger.merge_partials(partials[:2])
+    with pytest.raises(ShardMergeError):
+        FrictionEngine(scoring="mad").merge_partials(partials)
+
+def test_shard_merge_keeps_numeric_case_order():
+    import json
+
+    import pandas as pd
+
+    from bfai.ingestion.normalizer import normalize_to_frame
+
+    # Numeric case ids: the serial order is 9 < 10, their text order the reverse
+    records = []
+    for case in range(2, 40):
+        delay = 9_000 if case in (9, 10) else 0
+        steps = [("A", 0), ("B", 10 + case % 3), ("A", 20), ("A", 30 + delay)]
+        for activity, offset in steps:
+            timestamp = pd.Timestamp("2023-01-01 10:00") + pd.Timedelta(seconds=offset)
+            records.append(
+                {
+                    "case_id": case,
+                    "activity": activity,
+                    "actor": "Sys",
+                    "timestamp": str(timestamp),
+                }
+            )
+    frame = normalize_to_frame(records)
+    expected = FrictionEngine().run_analysis(frame)
+    assert [a.case_id for a in expected if a.anomaly_type == FrictionType.TIME_GAP] == [
+        "9",
+        "10",
+    ]
+
+    partials = [
+        json.loads(json.dumps(FrictionEngine().analyze_shard(frame, i, 4)))
+        for i in range(4)
+    ]
+    assert FrictionEngine().merge_partials(partials) == expected
+
+def test_merge_checks_shard_baseline(tmp_path):
+    import json
+
+    from typer.testing import CliRunner
+
+    from bfai.cli.main import app
+    from bfai.core.detectors.time_gap import TimeGapDetector
+    from bfai.core.stats import TransitionStats
+
+    traces = [
+        create_trace(
+            f"case{i:02d}",
+            [("A", 0, ActorType.SYSTEM), ("B", 10 + i % 4, ActorType.SYSTEM)],
+        )
+        for i in range(12)
+    ]
+    used, other = tmp_path / "used.json", tmp_path / "other.json"
+    TimeGapDetector().fit(traces).save(used)
+    TimeGapDetector().fit(traces[:6]).save(other)
+
+    def write_partials(baseline):
+        paths = []
+        for i in range(2):
+            paths.append(tmp_path / f"{baseline.stem if baseline else 'none'}-{i}.json")
+            engine = FrictionEngine(
+                baseline=TransitionStats.load(baseline) if baseline else None
+            )
+            paths[-1].write_text(json.dumps(engine.analyze_shard(traces, i, 2)))
+        return [str(p) for p in paths]
+
+    scored, unscored = write_partials(used), write_partials(None)
+    runner = CliRunner()
+    assert (
+        runner.invoke(
+            app, ["merge", *scored, "--baseline", str(used), "--no-cache"]
+        ).exit_code
+        == 0
+    )
+    assert runner.invoke(app, ["merge", *unscored, "--no-cache"]).exit_code == 0
+
+    # A different baseline, a missing one, or one the shards did not use is rejected
+    for args in (
+        [*scored, "--baseline", str(other)],
+        scored,
+        [*unscored, "--baseline", str(used)],
+    ):
+        result = runner.invoke(app, ["merge", *args, "--no-cache"])
+        assert result.exit_code == 1
+        assert "baseline" in result.output
+
+def test_streaming_engine_matches_whole_log():
+    from bfai.models.trace_frame import TraceFrame
+
+    traces = []
+    for i in range(40):
+        steps = [
+            ("A", 0, ActorType.HUMAN),
+            ("B", 10 + i % 7, ActorType.SYSTEM),
+            ("A", 40, ActorType.HUMAN),
+            ("A", 60 + (90_000 if i in (5, 31) else i), ActorType.SYSTEM),
+        ]
+        traces.append(create_trace(f"case{i:02d}", steps))
+    frame = TraceFrame.from_traces(traces)
+
+    for options in ({}, {"scoring": "mad"}, {"loop_mode": "cycle"}):
+        serial = FrictionEngine(**options)
+        streamed = FrictionEngine(**options)
+        expected = serial.run_analysis(frame)
+        batches = (
+            frame.take(np.arange(start, min(start + 15, frame.n_cases)))
+            for start in range(0, frame.n_cases, 15)
+        )
+        found = list(streamed.run_streaming(batches))
+
+        # Per-case findings batch by batch, then time gaps after the last batch
+        assert len(found) == 4
+        assert {a.anomaly_type for a in found[-1]} == {"time_gap"}
+        assert sorted(a.anomaly_id for batch in found for a in batch) == sorted(
+            a.anomaly_id for a in expected
+        )
+        assert found[-1] == [a for a in expected if a.anomaly_type == "time_gap"]
+        assert [(w.actor, w.cases) for w in streamed.actor_workload] == [
+            (w.actor, w.cases) for w in serial.actor_workload
+        ]
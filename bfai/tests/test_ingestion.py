@@ -1,13 +1,15 @@
-import pytest
+from datetime import datetime
 from pathlib import Path
+
+import numpy as np
 import pandas as pd
-from datetime import datetime
+import pytest
 
+from bfai.core.exceptions import DataIngestionError, SchemaValidationError
 from bfai.ingestion.csv_loader import load_csv
 from bfai.ingestion.normalizer import normalize_to_traces
-from bfai.models.trace import Trace
 from bfai.models.event import ActorType
-from bfai.core.exceptions import DataIngestionError, SchemaValidationError
+from bfai.models.trace import Trace
 
 SAMPLE_CSV = Path(__file__).parent.parent / "examples" / "sample_logs.csv"
 
@@ -54,3 +56,256 @@ def test_missing_columns_error():
     bad_data = [{"wrong_column": "123", "val": 1}]
     with pytest.raises(SchemaValidationError):
         normalize_to_traces(bad_data)
+
+def test_vectorized_matches_rowwise():
+    # Shuffled rows, ties on timestamp, numeric case ids and a missing actor
+    records = [
+        {
+            "id": 20,
+            "event": "B",
+            "ts": "2023-01-01 10:00:05",
+            "user": "Bob",
+            "actor_type": "HUMAN",
+        },
+        {"id": 3, "event": "A", "ts": "2023-01-01 09:00:00", "user": None},
+        {"id": 20, "event": "A", "ts": "2023-01-01 10:00:00", "user": "Sys"},
+        {
+            "id": 20,
+            "event": "C",
+            "ts": "2023-01-01 10:00:05",
+            "user": "Sys",
+            "status": "start",
+        },
+        {
+            "id": 3,
+            "event": "B",
+            "ts": "2023-01-01 08:00:00",
+            "user": "Amy",
+            "actor_type": "human",
+        },
+    ]
+    rowwise = normalize_to_traces(records, vectorized=False)
+    vectorized = normalize_to_traces(records)
+
+    assert vectorized == rowwise
+    assert [t.case_id for t in vectorized] == ["3", "20"]
+    assert [e.event_id for e in vectorized[1].events] == ["20_2", "20_0", "20_3"]
+
+def test_streaming_matches_in_memory(tmp_path, monkeypatch):
+    from bfai.ingestion import streaming
+    from bfai.ingestion.normalizer import normalize_to_frame
+    from bfai.ingestion.streaming import load_csv_streaming
+
+    expected = normalize_to_frame(load_csv(SAMPLE_CSV)).to_traces()
+    frame = load_csv_streaming(SAMPLE_CSV, n_partitions=3, spill_dir=tmp_path)
+
+    assert frame.to_traces() == expected
+    # Spill files are cleaned up
+    assert list(tmp_path.iterdir()) == []
+
+    # The partition count (open spill files) is capped
+    monkeypatch.setattr(streaming, "MAX_PARTITIONS", 2)
+    partitions = list(
+        streaming.iter_csv_partitions(
+            SAMPLE_CSV, n_partitions=10_000, spill_dir=tmp_path
+        )
+    )
+    assert len(partitions) <= 2
+    assert (
+        sorted((t for p in partitions for t in p.to_traces()), key=lambda t: t.case_id)
+        == expected
+    )
+
+
+def test_trace_batches_hold_complete_cases(tmp_path):
+    from bfai.ingestion.frame_store import save_frame
+    from bfai.ingestion.loader import iter_trace_batches, load_trace_frame
+    from bfai.ingestion.streaming import iter_csv_partitions
+
+    expected = load_trace_frame(SAMPLE_CSV).to_traces()
+    partitions = list(
+        iter_csv_partitions(SAMPLE_CSV, n_partitions=2, spill_dir=tmp_path)
+    )
+    assert (
+        sorted((t for p in partitions for t in p.to_traces()), key=lambda t: t.case_id)
+        == expected
+    )
+    assert list(tmp_path.iterdir()) == []
+
+    store = save_frame(load_trace_frame(SAMPLE_CSV), tmp_path / "sample.bfai")
+    batches = list(iter_trace_batches(store, batch_cases=1))
+    assert [t for b in batches for t in b.to_traces()] == expected
+
+def test_streaming_errors(tmp_path):
+    from bfai.ingestion.streaming import load_csv_streaming
+
+    empty = tmp_path / "empty.csv"
+    empty.write_text("")
+    with pytest.raises(DataIngestionError):
+        load_csv_streaming(empty)
+
+    no_case = tmp_path / "no_case.csv"
+    no_case.write_text("activity,timestamp\nA,2023-01-01\n")
+    with pytest.raises(SchemaValidationError):
+        load_csv_streaming(no_case)
+
+def test_column_pushdown(tmp_path):
+    from bfai.ingestion.csv_loader import load_dataframe, sniff_schema
+
+    wide = tmp_path / "wide.csv"
+    wide.write_text(
+        "Order_ID,Notes,Step,Created_At,User,Amount\n"
+        "007,free text,Start,2023-01-01 10:00:00,Bob,12.5\n"
+        "007,more text,End,2023-01-01 10:05:00,Bob,3\n"
+    )
+
+    assert sniff_schema(wide) == {
+        "case_id": "Order_ID",
+        "activity": "Step",
+        "timestamp": "Created_At",
+        "actor": "User",
+    }
+
+    df = load_dataframe(wide)
+    assert list(df.columns) == ["Order_ID", "Step", "Created_At", "User"]
+    assert df["Step"].dtype == "category"
+    # Case ids are kept as text, leading zeros included
+    assert normalize_to_traces(load_csv(wide))[0].case_id == "007"
+
+def test_timestamp_format_inference_and_epochs():
+    from bfai.ingestion.timestamps import TimestampParser
+
+    parser = TimestampParser()
+    parsed = parser.parse(pd.Series(["01/10/2023 10:00", "01/11/2023 09:30"]))
+    assert parser.fmt == "%m/%d/%Y %H:%M"
+    assert parsed.iloc[1] == pd.Timestamp("2023-01-11 09:30", tz="UTC")
+
+    seconds = TimestampParser().parse(pd.Series([1696150800, 1696150805]))
+    millis = TimestampParser().parse(pd.Series([1696150800000, 1696150805000]))
+    assert (seconds == millis).all()
+    assert seconds.iloc[0] == pd.Timestamp("2023-10-01 09:00", tz="UTC")
+
+    # Digit strings are dates when a date format matches, epochs otherwise
+    parser = TimestampParser()
+    assert parser.parse(pd.Series(["20230101", "20230102"])).iloc[0] == pd.Timestamp(
+        "2023-01-01", tz="UTC"
+    )
+    assert parser.fmt == "%Y%m%d"
+    parser = TimestampParser()
+    parsed = parser.parse(pd.Series(["20230101103000", "20230102093000"]))
+    assert parser.fmt == "%Y%m%d%H%M%S"
+    assert parsed.iloc[0] == pd.Timestamp("2023-01-01 10:30", tz="UTC")
+    parser = TimestampParser()
+    assert (parser.parse(pd.Series(["1696150800", "1696150805"])) == seconds).all()
+    assert parser.fmt == "epoch_s"
+
+def test_timestamp_inference_takes_majority_format_quietly():
+    import warnings
+
+    from bfai.ingestion.timestamps import TimestampParser
+
+    # One odd value does not send the whole column to the per-element parser,
+    # and pandas' dayfirst warning is not shown to users
+    values = pd.Series(
+        [
+            "01/10/2023 10:00",
+            "01/11/2023 09:30",
+            "13/01/2023 10:00",
+            "2023-01-12T08:00:00",
+        ]
+    )
+    parser = TimestampParser()
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", UserWarning)
+        parsed = parser.parse(values)
+    assert parser.fmt == "%m/%d/%Y %H:%M"
+    assert list(parsed.dt.day) == [10, 11, 13, 12]
+
+def test_timestamp_errors_name_rows():
+    from bfai.ingestion.timestamps import TimestampParser
+
+    values = pd.Series(
+        ["2023-01-01 10:00:00", "not a date", None, "2023-01-01 11:00:00"]
+    )
+    with pytest.raises(
+        SchemaValidationError, match=r"2 row\(s\).*row 1: 'not a date'; row 2: None"
+    ):
+        TimestampParser().parse(values)
+
+    # Explicit formats are strict
+    with pytest.raises(SchemaValidationError, match="row 1"):
+        TimestampParser("%Y-%m-%d").parse(pd.Series(["2023-01-01", "2023-01-01 10:00"]))
+
+def test_frame_store_roundtrip(tmp_path):
+    from bfai.ingestion.frame_store import load_frame, save_frame
+    from bfai.ingestion.loader import load_trace_frame
+    from bfai.ingestion.normalizer import normalize_to_frame
+
+    frame = normalize_to_frame(load_csv(SAMPLE_CSV))
+    store = save_frame(frame, tmp_path / "sample.bfai")
+
+    loaded = load_trace_frame(store)
+    assert isinstance(loaded.timestamps, np.memmap)
+    assert loaded.to_traces() == frame.to_traces()
+    assert load_frame(store, mmap=False).get_trace("ord-002") == frame.get_trace(
+        "ord-002"
+    )
+
+
+def test_parquet_and_arrow_ingestion(tmp_path):
+    pytest.importorskip("pyarrow")
+    from bfai.ingestion.loader import load_trace_frame
+
+    df = pd.read_csv(SAMPLE_CSV)
+    df["unused"] = "x"
+    df.to_parquet(tmp_path / "log.parquet")
+    df.to_feather(tmp_path / "log.arrow")
+
+    expected = load_trace_frame(SAMPLE_CSV).to_traces()
+    assert load_trace_frame(tmp_path / "log.parquet").to_traces() == expected
+    assert load_trace_frame(tmp_path / "log.arrow").to_traces() == expected
+
+def test_case_index_reads_single_cases(tmp_path, monkeypatch):
+    from bfai.ingestion import case_index
+    from bfai.ingestion.case_index import build_case_index, open_case_index
+    from bfai.ingestion.loader import load_trace_frame
+
+    # Interleaved cases, a quoted field with a newline, CRLF and blank lines
+    log = tmp_path / "log.csv"
+    log.write_bytes(
+        b"case_id,activity,timestamp,resource\r\n"
+        b"b,Start,2023-01-01 10:00:00,ann\r\n"
+        b"a,Start,2023-01-01 09:00:00,bob\r\n"
+        b"\r\n"
+        b"a,\"Review\nagain\",2023-01-01 09:30:00,bob\r\n"
+        b"b,End,2023-01-01 10:05:00,ann\r\n"
+        b"a,End,2023-01-01 11:00:00,\"x, y\""
+    )
+    # Tiny scan blocks exercise rows split across blocks
+    monkeypatch.setattr(case_index, "SCAN_BLOCK_BYTES", 7)
+    build_case_index(log)
+
+    full = load_trace_frame(log)
+    index = open_case_index(log)
+    for case_id in ("a", "b"):
+        assert index.read_case(log, case_id).get_trace(case_id) == full.get_trace(
+            case_id
+        )
+    assert index.read_case(log, "missing") is None
+    assert index.summary("a")["n_events"] == 3
+    assert index.summary("a")["duration_seconds"] == 7200.0
+
+    # A changed log makes the index stale
+    log.write_bytes(log.read_bytes() + b"\r\nc,Start,2023-01-02 08:00:00,ann\r\n")
+    assert open_case_index(log) is None
+
+def test_case_index_frame_store(tmp_path):
+    from bfai.ingestion.case_index import build_case_index
+    from bfai.ingestion.frame_store import save_frame
+    from bfai.ingestion.loader import load_trace_frame
+
+    store = save_frame(load_trace_frame(SAMPLE_CSV), tmp_path / "sample.bfai")
+    index = build_case_index(store)
+    assert index.read_case(store, "ord-002").get_trace("ord-002") == load_trace_frame(
+        SAMPLE_CSV
+    ).get_trace("ord-002")
@@ -0,0 +1,67 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from bfai.cli.main import app
+from bfai.models.anomaly import Anomaly, AnomalySeverity
+from bfai.utils.output import write_records
+
+SAMPLE_CSV = Path(__file__).parent.parent / "examples" / "sample_logs.csv"
+
+
+def _anomalies():
+    return [
+        Anomaly(
+            anomaly_id=f"LOOP_c{i}",
+            case_id=f"c{i}",
+            anomaly_type="LOOP",
+            description="Activity 'Review' repeated 3 times",
+            severity=AnomalySeverity.MEDIUM,
+            involved_events=[f"e{i}", f"e{i + 1}"] if i else [],
+            signature="Review",
+        )
+        for i in range(3)
+    ]
+
+
+def test_write_records_formats():
+    anomalies = _anomalies()
+
+    # JSON array: same text as dumping the whole list at once
+    stream = io.StringIO()
+    assert write_records(iter(anomalies), stream) == 3
+    assert stream.getvalue() == json.dumps(
+        [a.model_dump() for a in anomalies], indent=2, default=str
+    )
+
+    stream = io.StringIO()
+    write_records([], stream)
+    assert stream.getvalue() == "[]"
+
+    stream = io.StringIO()
+    write_records(anomalies, stream, "ndjson")
+    lines = stream.getvalue().splitlines()
+    assert [Anomaly.model_validate_json(line) for line in lines] == anomalies
+
+    with pytest.raises(ValueError):
+        write_records(anomalies, io.StringIO(), "xml")
+
+
+def test_verbose_messages_stay_off_stdout():
+    runner = CliRunner(mix_stderr=False)
+    for fmt in ("ndjson", "json"):
+        result = runner.invoke(
+            app, ["analyze", str(SAMPLE_CSV), "-v", "--no-cache", "--format", fmt]
+        )
+        assert result.exit_code == 0
+        assert "Loading logs" in result.stderr
+
+        # stdout holds nothing but the records
+        if fmt == "ndjson":
+            lines = result.stdout.splitlines()
+            assert lines and all(json.loads(line)["anomaly_id"] for line in lines)
+        else:
+            assert isinstance(json.loads(result.stdout), list)
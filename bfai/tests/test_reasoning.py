@@ -1,9 +1,13 @@
+import asyncio
+
 import pytest
-from bfai.models.anomaly import Anomaly, AnomalySeverity
-from bfai.models.friction import FrictionType
-from bfai.llm.mock_provider import MockLLMProvider
+
 from bfai.core.reasoning import ReasoningEngine
 from bfai.llm.factory import get_llm_provider
+from bfai.llm.mock_provider import MockLLMProvider
+from bfai.models.anomaly import Anomaly, AnomalySeverity
+from bfai.models.friction import FrictionType
+
 
 def create_raw_anomaly(atype: str) -> Anomaly:
     return Anomaly(
@@ -52,3 +56,396 @@ def test_reasoning_engine_workflow():
     assert results[0].root_cause is not None
     assert results[1].recommendation is not None
     assert "Automation" in results[1].recommendation or "automation" in results[1].recommendation
+
+def test_async_enrichment_concurrency_and_order():
+    from bfai.llm.stub_provider import StubLLMProvider
+
+    provider = StubLLMProvider(latency=0.02)
+    engine = ReasoningEngine(provider, concurrency=5)
+    anomalies = [
+        create_raw_anomaly(FrictionType.LOOP.value).model_copy(
+            update={"anomaly_id": f"a{i}"}
+        )
+        for i in range(20)
+    ]
+
+    results = engine.analyze(anomalies)
+
+    assert [a.anomaly_id for a in results] == [a.anomaly_id for a in anomalies]
+    assert all("rework" in a.root_cause for a in results)
+    assert provider.max_in_flight == 5
+
+    # The synchronous API also works from inside a running event loop
+    async def from_async_code():
+        return engine.analyze(anomalies)
+
+    assert asyncio.run(from_async_code()) == results
+
+def test_async_enrichment_retries_timeouts_and_fallback():
+    from bfai.llm.stub_provider import StubLLMProvider
+
+    anomalies = [create_raw_anomaly(FrictionType.TIME_GAP.value) for _ in range(10)]
+
+    # Flaky provider: retries recover every call
+    flaky = StubLLMProvider(latency=0.001, failure_rate=0.3, seed=1)
+    results = ReasoningEngine(flaky, max_retries=6, backoff=0.001).analyze(anomalies)
+    assert flaky.failures > 0
+    assert all(a.root_cause is not None for a in results)
+
+    # Without retries, failed calls fall back to the original anomaly
+    flaky = StubLLMProvider(latency=0.001, failure_rate=0.5, seed=1)
+    results = ReasoningEngine(flaky, max_retries=0).analyze(anomalies)
+    assert sum(a.root_cause is None for a in results) == flaky.failures > 0
+
+    # Calls slower than the timeout are abandoned (and retried) before falling back
+    slow = StubLLMProvider(latency=1.0)
+    results = ReasoningEngine(slow, timeout=0.01, max_retries=1, backoff=0.0).analyze(
+        anomalies
+    )
+    assert results == anomalies
+    assert slow.calls == 20
+
+def test_token_bucket_rate_limit():
+    import asyncio
+    import time
+
+    from bfai.llm.stub_provider import StubLLMProvider
+
+    provider = StubLLMProvider(latency=0.0)
+    engine = ReasoningEngine(provider, concurrency=10, rate_limit=50)
+    anomalies = [create_raw_anomaly(FrictionType.LOOP.value) for _ in range(60)]
+
+    start = time.monotonic()
+    results = asyncio.run(engine.analyze_async(anomalies))
+    # Burst of 50, then 10 more at 50/s
+    assert time.monotonic() - start >= 0.18
+    assert len(results) == 60
+
+def test_factory_stub():
+    from bfai.llm.llm_interface import AsyncLLMProvider
+    assert isinstance(get_llm_provider("stub"), AsyncLLMProvider)
+
+def test_make_batches_bounds():
+    from bfai.llm.batching import estimate_tokens, make_batches
+
+    anomalies = [create_raw_anomaly(FrictionType.LOOP.value) for _ in range(10)]
+    assert make_batches(anomalies, 4) == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+    cost = estimate_tokens(anomalies[0])
+    batches = make_batches(anomalies, 10, max_tokens=3 * cost)
+    assert [len(b) for b in batches] == [3, 3, 3, 1]
+    # An item over the token limit still gets a batch of its own
+    assert make_batches(anomalies[:2], 10, max_tokens=1) == [[0], [1]]
+
+def test_batched_enrichment_mock():
+    provider = MockLLMProvider()
+    anomalies = [create_raw_anomaly(t.value).model_copy(update={"anomaly_id": f"a{i}"})
+                 for i, t in enumerate([FrictionType.TIME_GAP, FrictionType.LOOP] * 5)]
+
+    results = ReasoningEngine(provider, batch_size=4).analyze(anomalies)
+
+    assert provider.batch_calls == 3
+    assert results == ReasoningEngine(MockLLMProvider()).analyze(anomalies)
+
+def test_batched_enrichment_maps_results_by_id():
+    from bfai.llm.llm_interface import LLMProvider
+
+    class ShufflingProvider(LLMProvider):
+        def enrich_anomaly(self, anomaly):
+            return anomaly.model_copy(update={"root_cause": anomaly.description})
+
+        def enrich_batch(self, anomalies):
+            # Grouped by id in reverse order, and the result for "d5" is lost
+            results = sorted(anomalies, key=lambda a: a.anomaly_id, reverse=True)
+            return [self.enrich_anomaly(a) for a in results if a.description != "d5"]
+
+    # Repeated ids (e.g. several time gaps of one transition) match in order
+    anomalies = [create_raw_anomaly(FrictionType.TIME_GAP.value).model_copy(
+        update={"anomaly_id": f"a{i // 2}", "description": f"d{i}"}) for i in range(6)]
+
+    results = ReasoningEngine(ShufflingProvider(), batch_size=6).analyze(anomalies)
+
+    assert [a.anomaly_id for a in results] == [a.anomaly_id for a in anomalies]
+    assert [a.root_cause for a in results] == ["d0", "d1", "d2", "d3", "d4", None]
+
+def test_failed_batch_falls_back_per_item(capsys):
+    class BrokenBatchProvider(MockLLMProvider):
+        def enrich_batch(self, anomalies):
+            raise RuntimeError("batch endpoint down")
+
+    anomalies = [create_raw_anomaly(FrictionType.LOOP.value) for _ in range(5)]
+    results = ReasoningEngine(BrokenBatchProvider(), batch_size=2).analyze(anomalies)
+
+    assert all(a.root_cause is not None for a in results)
+    assert "Reasoning failed for batch of 2 anomalies" in capsys.readouterr().err
+
+def test_async_batched_enrichment():
+    from bfai.llm.stub_provider import StubLLMProvider
+
+    anomalies = [
+        create_raw_anomaly(FrictionType.LOOP.value).model_copy(
+            update={"anomaly_id": f"a{i}"}
+        )
+        for i in range(25)
+    ]
+
+    provider = StubLLMProvider(latency=0.001)
+    results = ReasoningEngine(provider, batch_size=10).analyze(anomalies)
+    assert provider.calls == 3
+    assert [a.anomaly_id for a in results] == [a.anomaly_id for a in anomalies]
+    assert all(a.root_cause is not None for a in results)
+
+    # A batch failing after retries is retried item by item
+    flaky = StubLLMProvider(latency=0.001, failure_rate=0.5, seed=3)
+    results = ReasoningEngine(flaky, batch_size=10, max_retries=0).analyze(anomalies)
+    assert flaky.failures > 0
+    assert sum(a.root_cause is None for a in results) < len(anomalies)
+
+def test_clustered_enrichment():
+    from bfai.core.clustering import cluster_anomalies
+
+    def gap(case_id, signature, severity=AnomalySeverity.MEDIUM):
+        return create_raw_anomaly(FrictionType.TIME_GAP.value).model_copy(
+            update={"case_id": case_id, "signature": signature, "severity": severity})
+
+    anomalies = [
+        gap("c1", "A -> B"),
+        gap("c2", "B -> C"),
+        gap("c3", "A -> B"),
+        gap("c4", "A -> B", AnomalySeverity.HIGH),
+        gap("c5", "B -> C"),
+        create_raw_anomaly(FrictionType.LOOP.value).model_copy(
+            update={"signature": "A"}
+        ),
+    ]
+    assert cluster_anomalies(anomalies) == [[0, 2], [1, 4], [3], [5]]
+
+    class CountingProvider(MockLLMProvider):
+        calls = 0
+
+        def enrich_anomaly(self, anomaly):
+            self.calls += 1
+            return super().enrich_anomaly(anomaly)
+
+    provider = CountingProvider()
+    engine = ReasoningEngine(provider, cluster=True)
+    results = engine.analyze(anomalies)
+
+    assert provider.calls == 4
+    assert engine.calls_saved == 2
+    assert [a.case_id for a in results] == ["c1", "c2", "c3", "c4", "c5", "case_1"]
+    assert results == ReasoningEngine(MockLLMProvider()).analyze(anomalies)
+
+    # A later unclustered call on the same engine does not report the old savings
+    engine.cluster = False
+    engine.analyze(anomalies)
+    assert engine.calls_saved == 0
+
+def test_enrichment_cache_reuse(tmp_path):
+    from bfai.llm.cache import EnrichmentCache
+
+    class CountingProvider(MockLLMProvider):
+        calls = 0
+
+        def enrich_anomaly(self, anomaly):
+            self.calls += 1
+            return super().enrich_anomaly(anomaly)
+
+    anomalies = [
+        create_raw_anomaly(FrictionType.LOOP.value).model_copy(
+            update={"description": f"d{i}"}
+        )
+        for i in range(5)
+    ]
+    path = tmp_path / "cache.sqlite"
+
+    first = CountingProvider()
+    results = ReasoningEngine(first, cache=EnrichmentCache(path)).analyze(anomalies)
+    assert first.calls == 5
+
+    # A later run (new process, same file) only pays for new anomalies
+    second = CountingProvider()
+    engine = ReasoningEngine(second, cache=EnrichmentCache(path))
+    more = anomalies + [anomalies[0].model_copy(update={"description": "new"})]
+    assert engine.analyze(more)[:5] == results
+    assert second.calls == 1
+    assert engine.cache_hits == 5
+
+    # Without the cache, a reused engine does not report the earlier hits
+    engine.cache = None
+    engine.analyze(anomalies)
+    assert engine.cache_hits == 0
+
+    # A new prompt version invalidates old entries
+    third = CountingProvider()
+    third.prompt_version = "2"
+    ReasoningEngine(third, cache=EnrichmentCache(path)).analyze(anomalies)
+    assert third.calls == 5
+
+def test_enrichment_cache_eviction_and_ttl():
+    from bfai.llm.cache import EnrichmentCache
+
+    now = [0.0]
+    cache = EnrichmentCache(
+        ":memory:", max_entries=3, ttl_seconds=100, clock=lambda: now[0]
+    )
+    for i, key in enumerate("abc"):
+        now[0] = i
+        cache.put_many({key: ("cause", "fix")})
+
+    now[0] = 10
+    assert set(cache.get_many(["a"])) == {"a"}
+    cache.put_many({"d": ("cause", "fix")})
+    # "b" was the least recently used
+    assert set(cache.get_many(list("abcd"))) == {"a", "c", "d"}
+
+    now[0] = 105
+    assert set(cache.get_many(list("abcd"))) == {"d"}
+
+def test_http_provider_pooled_keep_alive():
+    from bfai.llm.fake_server import FakeLLMServer
+    from bfai.llm.http_provider import HTTPLLMProvider
+
+    anomalies = [
+        create_raw_anomaly(FrictionType.LOOP.value).model_copy(
+            update={"anomaly_id": f"a{i}"}
+        )
+        for i in range(40)
+    ]
+    with FakeLLMServer(latency=0.01) as server:
+        provider = HTTPLLMProvider(server.url, pool_size=4)
+        results = ReasoningEngine(provider, concurrency=4).analyze(anomalies)
+        batched = ReasoningEngine(provider, batch_size=10).analyze(anomalies)
+        provider.close()
+
+    assert results == batched == ReasoningEngine(MockLLMProvider()).analyze(anomalies)
+    assert server.requests == provider.requests == 44
+    # Connections are reused across requests
+    assert server.connections <= 4
+
+def test_http_provider_retry_after_and_circuit_breaker():
+    import time
+
+    from bfai.llm.fake_server import FakeLLMServer
+    from bfai.llm.http_provider import HTTPLLMProvider, parse_retry_after
+
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after("Thu, 01 Jan 1970 00:00:10 GMT", now=4.0) == 6.0
+    assert parse_retry_after("soon") is None
+
+    anomalies = [create_raw_anomaly(FrictionType.LOOP.value) for _ in range(10)]
+
+    # 429s with Retry-After are waited out and retried
+    with FakeLLMServer(
+        failure_rate=0.3, failure_status=429, retry_after=0.05, seed=2
+    ) as server:
+        provider = HTTPLLMProvider(server.url, failure_threshold=100)
+        start = time.monotonic()
+        results = ReasoningEngine(
+            provider, concurrency=1, max_retries=10, backoff=0.0
+        ).analyze(anomalies)
+        elapsed = time.monotonic() - start
+        provider.close()
+    assert server.failures > 0
+    assert elapsed >= 0.05 * server.failures
+    assert all(a.root_cause is not None for a in results)
+
+    # A dead backend opens the circuit: later calls fail fast without a request
+    with FakeLLMServer(failure_rate=1.0) as server:
+        provider = HTTPLLMProvider(server.url, failure_threshold=3, reset_timeout=60)
+        results = ReasoningEngine(provider, concurrency=1, max_retries=0).analyze(
+            anomalies
+        )
+        provider.close()
+    assert results == anomalies
+    assert server.requests == 3
+    assert provider.breaker.state == "open"
+
+def test_circuit_breaker_closes_after_rejected_trial():
+    import time
+
+    from bfai.llm.fake_server import FakeLLMServer
+    from bfai.llm.http_provider import HTTPLLMProvider
+
+    anomalies = [create_raw_anomaly(FrictionType.LOOP.value)]
+    with FakeLLMServer(failure_rate=1.0) as server:
+        provider = HTTPLLMProvider(server.url, failure_threshold=1, reset_timeout=0.05)
+        engine = ReasoningEngine(provider, concurrency=1, max_retries=0)
+        engine.analyze(anomalies)
+        assert provider.breaker.state == "open"
+
+        # The trial call is rejected (400): the backend answered, so the circuit closes
+        time.sleep(0.06)
+        server.failure_status = 400
+        engine.analyze(anomalies)
+        assert provider.breaker.state == "closed"
+
+        server.failure_rate = 0.0
+        results = [engine.analyze(anomalies) for _ in range(3)]
+        provider.close()
+    assert all(r[0].root_cause is not None for r in results)
+    assert server.requests == 5
+
+def test_circuit_breaker_half_open():
+    from bfai.core.exceptions import CircuitOpenError
+    from bfai.llm.http_provider import CircuitBreaker
+
+    now = [0.0]
+    breaker = CircuitBreaker(
+        failure_threshold=2, reset_timeout=10, clock=lambda: now[0]
+    )
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    # After the timeout a single trial call goes through
+    now[0] = 10
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] = 20
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+def test_factory_http(monkeypatch):
+    from bfai.llm.http_provider import HTTPLLMProvider
+
+    monkeypatch.delenv("BFAI_LLM_URL", raising=False)
+    with pytest.raises(ValueError):
+        get_llm_provider("http")
+    monkeypatch.setenv("BFAI_LLM_URL", "http://127.0.0.1:9/v1/enrich")
+    assert isinstance(get_llm_provider("http"), HTTPLLMProvider)
+
+def test_streamed_enrichment_reuses_clusters_across_batches():
+    def gap(case_id, signature):
+        return create_raw_anomaly(FrictionType.TIME_GAP.value).model_copy(
+            update={"case_id": case_id, "signature": signature})
+
+    batches = [
+        [gap("c1", "A -> B"), gap("c2", "B -> C")],
+        [],
+        [gap("c3", "A -> B"), gap("c4", "C -> D")],
+    ]
+
+    class CountingProvider(MockLLMProvider):
+        calls = 0
+
+        def enrich_anomaly(self, anomaly):
+            self.calls += 1
+            return super().enrich_anomaly(anomaly)
+
+    provider = CountingProvider()
+    engine = ReasoningEngine(provider, cluster=True)
+    results = list(engine.iter_analyze(iter(batches)))
+
+    assert provider.calls == 3
+    assert engine.calls_saved == 1
+    assert results == ReasoningEngine(MockLLMProvider()).analyze(
+        [a for batch in batches for a in batch]
+    )
@@ -0,0 +1,125 @@
+import json
+import os
+import shutil
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection
+from pathlib import Path
+
+import pytest
+
+from bfai.core.exceptions import NotFoundError
+from bfai.core.friction import FrictionEngine
+from bfai.core.reasoning import ReasoningEngine
+from bfai.core.server import AnalysisServer
+from bfai.core.service import AnalysisService
+from bfai.ingestion.loader import load_trace_frame
+from bfai.llm.mock_provider import MockLLMProvider
+
+SAMPLE_CSV = Path(__file__).parent.parent / "examples" / "sample_logs.csv"
+
+
+def _service(tmp_path):
+    log = tmp_path / "log.csv"
+    shutil.copy(SAMPLE_CSV, log)
+    return log, AnalysisService(
+        [log], cache_path=tmp_path / "cache.sqlite", artifact_dir=tmp_path / "artifacts"
+    )
+
+
+def _get(conn: HTTPConnection, path: str):
+    conn.request("GET", path)
+    response = conn.getresponse()
+    body = response.read()
+    if response.getheader("Content-Type") == "application/json":
+        body = json.loads(body)
+    return response.status, body
+
+
+def test_service_caches_until_content_changes(tmp_path):
+    log, service = _service(tmp_path)
+    expected = ReasoningEngine(MockLLMProvider()).analyze(
+        FrictionEngine().run_analysis(load_trace_frame(log))
+    )
+
+    first = service.analyze()
+    assert [a.model_dump() for a in first] == [a.model_dump() for a in expected]
+    assert service.analyze() is first
+
+    # Touched, same content: still cached
+    stat = log.stat()
+    os.utime(log, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert service.analyze() is first
+
+    # New content: reloaded
+    with open(log, "a", encoding="utf-8") as f:
+        f.write("ord-003,Order Placed,2023-10-03 10:00:00,System,system\n")
+        f.write("ord-003,Packing,2023-10-05 10:00:00,Bob,human\n")
+    assert service.analyze() is not first
+    logs = service.metrics()["logs"]["log.csv"]
+    assert (logs["loads"], logs["hits"], logs["n_cases"]) == (2, 2, 3)
+
+    trace, _ = service.explain("ord-003")
+    assert [e.activity for e in trace.events] == ["Order Placed", "Packing"]
+    with pytest.raises(NotFoundError):
+        service.explain("missing")
+
+
+def test_server_answers_concurrent_queries(tmp_path, monkeypatch):
+    log, service = _service(tmp_path)
+    with AnalysisServer(service, port=0) as server:
+        port = int(server.url.rsplit(":", 1)[1])
+
+        def query(path):
+            conn = HTTPConnection("127.0.0.1", port, timeout=30)
+            try:
+                return _get(conn, path)
+            finally:
+                conn.close()
+
+        paths = ["/analyze", "/explain?case_id=ord-002", "/report"] * 4
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            results = list(pool.map(query, paths))
+
+        assert all(status == 200 for status, _ in results)
+        analyzed = results[0][1]
+        assert analyzed == [a.model_dump(mode="json") for a in service.analyze()]
+        assert results[1][1]["trace"]["case_id"] == "ord-002"
+        assert results[2][1].startswith(b"# Business Friction Analysis Report")
+
+        assert query("/explain?case_id=missing")[0] == 404
+        assert query("/explain")[0] == 400
+        assert query("/analyze?log=other.csv")[0] == 404
+
+        status, metrics = query("/metrics")
+        assert status == 200
+        assert metrics["endpoints"]["/analyze"]["requests"] == 5
+        assert metrics["endpoints"]["/explain"]["errors"] == 2
+        assert metrics["endpoints"]["/report"]["p95_ms"] > 0
+        assert metrics["logs"]["log.csv"]["loads"] == 1
+
+        # Lookup failures inside the service are server errors, not "not found"
+        def broken(log=None):
+            raise KeyError("column")
+
+        monkeypatch.setattr(service, "analyze", broken)
+        assert query("/analyze")[0] == 500
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Unix sockets not available")
+def test_server_unix_socket(tmp_path):
+    log, service = _service(tmp_path)
+    socket_path = tmp_path / "bfai.sock"
+
+    class UnixConnection(HTTPConnection):
+        def connect(self):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(str(socket_path))
+
+    with AnalysisServer(service, socket_path=socket_path):
+        conn = UnixConnection("localhost")
+        assert _get(conn, "/health") == (200, {"status": "ok", "logs": ["log.csv"]})
+        # Keep-alive: several requests on one connection
+        assert _get(conn, "/explain?case_id=ord-001")[0] == 200
+        conn.close()
+    assert not socket_path.exists()
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from bfai.core.friction import FrictionEngine
+from bfai.ingestion.csv_loader import load_csv
+from bfai.ingestion.normalizer import normalize_to_frame, normalize_to_traces
+from bfai.models.event import ActorType, Event
+from bfai.models.trace import Trace
+from bfai.models.trace_frame import TraceFrame
+
+SAMPLE_CSV = Path(__file__).parent.parent / "examples" / "sample_logs.csv"
+
+def test_frame_layout():
+    frame = normalize_to_frame(load_csv(SAMPLE_CSV))
+
+    assert frame.n_cases == 2
+    assert frame.n_events == 11
+    assert list(frame.case_ids) == ["ord-001", "ord-002"]
+    assert list(frame.offsets) == [0, 5, 11]
+    # Timestamps are sorted inside each case
+    for case in range(frame.n_cases):
+        start, end = frame.offsets[case], frame.offsets[case + 1]
+        assert (
+            frame.timestamps[start + 1 : end] >= frame.timestamps[start : end - 1]
+        ).all()
+
+
+def test_frame_materializes_same_traces():
+    records = load_csv(SAMPLE_CSV)
+    frame = normalize_to_frame(records)
+
+    assert frame.to_traces() == normalize_to_traces(records)
+    assert frame.get_trace("missing") is None
+
+def test_lazy_materialization():
+    frame = normalize_to_frame(load_csv(SAMPLE_CSV))
+    FrictionEngine().run_analysis(frame)
+
+    # Detection works on arrays only; nothing is materialized until asked for.
+    assert frame._traces == {}
+    trace = frame.get_trace("ord-002")
+    assert trace.events[3].actor == "Alice"
+    assert list(frame._traces) == [1]
+
+def test_engine_accepts_frame_or_traces():
+    base = datetime(2023, 1, 1)
+    traces = []
+    for i in range(5):
+        events = [
+            Event(
+                event_id=f"e{i}_{j}",
+                case_id=f"c{i}",
+                activity=act,
+                timestamp=base + timedelta(seconds=10 * j),
+                actor_type=ActorType.HUMAN,
+            )
+            for j, act in enumerate(["A", "B", "A", "B", "A"])
+        ]
+        traces.append(
+            Trace(
+                case_id=f"c{i}",
+                events=events,
+                start_time=events[0].timestamp,
+                end_time=events[-1].timestamp,
+                duration_seconds=40.0,
+            )
+        )
+
+    engine = FrictionEngine()
+    from_list = engine.run_analysis(traces)
+    from_frame = engine.run_analysis(TraceFrame.from_traces(traces))
+
+    assert from_list == from_frame
+    assert from_list[0].involved_events == ["e0_0", "e0_2", "e0_4"]
@@ -1,6 +1,7 @@
 import json
+import sys
 from pathlib import Path
-from typing import Any, List, Optional
+from typing import Any, Iterable, List, Optional, TextIO
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
@@ -10,6 +11,11 @@ from rich.align import Align
 from rich.text import Text
 
 console = Console()
+# Status, progress and errors: stdout is kept for results (records may be piped)
+err_console = Console(stderr=True)
+
+# Formats of `write_records`: a JSON array, or one JSON document per line
+RECORD_FORMATS = ("json", "ndjson")
 
 def print_banner():
     """Prints a modern BFAI banner."""
@@ -35,15 +41,71 @@ def print_banner():
     console.print()
 
 def print_json(data: Any):
-    """Prints data as formatted JSON to stdout."""
+    """Prints data as JSON to stdout (highlighted on a terminal, plain otherwise)."""
     json_str = json.dumps(data, indent=2, default=str)
+    if not console.is_terminal:
+        sys.stdout.write(json_str + "\n")
+        return
     console.print(Syntax(json_str, "json", theme="monokai", word_wrap=True))
 
+def _serialize(record: Any, indent: Optional[int] = None) -> str:
+    """JSON text of one record; pydantic models use their compiled serializer."""
+    if hasattr(record, "model_dump_json"):
+        return record.model_dump_json(indent=indent)
+    return json.dumps(record, indent=indent, default=str)
+
+def write_records(records: Iterable[Any], stream: TextIO, fmt: str = "json") -> int:
+    """
+    Writes records (pydantic models or JSON-serializable values) one at a time,
+    without building the whole document in memory.
+
+    Args:
+        records: Records to write; consumed lazily.
+        stream: Text stream to write to.
+        fmt: "json" (an array, indented like `dump_json`) or "ndjson" (one
+             compact document per line).
+
+    Returns:
+        int: Number of records written.
+    """
+    if fmt not in RECORD_FORMATS:
+        raise ValueError(
+            f"Unknown output format: {fmt} "
+            f"(expected one of {', '.join(RECORD_FORMATS)})"
+        )
+    count = 0
+    for record in records:
+        if fmt == "ndjson":
+            stream.write(_serialize(record) + "\n")
+        else:
+            stream.write(",\n  " if count else "[\n  ")
+            stream.write(_serialize(record, indent=2).replace("\n", "\n  "))
+        count += 1
+    if fmt == "json":
+        stream.write("\n]" if count else "[]")
+    return count
+
+def print_records(records: Iterable[Any], fmt: str = "json"):
+    """Prints records to stdout; JSON arrays are highlighted on a terminal."""
+    if fmt == "json" and console.is_terminal:
+        print_json([r.model_dump() if hasattr(r, "model_dump") else r for r in records])
+        return
+    write_records(records, sys.stdout, fmt)
+    if fmt == "json":
+        sys.stdout.write("\n")
+    sys.stdout.flush()
+
+def dump_records(records: Iterable[Any], path: Path, fmt: str = "json"):
+    """Writes records to a file as a JSON array or NDJSON (see `write_records`)."""
+    with open(path, "w", encoding="utf-8") as f:
+        write_records(records, f, fmt)
+    err_console.print(f"[green]✔ Output saved to {path}[/green]")
+
 def dump_json(data: Any, path: Path):
     """Writes data as JSON to a file."""
     with open(path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2, default=str)
-    console.print(f"[green]✔ Output saved to {path}[/green]")
+    err_console.print(f"[green]✔ Output saved to {path}[/green]")
 
 def print_table(title: str, columns: List[str], rows: List[List[str]]):
     """Prints a rich table with modern styling."""
@@ -71,16 +133,16 @@ def save_file(content: str, path: Path):
     """Saves text content to a file."""
     with open(path, "w", encoding="utf-8") as f:
         f.write(content)
-    console.print(f"[green]✔ Report saved to {path}[/green]")
+    err_console.print(f"[green]✔ Report saved to {path}[/green]")
 
 def print_error(message: str):
-    """Prints an error message."""
-    console.print(f"[bold red]✖ Error:[/bold red] {message}")
+    """Prints an error message (to stderr)."""
+    err_console.print(f"[bold red]✖ Error:[/bold red] {message}")
 
 def print_info(message: str):
-    """Prints an info message."""
-    console.print(f"[blue]ℹ {message}[/blue]")
+    """Prints an info message (to stderr)."""
+    err_console.print(f"[blue]ℹ {message}[/blue]")
 
 def print_success(message: str):
-    """Prints a success message."""
-    console.print(f"[bold green]✔ {message}[/bold green]")
+    """Prints a success message (to stderr)."""
+    err_console.print(f"[bold green]✔ {message}[/bold green]")